@@ -1,43 +1,75 @@
+import importlib
+from contextlib import asynccontextmanager
+
+from anyio import to_thread
 from fastapi import FastAPI
-from src.routes import (
-    authentication,
-    leaderboard,
-    user,
-    user_progress,
-    vocabulary,
-    statistics,
-    xp,
-    pyramid,
-    suggested_module,
-    weekly_progress,
-    saved_sentences,
-    writing,
-)
-from fastapi.middleware.cors import CORSMiddleware
-from starlette.middleware.sessions import SessionMiddleware
-from src.settings import SECRET_KEY
+from fastapi.responses import ORJSONResponse
+from src.database.database import healthcheck
+from src.middleware.cors import FastCORS
+from src.api_clients.api import close_gemini_client
+from src.api_clients.pyramid_prompts import close_first_sentence_pools, close_preamble_caches
+from src.services.translation_service import flush_cache_stats
+from src.settings import ALLOWED_ORIGINS, THREADPOOL_SIZE
+from src.logging_config import setup_logging
+
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    log_listener = setup_logging()
+    # Senkron (def) endpoint'ler ve bloklayan DB/Gemini çağrıları thread havuzunda çalışır;
+    # varsayılan 40 thread yük altında kuyruk oluşturduğu için sınır yükseltiliyor
+    to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+    yield
+    await close_first_sentence_pools()
+    await close_preamble_caches()
+    await close_gemini_client()
+    # Bellekte bekleyen çeviri önbelleği istatistikleri kapanışta yazılır
+    await to_thread.run_sync(flush_cache_stats)
+    log_listener.stop()
 
-app = FastAPI()
-app.add_middleware(SessionMiddleware, secret_key=SECRET_KEY)
+
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
+# Oturum (session) kullanan bir route olmadığı için SessionMiddleware global olarak eklenmiyor.
+# Google OAuth route'u tekrar etkinleştirilirse yalnızca ona ait bir alt uygulamaya eklenmeli.
 app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    FastCORS,
+    allow_origins=ALLOWED_ORIGINS,
+    # Kimlik doğrulama Authorization başlığıyla (JWT) yapıldığı için çerez/kimlik bilgisi gerekmiyor
+    allow_credentials=False,
+    allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH"],
+    allow_headers=["authorization", "content-type"],
+    # /pyramid/list bir sonraki sayfanın imlecini bu başlıkta döndürür
+    expose_headers=["x-next-cursor"],
+)
+
+# Router modülleri sırayla içe aktarılıp kaydedilir
+# (google_auth şu an devre dışı)
+ROUTER_MODULES = (
+    "user",
+    "vocabulary",
+    "authentication",
+    "statistics",
+    "xp",
+    "user_progress",
+    "leaderboard",
+    "pyramid",
+    "suggested_module",
+    "weekly_progress",
+    "saved_sentences",
+    "writing",
 )
 
-app.include_router(user.router)
-""" app.include_router(google_auth.router)   """
-app.include_router(vocabulary.router)
-app.include_router(authentication.router)
-app.include_router(statistics.router)
-app.include_router(xp.router)
-app.include_router(user_progress.router)
-app.include_router(leaderboard.router)
-app.include_router(pyramid.router)
-app.include_router(suggested_module.router)
-app.include_router(weekly_progress.router)
-app.include_router(saved_sentences.router)
-app.include_router(writing.router)
+
+def register_routers(app: FastAPI) -> None:
+    for name in ROUTER_MODULES:
+        app.include_router(importlib.import_module(f"src.routes.{name}").router)
+
+
+register_routers(app)
+
+
+@app.get("/health")
+async def health():
+    if not await healthcheck():
+        return ORJSONResponse({"status": "unavailable"}, status_code=503)
+    return {"status": "ok"}
@@ -1,7 +1,216 @@
-from openai import OpenAI
+import asyncio
+import functools
+import random
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Optional, Type
+
+import httpx
 from google import genai
+from google.genai import _transformers
+from google.genai import errors as genai_errors
+from google.genai import types
 from src.settings import OPENAI_KEY
 from src.settings import GOOGLE_KEY
+from src.settings import GEMINI_MAX_CONCURRENCY, GEMINI_MAX_REQUESTS_PER_MINUTE
+from pydantic import BaseModel
+
+# Tüm uygulama tek bir Gemini istemcisi kullanır; async (aio) çağrılar aynı
+# bağlantı havuzunu paylaşır, böylece bağlantılar istekler arasında yeniden kullanılır.
+# HTTP/2 ile eşzamanlı istekler az sayıda bağlantı üzerinde çoklanır (yeni TLS el sıkışması gerekmez).
+GEMINI_MAX_CONNECTIONS = 200
+GEMINI_MAX_KEEPALIVE_CONNECTIONS = 100
+GEMINI_TIMEOUT_MS = 60_000
+
+gemini_client = genai.Client(
+    api_key=GOOGLE_KEY,
+    http_options=types.HttpOptions(
+        timeout=GEMINI_TIMEOUT_MS,
+        async_client_args={
+            "http2": True,
+            "limits": httpx.Limits(
+                max_connections=GEMINI_MAX_CONNECTIONS,
+                max_keepalive_connections=GEMINI_MAX_KEEPALIVE_CONNECTIONS,
+            ),
+        },
+    ),
+)
+
+
+
+def json_response_config(
+    schema: Any, cache_name: Optional[str] = None
+) -> types.GenerateContentConfig:
+    """
+    Build a JSON output config whose response schema is converted to a Gemini Schema once.
+
+    Given a pydantic class, the SDK regenerates and rewrites its JSON schema on every
+    request; a pre-converted Schema is sent as is. With a converted schema the SDK no
+    longer fills response.parsed with model instances, so callers validate response.text
+    themselves (see parse_json_response).
+    """
+    try:
+        response_schema = _transformers.t_schema(gemini_client._api_client, schema)
+    except Exception:
+        # Dönüştürülemeyen şemalar SDK'ya olduğu gibi bırakılır
+        response_schema = schema
+    return types.GenerateContentConfig(
+        cached_content=cache_name,
+        response_mime_type="application/json",
+        response_schema=response_schema,
+    )
+
+
+def parse_json_response(response, model: Type[BaseModel]) -> Optional[BaseModel]:
+    """Validate the raw JSON text of a structured Gemini response into `model`."""
+    if not response.text:
+        return None
+    return model.model_validate_json(response.text)
+
+
+@functools.lru_cache(maxsize=None)
+def get_openai_client():
+    """Build the OpenAI client on first use; the SDK is only imported when actually needed."""
+    from openai import OpenAI
+
+    return OpenAI(api_key=OPENAI_KEY)
+
+async def close_gemini_client():
+    """Close the shared async Gemini connection pool on application shutdown."""
+    # google-genai 1.13 istemcisinin public bir kapatma metodu yok; havuz SDK'nın
+    # iç API istemcisindeki httpx.AsyncClient'tadır
+    async_httpx_client = getattr(gemini_client._api_client, "_async_httpx_client", None)
+    if async_httpx_client is not None:
+        await async_httpx_client.aclose()
+
+
+class AsyncRateLimiter:
+    """Token bucket allowing `max_rate` acquisitions per `time_period` seconds, with bursts up to `max_rate`."""
+
+    def __init__(self, max_rate: float, time_period: float = 60.0):
+        self.max_rate = max_rate
+        self.rate_per_second = max_rate / time_period
+        self._tokens = float(max_rate)
+        self._updated_at = time.monotonic()
+
+    async def acquire(self) -> None:
+        while True:
+            now = time.monotonic()
+            self._tokens = min(
+                self.max_rate,
+                self._tokens + (now - self._updated_at) * self.rate_per_second,
+            )
+            self._updated_at = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate_per_second)
+
+
+# Yeniden deneme ayarları (üstel bekleme + tam rastgele sapma)
+RETRY_INITIAL_DELAY = 0.5
+RETRY_MAX_DELAY = 8.0
+RETRY_AFTER_MAX_DELAY = 30.0
+# Geçici olarak kabul edilen HTTP durum kodları (rate limit, timeout, sunucu hataları)
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+def is_retryable_error(error: BaseException) -> bool:
+    """Return True for transient errors (rate limits, timeouts, 5xx, network failures)."""
+    if isinstance(error, genai_errors.APIError):
+        return error.code in RETRYABLE_STATUS_CODES
+    return isinstance(error, (httpx.TransportError, asyncio.TimeoutError))
+
+
+def _retry_after_seconds(error: Optional[BaseException]) -> Optional[float]:
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        return max(0.0, float(headers.get("retry-after")))
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(
+    attempt: int,
+    error: Optional[BaseException] = None,
+    base: float = RETRY_INITIAL_DELAY,
+    cap: float = RETRY_MAX_DELAY,
+) -> float:
+    """
+    Seconds to wait before retry number `attempt` (0-based).
+
+    Honors a Retry-After header on the error when Gemini sends one; otherwise uses
+    full jitter so that clients failing together do not retry in lockstep.
+    """
+    retry_after = _retry_after_seconds(error)
+    if retry_after is not None:
+        return min(retry_after, RETRY_AFTER_MAX_DELAY)
+    return random.uniform(0, min(cap, base * (2**attempt)))
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling Gemini while the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` transient failures within `window` seconds and fails fast for `reset_timeout` seconds."""
+
+    def __init__(
+        self, failure_threshold: int = 5, window: float = 60.0, reset_timeout: float = 30.0
+    ):
+        self.failure_threshold = failure_threshold
+        self.window = window
+        self.reset_timeout = reset_timeout
+        self._failures = deque()
+        self._opened_at: Optional[float] = None
+
+    def check(self) -> None:
+        if self._opened_at is None:
+            return
+        if time.monotonic() - self._opened_at < self.reset_timeout:
+            raise CircuitOpenError("Gemini is temporarily unavailable")
+        self._opened_at = None
+
+    def record_success(self) -> None:
+        self._failures.clear()
+
+    def record_failure(self) -> None:
+        now = time.monotonic()
+        self._failures.append(now)
+        while self._failures and now - self._failures[0] > self.window:
+            self._failures.popleft()
+        if len(self._failures) >= self.failure_threshold:
+            self._opened_at = now
+            self._failures.clear()
+
+
+# Tüm Gemini çağrıları için süreç genelinde eşzamanlılık ve hız sınırı;
+# ani yüklerde 429 hataları ve bunların tetiklediği yeniden deneme fırtınası önlenir.
+gemini_semaphore = asyncio.Semaphore(GEMINI_MAX_CONCURRENCY)
+gemini_rate_limiter = AsyncRateLimiter(GEMINI_MAX_REQUESTS_PER_MINUTE, 60.0)
+# Art arda gelen geçici hatalarda Gemini bir süre hiç çağrılmaz
+gemini_breaker = CircuitBreaker()
+
+
+@asynccontextmanager
+async def gemini_slot():
+    """
+    Wait for a free concurrency slot and a rate-limit token before calling Gemini.
+
+    Raises CircuitOpenError right away while the breaker is open. Transient errors
+    raised inside the block count towards opening it.
+    """
+    gemini_breaker.check()
+    async with gemini_semaphore:
+        await gemini_rate_limiter.acquire()
+        try:
+            yield
+        except Exception as e:
+            if is_retryable_error(e):
+                gemini_breaker.record_failure()
+            raise
+        gemini_breaker.record_success()
 
-openai_client = OpenAI(api_key=OPENAI_KEY)
-gemini_client = genai.Client(api_key=GOOGLE_KEY)
\ No newline at end of file
@@ -0,0 +1,61 @@
+import re
+from typing import Dict, List
+
+import orjson
+
+
+class JsonArrayStreamParser:
+    """
+    Incrementally extract complete objects from a named array of a streamed JSON response.
+
+    Text chunks are fed as they arrive; every object in the array whose closing brace has
+    been received is decoded and returned, so callers can forward it before the response
+    ends. The full text received so far is kept in `buffer` for final validation.
+    """
+
+    def __init__(self, array_key: str):
+        self._array_start = re.compile(r'"%s"\s*:\s*\[' % re.escape(array_key))
+        self.buffer = ""
+        self.position = None  # Dizi bulunana kadar None
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.object_start = 0
+        self.finished = False
+
+    def feed(self, text: str) -> List[Dict]:
+        self.buffer += text
+        if self.finished:
+            return []
+        if self.position is None:
+            match = self._array_start.search(self.buffer)
+            if not match:
+                return []
+            self.position = match.end()
+
+        objects = []
+        buffer = self.buffer
+        for index in range(self.position, len(buffer)):
+            char = buffer[index]
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif char == "\\":
+                    self.escape = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char == "{":
+                if self.depth == 0:
+                    self.object_start = index
+                self.depth += 1
+            elif char == "}":
+                self.depth -= 1
+                if self.depth == 0:
+                    objects.append(orjson.loads(buffer[self.object_start : index + 1]))
+            elif char == "]" and self.depth == 0:
+                self.finished = True
+                break
+        self.position = len(buffer)
+        return objects
@@ -0,0 +1,114 @@
+import asyncio
+import functools
+import hashlib
+import inspect
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Type
+
+import orjson
+from anyio import to_thread
+from pydantic import BaseModel
+
+from src.database.database import llm_cache_table
+
+logger = logging.getLogger(__name__)
+
+# Aynı girdilerle yapılan Gemini çağrılarının yanıtları MongoDB'de saklanır
+LLM_CACHE_TTL_SECONDS = 7 * 24 * 60 * 60
+# Anahtara dahil edilmeyen, yalnızca çağrının nasıl yapılacağını etkileyen parametreler
+_NON_KEY_ARGUMENTS = frozenset({"max_retries", "retry_delay"})
+
+
+def _prompt_hash(fn_name: str, model: str, schema: Type[BaseModel], arguments: dict) -> str:
+    payload = orjson.dumps(
+        [fn_name, model, schema.__name__, arguments], option=orjson.OPT_SORT_KEYS
+    )
+    return hashlib.sha256(payload).hexdigest()
+
+
+def llm_cached(schema: Type[BaseModel], model: str = "gemini-2.5-flash-preview-05-20"):
+    """
+    Cache the structured result of an async Gemini helper in MongoDB.
+
+    The key is a SHA-256 hash of (function, model, schema, arguments); retry settings are
+    ignored. None results are not stored, and cache errors never fail the call itself.
+    Concurrent calls with the same key share one in-flight Gemini request, which keeps
+    running for the remaining callers if one of them is cancelled.
+    """
+
+    def decorator(fn):
+        signature = inspect.signature(fn)
+        inflight: Dict[str, asyncio.Task] = {}
+        fn_name = f"{fn.__module__}.{fn.__qualname__}"
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = {
+                name: value
+                for name, value in bound.arguments.items()
+                if name not in _NON_KEY_ARGUMENTS
+            }
+            prompt_hash = _prompt_hash(fn_name, model, schema, arguments)
+
+            try:
+                # PyMongo çağrıları event loop'u bloklamasın diye thread havuzunda çalışır
+                cached = await to_thread.run_sync(
+                    llm_cache_table.find_one,
+                    {
+                        "prompt_hash": prompt_hash,
+                        "created_at": {
+                            "$gt": datetime.now(timezone.utc)
+                            - timedelta(seconds=LLM_CACHE_TTL_SECONDS)
+                        },
+                    },
+                    {"raw": 1},
+                )
+                if cached:
+                    return schema.model_validate_json(cached["raw"])
+            except Exception as e:
+                logger.warning("LLM cache lookup failed for %s: %s", fn_name, e)
+
+            # Aynı anahtarla devam eden bir çağrı varsa Gemini'ye ikinci istek gönderilmez
+            task = inflight.get(prompt_hash)
+            if task is None:
+                task = asyncio.create_task(_call_and_store(prompt_hash, args, kwargs))
+                inflight[prompt_hash] = task
+                task.add_done_callback(functools.partial(_forget, prompt_hash))
+            # Bir çağıranın iptal edilmesi ortak çağrıyı ve diğer bekleyenleri etkilemez
+            return await asyncio.shield(task)
+
+        async def _call_and_store(prompt_hash: str, args: tuple, kwargs: dict):
+            result = await fn(*args, **kwargs)
+            if result is not None:
+                try:
+                    await to_thread.run_sync(
+                        functools.partial(
+                            llm_cache_table.update_one,
+                            {"prompt_hash": prompt_hash},
+                            {
+                                "$setOnInsert": {
+                                    "prompt_hash": prompt_hash,
+                                    "function": fn_name,
+                                    "raw": result.model_dump_json(),
+                                    "created_at": datetime.now(timezone.utc),
+                                }
+                            },
+                            upsert=True,
+                        )
+                    )
+                except Exception as e:
+                    logger.warning("LLM cache write failed for %s: %s", fn_name, e)
+            return result
+
+        def _forget(prompt_hash: str, task: asyncio.Task) -> None:
+            if inflight.get(prompt_hash) is task:
+                del inflight[prompt_hash]
+            if not task.cancelled():
+                task.exception()  # Bekleyen kalmadıysa "never retrieved" uyarısını önler
+
+        return wrapper
+
+    return decorator
@@ -1,583 +1,921 @@
-from .api import gemini_client
+from .api import (
+    backoff_delay,
+    gemini_client,
+    gemini_slot,
+    is_retryable_error,
+    json_response_config,
+)
+from .json_stream import JsonArrayStreamParser
 from src.models.pyramid import (
     PyramidReplaceItem,
     PyramidShrinkItem,
     PyramidExpandItem,
     PyramidParaphItem,
 )
+import asyncio
+import functools
+import hashlib
+import inspect
+import logging
 import time
-from typing import Optional, List
+from collections import OrderedDict
+from string import Template
+from typing import Any, AsyncIterator, Dict, Optional, List, Tuple
+from google.genai import errors as genai_errors
 from google.genai import types
+from pydantic import BaseModel, TypeAdapter
 
+logger = logging.getLogger(__name__)
 
-def expand_sentence(
-    sentence: str,
-    learning_language: str = "Turkish",
-    system_language: str = "English",
-    purpose: str = "General Knowledge",
-    user_level: str = "A1",
-    excluded_words: List[str] = None,
-    max_retries: int = 3,
-) -> Optional[PyramidExpandItem]:
-    """Generate 3 alternative sentences by adding one element to the original sentence."""
+# Aynı parametrelerle yapılan istekler için süreç içi önbellek ayarları
+RESPONSE_CACHE_MAX_SIZE = 1024
+RESPONSE_CACHE_TTL_SECONDS = 24 * 60 * 60
 
-    # Prepare excluded words section
-    excluded_words_section = ""
-    if excluded_words:
-        excluded_words_str = ", ".join(excluded_words)
-        excluded_words_section = f"""
-**IMPORTANT - AVOID REPETITION:**
-- DO NOT use any of these words that have been used in previous steps: {excluded_words_str}
-- Generate completely different words/phrases that haven't been used before.
-- Be creative and come up with fresh alternatives that avoid these previously used words.
-"""
 
-    prompt = f"""
-**CRITICAL LANGUAGE REQUIREMENTS:**
-- ALL generated sentences MUST be written EXCLUSIVELY in {learning_language}. Do NOT use any other language for sentences.
-- ALL added words/phrases MUST be written EXCLUSIVELY in {learning_language}. Do NOT use any other language for added elements.
-- ALL meanings/translations MUST be written EXCLUSIVELY in {system_language}. Do NOT use any other language for meanings.
-- DO NOT mix languages within a single field. Each field must contain content in only one specified language.
-- Verify language accuracy: {learning_language} content must follow {learning_language} spelling, grammar, and vocabulary conventions.
-- Verify language accuracy: {system_language} translations must follow {system_language} spelling, grammar, and vocabulary conventions.
-{excluded_words_section}
+def _normalize_excluded_words(excluded_words: Optional[List[str]]) -> Tuple[str, ...]:
+    """Return excluded words as a sorted, de-duplicated tuple (hashable and prompt-stable)."""
+    return tuple(sorted(set(excluded_words))) if excluded_words else ()
+
+
+def _async_lru_cache(maxsize: int = RESPONSE_CACHE_MAX_SIZE, ttl: float = RESPONSE_CACHE_TTL_SECONDS):
+    """
+    Cache successful results of an async generator keyed on its normalized arguments.
+
+    excluded_words is normalized to a sorted tuple so that lists can be part of the key,
+    and max_retries is ignored. None results are never cached. Concurrent calls with
+    the same key share a single in-flight call, which is not cancelled with its first caller.
+    """
+
+    def decorator(fn):
+        cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+        inflight: Dict[tuple, asyncio.Task] = {}
+        signature = inspect.signature(fn)
+
+        def _copy(value: Any) -> Any:
+            # Çağıranlar dönen modeli değiştirebildiği için önbellekteki nesne paylaşılmaz
+            return value.model_copy(deep=True) if isinstance(value, BaseModel) else value
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            if "excluded_words" in bound.arguments:
+                # Normalize edilmiş demet hem anahtar hem de prompt için kullanılır
+                bound.arguments["excluded_words"] = _normalize_excluded_words(
+                    bound.arguments["excluded_words"]
+                )
+            key = tuple(
+                item for item in bound.arguments.items() if item[0] != "max_retries"
+            )
+
+            cached = cache.get(key)
+            if cached is not None:
+                stored_at, value = cached
+                if time.monotonic() - stored_at < ttl:
+                    cache.move_to_end(key)
+                    return _copy(value)
+                del cache[key]
+
+            # Aynı anahtar için devam eden bir çağrı varsa onun sonucu beklenir
+            task = inflight.get(key)
+            if task is None:
+                task = asyncio.create_task(_call_and_store(key, bound.args, bound.kwargs))
+                inflight[key] = task
+                task.add_done_callback(functools.partial(_forget, key))
+            # Bir çağıranın iptal edilmesi ortak çağrıyı ve diğer bekleyenleri etkilemez
+            return _copy(await asyncio.shield(task))
+
+        async def _call_and_store(key: tuple, args: tuple, kwargs: dict) -> Any:
+            result = await fn(*args, **kwargs)
+            if result is not None:
+                cache[key] = (time.monotonic(), result)
+                if len(cache) > maxsize:
+                    cache.popitem(last=False)
+            return result
+
+        def _forget(key: tuple, task: asyncio.Task) -> None:
+            if inflight.get(key) is task:
+                del inflight[key]
+            if not task.cancelled():
+                task.exception()  # Bekleyen kalmadıysa "never retrieved" uyarısını önler
+
+        wrapper.cache_clear = cache.clear
+        return wrapper
+
+    return decorator
+
+
+# Statik prompt ön ekleri için Gemini context cache ayarları
+GEMINI_MODEL = "gemini-2.5-flash-preview-05-20"
+PREAMBLE_CACHE_TTL_SECONDS = 3600
+# preamble hash -> (cache adı veya None, geçerlilik bitiş zamanı)
+_preamble_cache_names: Dict[str, Tuple[Optional[str], float]] = {}
+# Aynı preamble için eşzamanlı ıskalamalarda yalnızca bir caches.create çağrısı yapılır
+_preamble_cache_locks: Dict[str, asyncio.Lock] = {}
+
+
+def _preamble_key(preamble: str) -> str:
+    return hashlib.sha256(preamble.encode("utf-8")).hexdigest()
+
+
+def _is_missing_cache_error(error: BaseException) -> bool:
+    """Return True if Gemini rejected a request because the referenced context cache is gone."""
+    if not isinstance(error, genai_errors.APIError):
+        return False
+    if error.code == 404:
+        return True
+    message = str(error).lower()
+    return "cached" in message and ("not found" in message or "expired" in message)
+
+
+async def _get_preamble_cache_name(preamble: str) -> Optional[str]:
+    """
+    Return the name of a Gemini context cache holding the given static preamble.
+
+    The cache is created lazily on first use (once per preamble, even under concurrent
+    misses) and refreshed shortly before it expires. If creation fails (e.g. the preamble
+    is below the model's minimum cacheable size), None is remembered for the same period
+    so callers fall back to sending the full prompt.
+    """
+    key = _preamble_key(preamble)
+    entry = _preamble_cache_names.get(key)
+    if entry is not None and entry[1] > time.monotonic():
+        return entry[0]
+
+    lock = _preamble_cache_locks.setdefault(key, asyncio.Lock())
+    async with lock:
+        # Kilidi beklerken başka bir istek önbelleği oluşturmuş olabilir
+        entry = _preamble_cache_names.get(key)
+        now = time.monotonic()
+        if entry is not None and entry[1] > now:
+            return entry[0]
+
+        try:
+            cached_content = await gemini_client.aio.caches.create(
+                model=GEMINI_MODEL,
+                config=types.CreateCachedContentConfig(
+                    contents=[preamble],
+                    ttl=f"{PREAMBLE_CACHE_TTL_SECONDS}s",
+                ),
+            )
+            cache_name = cached_content.name
+        except Exception as e:
+            logger.warning(
+                "operation=context_cache_create failed, using full prompt: %s", str(e)
+            )
+            cache_name = None
+
+        # Sunucu tarafında süresi dolmadan önce yenilemek için biraz erken bitir
+        _preamble_cache_names[key] = (cache_name, now + PREAMBLE_CACHE_TTL_SECONDS - 60)
+        return cache_name
+
+
+def _forget_preamble_cache(preamble: str, error: BaseException) -> None:
+    """Drop the remembered cache name if Gemini reports that the cache no longer exists."""
+    if _is_missing_cache_error(error):
+        _preamble_cache_names.pop(_preamble_key(preamble), None)
+
+
+async def close_preamble_caches() -> None:
+    """Delete the context caches created by this process (called on application shutdown)."""
+    names = {name for name, _ in _preamble_cache_names.values() if name}
+    _preamble_cache_names.clear()
+    _preamble_cache_locks.clear()
+    for name in names:
+        try:
+            await gemini_client.aio.caches.delete(name=name)
+        except Exception as e:
+            logger.warning("operation=context_cache_delete failed for %s: %s", name, e)
+
+
+@functools.lru_cache(maxsize=256)
+def _response_config(
+    response_schema: Any, cache_name: Optional[str] = None
+) -> types.GenerateContentConfig:
+    """Return the (shared, never mutated) JSON output config for a schema and optional context cache."""
+    return json_response_config(response_schema, cache_name)
+
+
+async def _generate_content(
+    preamble: str, request: Optional[str], response_schema: Any
+):
+    """Send a prompt to Gemini, referencing the cached preamble when one is available."""
+    if not request:
+        # Dinamik kısım yoksa önbelleğe gerek yok, prompt olduğu gibi gönderilir
+        return await gemini_client.aio.models.generate_content(
+            model=GEMINI_MODEL,
+            contents=preamble,
+            config=_response_config(response_schema),
+        )
+
+    cache_name = await _get_preamble_cache_name(preamble)
+    if cache_name:
+        try:
+            return await gemini_client.aio.models.generate_content(
+                model=GEMINI_MODEL,
+                contents=request,
+                config=_response_config(response_schema, cache_name),
+            )
+        except Exception as e:
+            # Yalnızca önbellek sunucuda yoksa (silinmiş/süresi dolmuş) yeniden oluşturulur;
+            # 429 ve zaman aşımı gibi hatalarda mevcut önbellek kullanılmaya devam eder
+            _forget_preamble_cache(preamble, e)
+            raise
+
+    return await gemini_client.aio.models.generate_content(
+        model=GEMINI_MODEL,
+        contents=preamble + request,
+        config=_response_config(response_schema),
+    )
+
+
+# Yanıt şemaları için derlenmiş doğrulayıcılar modül yüklenirken bir kez oluşturulur
+_RESPONSE_ADAPTERS: Dict[Any, TypeAdapter] = {
+    schema: TypeAdapter(schema)
+    for schema in (
+        PyramidExpandItem,
+        PyramidShrinkItem,
+        PyramidReplaceItem,
+        PyramidParaphItem,
+        str,
+    )
+}
+
+
+def _response_adapter(response_schema: Any) -> TypeAdapter:
+    """Return the cached TypeAdapter for a response schema, building it on first use."""
+    adapter = _RESPONSE_ADAPTERS.get(response_schema)
+    if adapter is None:
+        adapter = _RESPONSE_ADAPTERS[response_schema] = TypeAdapter(response_schema)
+    return adapter
+
+
+def _parse_response(response, response_schema: Any) -> Optional[Any]:
+    """Validate the raw JSON text with the precompiled adapter, falling back to the SDK result."""
+    if response.text:
+        return _response_adapter(response_schema).validate_json(response.text)
+    return response.parsed
+
+
+async def _call_gemini(
+    operation: str,
+    preamble: str,
+    request: Optional[str],
+    response_schema: Any,
+    max_retries: int = 3,
+) -> Optional[Any]:
+    """
+    Call Gemini with jittered exponential backoff and return the parsed response.
+
+    Only transient errors are retried; anything else (e.g. invalid request or schema
+    errors) fails immediately since repeating the same prompt would not help.
+
+    Args:
+        operation: Name of the calling generator, used in error messages
+        preamble: Static part of the prompt
+        request: Per-call part of the prompt, or None if the preamble is the whole prompt
+        response_schema: Schema passed to Gemini for structured output
+        max_retries: Maximum number of attempts
+
+    Returns:
+        The parsed response, or None if all attempts failed
+    """
+    for attempt in range(max_retries):
+        try:
+            async with gemini_slot():
+                response = await _generate_content(preamble, request, response_schema)
+            return _parse_response(response, response_schema)
+        except Exception as e:
+            if attempt + 1 >= max_retries or not is_retryable_error(e):
+                logger.exception(
+                    "operation=%s failed after %d attempts", operation, attempt + 1
+                )
+                return None
+            await asyncio.sleep(backoff_delay(attempt, e))
+    return None
+
+
+# Tüm dönüşüm prompt'larında ortak olan dil gereksinimleri ve kontrol blokları
+def _language_requirements_block(
+    generated: str, element_rule: Optional[Tuple[str, str]] = None
+) -> str:
+    """Build the shared CRITICAL LANGUAGE REQUIREMENTS block (with $-placeholders)."""
+    lines = [
+        "**CRITICAL LANGUAGE REQUIREMENTS:**",
+        f"- ALL generated {generated} MUST be written EXCLUSIVELY in $learning_language. Do NOT use any other language for sentences.",
+    ]
+    if element_rule:
+        elements, label = element_rule
+        lines.append(
+            f"- ALL {elements} MUST be written EXCLUSIVELY in $learning_language. Do NOT use any other language for {label}."
+        )
+    lines.extend(
+        [
+            "- ALL meanings/translations MUST be written EXCLUSIVELY in $system_language. Do NOT use any other language for meanings.",
+            "- DO NOT mix languages within a single field. Each field must contain content in only one specified language.",
+            "- Verify language accuracy: $learning_language content must follow $learning_language spelling, grammar, and vocabulary conventions.",
+            "- Verify language accuracy: $system_language translations must follow $system_language spelling, grammar, and vocabulary conventions.",
+        ]
+    )
+    return "\n" + "\n".join(lines) + "\n"
+
+
+def _compliance_check_block(*learning_language_fields: str) -> str:
+    """Build the shared LANGUAGE COMPLIANCE CHECK block for the given learning-language fields."""
+    checks = [
+        f"Every {field} is written ONLY in $learning_language"
+        for field in learning_language_fields
+    ]
+    checks.append("Every meaning is written ONLY in $system_language")
+    checks.append("No fields contain mixed languages or incorrect language usage")
+    lines = ["**LANGUAGE COMPLIANCE CHECK:** Before finalizing your response, verify that:"]
+    lines.extend(f"{number}. {check}" for number, check in enumerate(checks, start=1))
+    return "\n".join(lines) + "\n"
+
+
+_EXPAND_PREAMBLE = Template(
+    _language_requirements_block("sentences", ("added words/phrases", "added elements"))
+    + """
 Task: Create three alternative sentences by adding exactly one word or phrase to the original sentence. Each alternative sentence:
-- Must be grammatically correct and meaningful in {learning_language}.
+- Must be grammatically correct and meaningful in $learning_language.
 - Must have a similar, but slightly different, meaning to the original sentence.
 - Added word or phrase must be a single word or a short phrase.
-- Result sentence difficulty should be appropriate for {user_level} level learners.
-- Result sentences should be relevant to the purpose: {purpose}.
+- Result sentence difficulty should be appropriate for $user_level level learners.
 - The added word or phrase should be relevant to the context of the original sentence.
 - The added element should not change the core meaning of the original sentence, but rather enhance or specify it.
 
 For each alternative sentence, the following must be provided:
-- Alternative sentence (in {learning_language})
-- Added word or phrase (in {learning_language})
-- Meaning of the alternative sentence (translation in {system_language})
+- Alternative sentence (in $learning_language)
+- Added word or phrase (in $learning_language)
+- Meaning of the alternative sentence (translation in $system_language)
 
-In addition, the original sentence and its meaning must be given in {system_language}.
+In addition, the original sentence and its meaning must be given in $system_language.
 
 Note the following rules:
 - Each alternative sentence must be unique in terms of the added word or phrase.
 - The added element must be clearly stated.
-- Translations must be correct and natural in {system_language}.
-
-Format the output as a JSON object adhering to the structure defined by the `PyramidExpandItem` Pydantic model:
-
-{{
-  "initial_sentence": "original sentence (in {learning_language})",
-  "initial_sentence_meaning": "meaning of original sentence (in {system_language})",
-  "options": [
-    {{
-      "sentence": "alternative sentence 1 (in {learning_language})",
-      "expand_word": "added word or phrase 1 (in {learning_language})",
-      "meaning": "meaning of alternative sentence 1 (in {system_language})"
-    }},
-    {{
-      "sentence": "alternative sentence 2 (in {learning_language})",
-      "expand_word": "added word or phrase 2 (in {learning_language})",
-      "meaning": "meaning of alternative sentence 2 (in {system_language})"
-    }},
-    {{
-      "sentence": "alternative sentence 3 (in {learning_language})",
-      "expand_word": "added word or phrase 3 (in {learning_language})",
-      "meaning": "meaning of alternative sentence 3 (in {system_language})"
-    }}
-  ]
-}}
-
-Example:
-If the original sentence is "She reads books" ({learning_language}, {system_language}), the output should be:
-
-
-{{
-  "initial_sentence": "She reads books",
-  "initial_sentence_meaning": "O kitap okur",
-  "options": [
-    {{
-      "sentence": "She often reads books",
-      "expand_word": "often",
-      "meaning": "O sık sık kitap okur"
-    }},
-    {{
-      "sentence": "She reads interesting books",
-      "expand_word": "interesting",
-      "meaning": "O ilginç kitaplar okur"
-    }},    {{
-      "sentence": "She reads books in the evening",
-      "expand_word": "in the evening",
-      "meaning": "O akşamları kitap okur"
-    }}
-  ]
-}}
-
-Now, create three alternative sentences for the given sentence: "{sentence}"
+- Translations must be correct and natural in $system_language.
 
-**LANGUAGE COMPLIANCE CHECK:** Before finalizing your response, verify that:
-1. Every sentence is written ONLY in {learning_language}
-2. Every expand_word is written ONLY in {learning_language}
-3. Every meaning is written ONLY in {system_language}
-4. No fields contain mixed languages or incorrect language usage """
+Output fields: initial_sentence, initial_sentence_meaning and options, where each option has sentence, expand_word and meaning.
 
-    retry_count = 0
-    while retry_count < max_retries:
-        try:
-            response = gemini_client.models.generate_content(
-                model="gemini-2.5-flash-preview-05-20",
-                contents=prompt,
-                config=types.GenerateContentConfig(
-                    response_mime_type="application/json",
-                    response_schema=PyramidExpandItem,
-                ),
-            )
-            return response.parsed
-        except Exception as e:
-            retry_count += 1
-            if retry_count >= max_retries:
-                print(
-                    f"Error in expand_sentence after {max_retries} attempts: {str(e)}"
-                )
-                return None
-            time.sleep(1)
+"""
+    + _compliance_check_block("sentence", "expand_word")
+)
 
 
-def shrink_sentence(
-    sentence: str,
-    learning_language: str = "Turkish",
-    system_language: str = "English",
-    user_level: str = "A1 - Beginner",
-    purpose: str = "General Knowledge",
-    excluded_words: List[str] = None,
-    max_retries: int = 3,
-) -> Optional[PyramidShrinkItem]:
-    """Generate 3 alternative sentences by removing one element from the original sentence."""
+@functools.lru_cache(maxsize=128)
+def _expand_preamble(
+    learning_language: str, system_language: str, user_level: str
+) -> str:
+    return _EXPAND_PREAMBLE.substitute(
+        learning_language=learning_language,
+        system_language=system_language,
+        user_level=user_level,
+    )
 
+
+def _build_expand_prompt(
+    sentence: str,
+    learning_language: str,
+    system_language: str,
+    user_level: str,
+    purpose: str,
+    excluded_words: Tuple[str, ...],
+) -> Tuple[str, str]:
+    """Return the (static preamble, per-call request) pair for the expand prompt."""
     # Prepare excluded words section
     excluded_words_section = ""
     if excluded_words:
         excluded_words_str = ", ".join(excluded_words)
         excluded_words_section = f"""
 **IMPORTANT - AVOID REPETITION:**
-- DO NOT remove any of these words that have been used in previous steps: {excluded_words_str}
-- Generate completely different words/phrases for removal that haven't been used before.
+- DO NOT use any of these words that have been used in previous steps: {excluded_words_str}
+- Generate completely different words/phrases that haven't been used before.
 - Be creative and come up with fresh alternatives that avoid these previously used words.
 """
 
-    prompt = f"""
-**CRITICAL LANGUAGE REQUIREMENTS:**
-- ALL generated sentences MUST be written EXCLUSIVELY in {learning_language}. Do NOT use any other language for sentences.
-- ALL removed words/phrases MUST be written EXCLUSIVELY in {learning_language}. Do NOT use any other language for removed elements.
-- ALL meanings/translations MUST be written EXCLUSIVELY in {system_language}. Do NOT use any other language for meanings.
-- DO NOT mix languages within a single field. Each field must contain content in only one specified language.
-- Verify language accuracy: {learning_language} content must follow {learning_language} spelling, grammar, and vocabulary conventions.
-- Verify language accuracy: {system_language} translations must follow {system_language} spelling, grammar, and vocabulary conventions.
-{excluded_words_section}
+    # Statik kısım (dil/seviye) tüm kullanıcılar arasında Gemini context cache ile paylaşılır;
+    # kullanıcıya özgü amaç, cümle ve hariç tutulan kelimeler istek başına gönderilir.
+    preamble = _expand_preamble(learning_language, system_language, user_level)
+
+    request = f"""{excluded_words_section}
+Result sentences should be relevant to the purpose: {purpose}.
+
+Now, create three alternative sentences for the given sentence: "{sentence}" """
+
+    return preamble, request
+
+
+@_async_lru_cache()
+async def expand_sentence(
+    sentence: str,
+    learning_language: str = "Turkish",
+    system_language: str = "English",
+    purpose: str = "General Knowledge",
+    user_level: str = "A1",
+    excluded_words: List[str] = None,
+    max_retries: int = 3,
+) -> Optional[PyramidExpandItem]:
+    """Generate 3 alternative sentences by adding one element to the original sentence."""
+
+    preamble, request = _build_expand_prompt(
+        sentence, learning_language, system_language, user_level, purpose, excluded_words
+    )
+
+    return await _call_gemini(
+        "expand_sentence", preamble, request, PyramidExpandItem, max_retries
+    )
+
+
+_SHRINK_PREAMBLE = Template(
+    _language_requirements_block("sentences", ("removed words/phrases", "removed elements"))
+    + """
 Task: Create three alternative sentences by removing exactly one word or phrase from the original sentence. Each alternative sentence:
-- Must be grammatically correct and meaningful in {learning_language}.
+- Must be grammatically correct and meaningful in $learning_language.
 - Must maintain proper grammatical structure after word removal (subject-verb agreement, correct tenses, proper syntax).
 - Must be semantically coherent and make logical sense in the target language.
 - Must have a similar, but slightly different, meaning to the original sentence.
 - Shrinked word or phrase must be a single word or a short phrase.
-- Result sentence difficulty should be appropriate for {user_level} level learners.
-- Result sentences should be relevant to the purpose: {purpose}.
+- Result sentence difficulty should be appropriate for $user_level level learners.
 - Each shortened sentence must preserve the core grammatical integrity of the original sentence.
 
 For each alternative sentence, the following must be provided:
-- Alternative sentence (in {learning_language})
-- Omitted word or phrase (in {learning_language})
-- Meaning of the alternative sentence (translation in {system_language})
+- Alternative sentence (in $learning_language)
+- Omitted word or phrase (in $learning_language)
+- Meaning of the alternative sentence (translation in $system_language)
 
-In addition, the original sentence and its meaning must be given in {system_language}.
+In addition, the original sentence and its meaning must be given in $system_language.
 
 Note the following rules:
 - Each alternative sentence must be unique in terms of the omitted word or phrase.
 - The omitted element must be clearly stated.
-- Translations must be correct and natural in {system_language}.
-
-Format the output as a JSON object strictly following this structure, which aligns with the provided Pydantic models:
-{{
-  "initial_sentence": "...", // original sentence (in {learning_language})
-  "initial_sentence_meaning": "...", // meaning of original sentence (in {system_language})
-  "options": [ // a list of three alternative sentences
-    {{
-      "sentence": "...", // alternative sentence (in {learning_language})
-      "removed_word": "...", // removed word or phrase (in {learning_language})
-      "meaning": "..." // meaning of alternative sentence (in {system_language})
-    }},
-    {{
-      "sentence": "...",
-      "removed_word": "...",
-      "meaning": "..."
-    }},
-    {{
-      "sentence": "...",
-      "removed_word": "...",
-      "meaning": "..."
-    }}
-  ]
-}}
-
-Example:
-If the original sentence is "I go to school by bus every day" ({learning_language} = English, {system_language} = English), the output should be:
-{{
-  "initial_sentence": "I go to school by bus every day",
-  "initial_sentence_meaning": "I go to school by bus every day",
-  "options": [
-    {{
-      "sentence": "I go to school by bus",
-      "removed_word": "every day",
-      "meaning": "I go to school by bus"
-    }},
-    {{
-      "sentence": "I go to school every day",
-      "removed_word": "by bus",
-      "meaning": "I go to school every day"
-    }},
-    {{
-      "sentence": "I go by bus every day",
-      "removed_word": "to school",      "meaning": "I go by bus every day"
-    }}
-  ]
-}}
-
-Now, create three alternative sentences for the given sentence: "{sentence}"
+- Translations must be correct and natural in $system_language.
 
-**LANGUAGE COMPLIANCE CHECK:** Before finalizing your response, verify that:
-1. Every sentence is written ONLY in {learning_language}
-2. Every removed_word is written ONLY in {learning_language}
-3. Every meaning is written ONLY in {system_language}
-4. No fields contain mixed languages or incorrect language usage """
+Output fields: initial_sentence, initial_sentence_meaning and options, where each option has sentence, removed_word and meaning.
 
-    retry_count = 0
-    while retry_count < max_retries:
-        try:
-            response = gemini_client.models.generate_content(
-                model="gemini-2.5-flash-preview-05-20",
-                contents=prompt,
-                config=types.GenerateContentConfig(
-                    response_mime_type="application/json",
-                    response_schema=PyramidShrinkItem,
-                ),
-            )
-            return response.parsed
+"""
+    + _compliance_check_block("sentence", "removed_word")
+)
 
-        except Exception as e:
-            retry_count += 1
-            if retry_count >= max_retries:
-                print(
-                    f"Error in shrink_sentence after {max_retries} attempts: {str(e)}"
-                )
-                return None
-            time.sleep(1)  # Wait before retrying
 
+@functools.lru_cache(maxsize=128)
+def _shrink_preamble(
+    learning_language: str, system_language: str, user_level: str
+) -> str:
+    return _SHRINK_PREAMBLE.substitute(
+        learning_language=learning_language,
+        system_language=system_language,
+        user_level=user_level,
+    )
 
-def replace_word(
-    sentence: str,
-    learning_language: str = "Turkish",
-    system_language: str = "English",
-    user_level: str = "A1 - Beginner",
-    purpose: str = "General Knowledge",
-    excluded_words: List[str] = None,
-    max_retries: int = 3,
-) -> Optional[PyramidReplaceItem]:
-    """Generate 3 alternative sentences by replacing one element in the original sentence."""
 
+def _build_shrink_prompt(
+    sentence: str,
+    learning_language: str,
+    system_language: str,
+    user_level: str,
+    purpose: str,
+    excluded_words: Tuple[str, ...],
+) -> Tuple[str, str]:
+    """Return the (static preamble, per-call request) pair for the shrink prompt."""
     # Prepare excluded words section
     excluded_words_section = ""
     if excluded_words:
         excluded_words_str = ", ".join(excluded_words)
         excluded_words_section = f"""
 **IMPORTANT - AVOID REPETITION:**
-- DO NOT use any of these words that have been used in previous steps: {excluded_words_str}
-- Generate completely different words for replacement that haven't been used before.
+- DO NOT remove any of these words that have been used in previous steps: {excluded_words_str}
+- Generate completely different words/phrases for removal that haven't been used before.
 - Be creative and come up with fresh alternatives that avoid these previously used words.
 """
 
-    prompt = f"""
-**CRITICAL LANGUAGE REQUIREMENTS:**
-- ALL generated sentences MUST be written EXCLUSIVELY in {learning_language}. Do NOT use any other language for sentences.
-- ALL replaced words and new words MUST be written EXCLUSIVELY in {learning_language}. Do NOT use any other language for word replacements.
-- ALL meanings/translations MUST be written EXCLUSIVELY in {system_language}. Do NOT use any other language for meanings.
-- DO NOT mix languages within a single field. Each field must contain content in only one specified language.
-- Verify language accuracy: {learning_language} content must follow {learning_language} spelling, grammar, and vocabulary conventions.
-- Verify language accuracy: {system_language} translations must follow {system_language} spelling, grammar, and vocabulary conventions.
-{excluded_words_section}
+    # Statik kısım (dil/seviye) tüm kullanıcılar arasında Gemini context cache ile paylaşılır;
+    # kullanıcıya özgü amaç, cümle ve hariç tutulan kelimeler istek başına gönderilir.
+    preamble = _shrink_preamble(learning_language, system_language, user_level)
+
+    request = f"""{excluded_words_section}
+Result sentences should be relevant to the purpose: {purpose}.
+
+Now, create three alternative sentences for the given sentence: "{sentence}" """
+
+    return preamble, request
+
+
+@_async_lru_cache()
+async def shrink_sentence(
+    sentence: str,
+    learning_language: str = "Turkish",
+    system_language: str = "English",
+    user_level: str = "A1 - Beginner",
+    purpose: str = "General Knowledge",
+    excluded_words: List[str] = None,
+    max_retries: int = 3,
+) -> Optional[PyramidShrinkItem]:
+    """Generate 3 alternative sentences by removing one element from the original sentence."""
+
+    preamble, request = _build_shrink_prompt(
+        sentence, learning_language, system_language, user_level, purpose, excluded_words
+    )
+
+    return await _call_gemini(
+        "shrink_sentence", preamble, request, PyramidShrinkItem, max_retries
+    )
+
+
+_REPLACE_PREAMBLE = Template(
+    _language_requirements_block("sentences", ("replaced words and new words", "word replacements"))
+    + """
 Task: Create three alternative sentences by replacing exactly one word in the original sentence with a new word. Each alternative sentence:
-- Must be grammatically correct and semantically meaningful in {learning_language}.
+- Must be grammatically correct and semantically meaningful in $learning_language.
 - Must have a different meaning compared to the original sentence due to the replacement.
 - Replaced word or phrase must be a single word or a short phrase.
-- Result sentence difficulty should be appropriate for {user_level} level learners.
-- Result sentences should be relevant to the purpose: {purpose}.
+- Result sentence difficulty should be appropriate for $user_level level learners.
 
 For each alternative sentence, the following must be provided:
-- The alternative sentence (in {learning_language}).
-- The word from the original sentence that was replaced (in {learning_language}).
-- The new word used for replacement (in {learning_language}).
-- The meaning of the alternative sentence (translation in {system_language}).
+- The alternative sentence (in $learning_language).
+- The word from the original sentence that was replaced (in $learning_language).
+- The new word used for replacement (in $learning_language).
+- The meaning of the alternative sentence (translation in $system_language).
 
-In addition, the original sentence and its meaning must be given in {system_language}.
+In addition, the original sentence and its meaning must be given in $system_language.
 
 Note the following rules:
 - Each alternative sentence must be unique in terms of the word being replaced or the new word used for replacement.
 - The replaced word and the new word must be clearly stated.
-- Translations must be correct and natural in {system_language}.
+- Translations must be correct and natural in $system_language.
 - The replacement should be a single word for a single word.
 
-Format the output as a JSON object with the following structure, aligning with the PyramidReplaceItem and PyramidReplaceOptions Pydantic models:
-{{
-  "initial_sentence": "original sentence (in {learning_language})",
-  "initial_sentence_meaning": "meaning of original sentence (in {system_language})",
-  "options": [
-    {{
-      "sentence": "alternative sentence 1 (in {learning_language})",
-      "replaced_word": "original word replaced 1 (in {learning_language})",
-      "changed_word": "new word used 1 (in {learning_language})",
-      "meaning": "meaning of alternative sentence 1 (in {system_language})"
-    }},
-    {{
-      "sentence": "alternative sentence 2 (in {learning_language})",
-      "replaced_word": "original word replaced 2 (in {learning_language})",
-      "changed_word": "new word used 2 (in {learning_language})",
-      "meaning": "meaning of alternative sentence 2 (in {system_language})"
-    }},
-    {{
-      "sentence": "alternative sentence 3 (in {learning_language})",
-      "replaced_word": "original word replaced 3 (in {learning_language})",
-      "changed_word": "new word used 3 (in {learning_language})",
-      "meaning": "meaning of alternative sentence 3 (in {system_language})"
-    }}
-  ]
-}}
-
-Example:
-If the original sentence is "I go to school by bus every day" ({learning_language} = English), the output would be as follows:
-{{
-  "initial_sentence": "I go to school by bus every day",
-  "initial_sentence_meaning": "I go to school by bus every day",
-  "options": [
-    {{
-      "sentence": "I go to park by bus every day",
-      "replaced_word": "school",
-      "changed_word": "park",
-      "meaning": "I go to the park by bus every day"
-    }},
-    {{
-      "sentence": "We go to school by bus every day",
-      "replaced_word": "I",
-      "changed_word": "We",
-      "meaning": "We go to school by bus every day"
-    }},
-    {{
-      "sentence": "I go to school by car every day",
-      "replaced_word": "bus",
-      "changed_word": "car",
-      "meaning": "I go to school by car every day"
-    }}
-  ]
-}}
-
-Now, create three alternative sentences for the given sentence: "{sentence}"
+Output fields: initial_sentence, initial_sentence_meaning and options, where each option has sentence, replaced_word (original word), changed_word (new word) and meaning.
 
-**LANGUAGE COMPLIANCE CHECK:** Before finalizing your response, verify that:
-1. Every sentence is written ONLY in {learning_language}
-2. Every replaced_word is written ONLY in {learning_language}
-3. Every changed_word is written ONLY in {learning_language}
-4. Every meaning is written ONLY in {system_language}
-5. No fields contain mixed languages or incorrect language usage """
-
-    retry_count = 0
-    while retry_count < max_retries:
-        try:
-            response = gemini_client.models.generate_content(
-                model="gemini-2.5-flash-preview-05-20",
-                contents=prompt,
-                config=types.GenerateContentConfig(
-                    response_mime_type="application/json",
-                    response_schema=PyramidReplaceItem,
-                ),
-            )
-            return response.parsed
+"""
+    + _compliance_check_block("sentence", "replaced_word", "changed_word")
+)
 
-        except Exception as e:
-            retry_count += 1
-            if retry_count >= max_retries:
-                print(f"Error in replace_word after {max_retries} attempts: {str(e)}")
-                return None
-            time.sleep(1)  # Wait before retrying
 
+@functools.lru_cache(maxsize=128)
+def _replace_preamble(
+    learning_language: str, system_language: str, user_level: str
+) -> str:
+    return _REPLACE_PREAMBLE.substitute(
+        learning_language=learning_language,
+        system_language=system_language,
+        user_level=user_level,
+    )
 
-def paraphrase_sentence(
-    sentence: str,
-    learning_language: str = "Turkish",
-    system_language: str = "English",
-    user_level: str = "A1 - Beginner",
-    purpose: str = "General Knowledge",
-    excluded_words: List[str] = None,
-    max_retries: int = 3,
-) -> Optional[PyramidParaphItem]:
-    """Generate 3 alternative paraphrased sentences expressing the same meaning."""
 
+def _build_replace_prompt(
+    sentence: str,
+    learning_language: str,
+    system_language: str,
+    user_level: str,
+    purpose: str,
+    excluded_words: Tuple[str, ...],
+) -> Tuple[str, str]:
+    """Return the (static preamble, per-call request) pair for the replace prompt."""
     # Prepare excluded words section
     excluded_words_section = ""
     if excluded_words:
         excluded_words_str = ", ".join(excluded_words)
         excluded_words_section = f"""
 **IMPORTANT - AVOID REPETITION:**
-- DO NOT use any of these words/phrases that have been used in previous steps: {excluded_words_str}
-- Generate completely different paraphrased sentences that haven't been used before.
+- DO NOT use any of these words that have been used in previous steps: {excluded_words_str}
+- Generate completely different words for replacement that haven't been used before.
 - Be creative and come up with fresh alternatives that avoid these previously used words.
 """
 
-    prompt = f"""
-**CRITICAL LANGUAGE REQUIREMENTS:**
-- ALL generated paraphrased sentences MUST be written EXCLUSIVELY in {learning_language}. Do NOT use any other language for sentences.
-- ALL meanings/translations MUST be written EXCLUSIVELY in {system_language}. Do NOT use any other language for meanings.
-- DO NOT mix languages within a single field. Each field must contain content in only one specified language.
-- Verify language accuracy: {learning_language} content must follow {learning_language} spelling, grammar, and vocabulary conventions.
-- Verify language accuracy: {system_language} translations must follow {system_language} spelling, grammar, and vocabulary conventions.
-{excluded_words_section}
+    # Statik kısım (dil/seviye) tüm kullanıcılar arasında Gemini context cache ile paylaşılır;
+    # kullanıcıya özgü amaç, cümle ve hariç tutulan kelimeler istek başına gönderilir.
+    preamble = _replace_preamble(learning_language, system_language, user_level)
+
+    request = f"""{excluded_words_section}
+Result sentences should be relevant to the purpose: {purpose}.
+
+Now, create three alternative sentences for the given sentence: "{sentence}" """
+
+    return preamble, request
+
+
+@_async_lru_cache()
+async def replace_word(
+    sentence: str,
+    learning_language: str = "Turkish",
+    system_language: str = "English",
+    user_level: str = "A1 - Beginner",
+    purpose: str = "General Knowledge",
+    excluded_words: List[str] = None,
+    max_retries: int = 3,
+) -> Optional[PyramidReplaceItem]:
+    """Generate 3 alternative sentences by replacing one element in the original sentence."""
+
+    preamble, request = _build_replace_prompt(
+        sentence, learning_language, system_language, user_level, purpose, excluded_words
+    )
+
+    return await _call_gemini(
+        "replace_word", preamble, request, PyramidReplaceItem, max_retries
+    )
+
+
+_PARAPHRASE_PREAMBLE = Template(
+    _language_requirements_block("paraphrased sentences")
+    + """
 Task: Create three alternative paraphrased sentences for the original sentence. Each alternative sentence:
-- Must be grammatically correct and semantically meaningful in {learning_language}.
+- Must be grammatically correct and semantically meaningful in $learning_language.
 - Must maintain the original meaning of the sentence.
 - Must be a unique paraphrase of the original sentence.
-- Result sentence difficulty should be appropriate for {user_level} level learners.
-- Must use vocabulary and grammar structures that match or are slightly below the user's {user_level} proficiency level.
+- Result sentence difficulty should be appropriate for $user_level level learners.
+- Must use vocabulary and grammar structures that match or are slightly below the user's $user_level proficiency level.
 - Should avoid complex terminology or advanced grammatical constructions that exceed the user's knowledge level.
-- Result sentences should be relevant to the purpose: {purpose}.
 
 For each alternative sentence, the following must be provided:
-- The paraphrased sentence (in {learning_language}).
-- The meaning of the alternative sentence (translation in {system_language}).
+- The paraphrased sentence (in $learning_language).
+- The meaning of the alternative sentence (translation in $system_language).
 
-In addition, the original sentence and its meaning must be given in {system_language}.
+In addition, the original sentence and its meaning must be given in $system_language.
 
 Note the following rules:
 - Each alternative sentence must be a unique paraphrase of the original sentence.
-- Translations must be correct and natural in {system_language}.
-
-Format the output as a JSON object with the following structure, aligning with the PyramidParaphItem and PyramidParaphOptions Pydantic models:
-{{
-  "initial_sentence": "original sentence (in {learning_language})",
-  "initial_sentence_meaning": "meaning of original sentence (in {system_language})",
-  "options": [
-    {{
-      "paraphrased_sentence": "paraphrased sentence 1 (in {learning_language})",
-      "meaning": "meaning of paraphrased sentence 1 (in {system_language})"
-    }},
-    {{
-      "paraphrased_sentence": "paraphrased sentence 2 (in {learning_language})",
-      "meaning": "meaning of paraphrased sentence 2 (in {system_language})"
-    }},
-    {{
-      "paraphrased_sentence": "paraphrased sentence 3 (in {learning_language})",
-      "meaning": "meaning of paraphrased sentence 3 (in {system_language})"
-    }}
-  ]
-}}
-
-Example:
-If the original sentence is "The quick brown fox jumps over the lazy dog" ({learning_language} = English), the output would be as follows:
-```json
-{{
-  "initial_sentence": "The quick brown fox jumps over the lazy dog",
-  "initial_sentence_meaning": "The quick brown fox jumps over the lazy dog",
-  "options": [
-    {{
-      "paraphrased_sentence": "A speedy brown fox leaps over the sluggish canine",
-      "meaning": "A speedy brown fox leaps over the sluggish canine"
-    }},
-    {{
-      "paraphrased_sentence": "Jumping over the idle dog was the swift brown fox",
-      "meaning": "Jumping over the idle dog was the swift brown fox"
-    }},
-    {{
-      "paraphrased_sentence": "The brown fox, which was quick, jumped over the dog that was lazy",
-      "meaning": "The brown fox, which was quick, jumped over the dog that was lazy"
-    }}
-  ]
-}} 
-
-Now, create three alternative paraphrased sentences for the given sentence: "{sentence}"
+- Translations must be correct and natural in $system_language.
 
-**LANGUAGE COMPLIANCE CHECK:** Before finalizing your response, verify that:
-1. Every paraphrased_sentence is written ONLY in {learning_language}
-2. Every meaning is written ONLY in {system_language}
-3. No fields contain mixed languages or incorrect language usage """
+Output fields: initial_sentence, initial_sentence_meaning and options, where each option has paraphrased_sentence and meaning.
+
+"""
+    + _compliance_check_block("paraphrased_sentence")
+)
 
-    retry_count = 0
-    while retry_count < max_retries:
-        try:
-            response = gemini_client.models.generate_content(
-                model="gemini-2.5-flash-preview-05-20",
-                contents=prompt,
-                config=types.GenerateContentConfig(
-                    response_mime_type="application/json",
-                    response_schema=PyramidParaphItem,
-                ),
-            )
-            return response.parsed
-        except Exception as e:
-            retry_count += 1
-            if retry_count >= max_retries:
-                print(
-                    f"Error in paraphrase_sentence after {max_retries} attempts: {str(e)}"
-                )
-                return None
-            time.sleep(1)
 
+@functools.lru_cache(maxsize=128)
+def _paraphrase_preamble(
+    learning_language: str, system_language: str, user_level: str
+) -> str:
+    return _PARAPHRASE_PREAMBLE.substitute(
+        learning_language=learning_language,
+        system_language=system_language,
+        user_level=user_level,
+    )
 
-def get_first_sentence(
+
+def _build_paraphrase_prompt(
+    sentence: str,
+    learning_language: str,
+    system_language: str,
+    user_level: str,
+    purpose: str,
+    excluded_words: Tuple[str, ...],
+) -> Tuple[str, str]:
+    """Return the (static preamble, per-call request) pair for the paraphrase prompt."""
+    # Prepare excluded words section
+    excluded_words_section = ""
+    if excluded_words:
+        excluded_words_str = ", ".join(excluded_words)
+        excluded_words_section = f"""
+**IMPORTANT - AVOID REPETITION:**
+- DO NOT use any of these words/phrases that have been used in previous steps: {excluded_words_str}
+- Generate completely different paraphrased sentences that haven't been used before.
+- Be creative and come up with fresh alternatives that avoid these previously used words.
+"""
+
+    # Statik kısım (dil/seviye) tüm kullanıcılar arasında Gemini context cache ile paylaşılır;
+    # kullanıcıya özgü amaç, cümle ve hariç tutulan kelimeler istek başına gönderilir.
+    preamble = _paraphrase_preamble(learning_language, system_language, user_level)
+
+    request = f"""{excluded_words_section}
+Result sentences should be relevant to the purpose: {purpose}.
+
+Now, create three alternative paraphrased sentences for the given sentence: "{sentence}" """
+
+    return preamble, request
+
+
+@_async_lru_cache()
+async def paraphrase_sentence(
+    sentence: str,
     learning_language: str = "Turkish",
     system_language: str = "English",
     user_level: str = "A1 - Beginner",
     purpose: str = "General Knowledge",
+    excluded_words: List[str] = None,
     max_retries: int = 3,
-) -> Optional[str]:
-    """Generate a first sentence in the learning language for the pyramid exercise."""
+) -> Optional[PyramidParaphItem]:
+    """Generate 3 alternative paraphrased sentences expressing the same meaning."""
+
+    preamble, request = _build_paraphrase_prompt(
+        sentence, learning_language, system_language, user_level, purpose, excluded_words
+    )
 
-    prompt = f"""
+    return await _call_gemini(
+        "paraphrase_sentence", preamble, request, PyramidParaphItem, max_retries
+    )
+
+
+_FIRST_SENTENCE_PROMPT = Template(
+    """
 **CRITICAL LANGUAGE REQUIREMENTS:**
-- The generated sentence MUST be written EXCLUSIVELY in {learning_language}. Do NOT use any other language.
-- Verify language accuracy: The sentence must follow {learning_language} spelling, grammar, and vocabulary conventions.
-- The sentence must contain ONLY {learning_language} words and grammar structures.
+- The generated sentence MUST be written EXCLUSIVELY in $learning_language. Do NOT use any other language.
+- Verify language accuracy: The sentence must follow $learning_language spelling, grammar, and vocabulary conventions.
+- The sentence must contain ONLY $learning_language words and grammar structures.
 
-Task: Create a simple, grammatically correct sentence in {learning_language}. The sentence should be useful for language learning.
+Task: Create a simple, grammatically correct sentence in $learning_language. The sentence should be useful for language learning.
 - The sentence should be practical and culturally relevant.
-- The sentence should be appropriate for {user_level} level learners.
-- The sentence should be relevant to the purpose: {purpose}.
+- The sentence should be appropriate for $user_level level learners.
+- The sentence should be relevant to the purpose: $purpose.
 - The sentence should not be too complex or difficult to understand.
 - The sentence should not contain any idiomatic expressions or complex structures.
 - The sentence should not be a common phrase or idiom.
 - The sentence should be 4-12 words in length. Give shorter sentences for lower levels and longer sentences for higher levels.
 - The sentence should use common vocabulary but include 1-2 less common words.
 - The sentence should include at least one conjunction or transition word.
-- The sentence should be in {learning_language}.
+- The sentence should be in $learning_language.
 - The sentence should be clear and easy to understand for language learners.
 - The sentence should be unique and not a common phrase or idiom.
 - The sentence should not contain any slang or informal language.
 
 **LANGUAGE COMPLIANCE CHECK:** Before finalizing your response, verify that:
-1. The generated sentence is written ONLY in {learning_language}
+1. The generated sentence is written ONLY in $learning_language
 2. No words from other languages are included
-3. The sentence follows {learning_language} grammar and spelling conventions """
+3. The sentence follows $learning_language grammar and spelling conventions """
+)
 
-    retry_count = 0
-    while retry_count < max_retries:
+
+@functools.lru_cache(maxsize=128)
+def _first_sentence_prompt(
+    learning_language: str, system_language: str, user_level: str, purpose: str
+) -> str:
+    return _FIRST_SENTENCE_PROMPT.substitute(
+        learning_language=learning_language,
+        system_language=system_language,
+        user_level=user_level,
+        purpose=purpose,
+    )
+
+
+async def _generate_first_sentence(
+    learning_language: str,
+    system_language: str,
+    user_level: str,
+    purpose: str,
+    max_retries: int = 3,
+) -> Optional[str]:
+    prompt = _first_sentence_prompt(
+        learning_language, system_language, user_level, purpose
+    )
+    return await _call_gemini("get_first_sentence", prompt, None, str, max_retries)
+
+
+# (dil, seviye, amaç) kombinasyonları için önceden üretilmiş ilk cümle havuzları.
+# Amaç serbest metin olduğundan çoğu anahtar tek bir kullanıcıya aittir; havuz bu yüzden
+# yalnızca aynı anahtar tekrar tekrar istendiğinde oluşturulur ve küçük tutulur.
+# Sonraki istekler Gemini'yi beklemeden havuzdan cümle alır.
+FIRST_SENTENCE_POOL_SIZE = 5
+FIRST_SENTENCE_POOL_MAX_KEYS = 256
+# Havuz oluşturulmadan önce bir anahtarın kaç kez istenmesi gerektiği
+FIRST_SENTENCE_POOL_MIN_DEMAND = 3
+FIRST_SENTENCE_DEMAND_MAX_KEYS = 4096
+
+_first_sentence_pools: "OrderedDict[Tuple[str, str, str, str], asyncio.Queue]" = (
+    OrderedDict()
+)
+_first_sentence_refills: Dict[Tuple[str, str, str, str], asyncio.Task] = {}
+# Henüz havuzu olmayan anahtarların istek sayıları
+_first_sentence_demand: "OrderedDict[Tuple[str, str, str, str], int]" = OrderedDict()
+
+
+async def _refill_first_sentence_pool(
+    key: Tuple[str, str, str, str], pool: asyncio.Queue
+) -> None:
+    try:
+        while not pool.full():
+            sentence = await _generate_first_sentence(*key)
+            if not sentence:
+                # Gemini şu an yanıt vermiyor; bir sonraki istek yeniden denemeyi tetikler
+                break
+            pool.put_nowait(sentence)
+    finally:
+        _first_sentence_refills.pop(key, None)
+
+
+def _first_sentence_pool(key: Tuple[str, str, str, str]) -> Optional[asyncio.Queue]:
+    """Return the pool for a key, or None while the key has not had repeated demand yet."""
+    pool = _first_sentence_pools.get(key)
+    if pool is not None:
+        _first_sentence_pools.move_to_end(key)
+        return pool
+
+    demand = _first_sentence_demand.pop(key, 0) + 1
+    if demand < FIRST_SENTENCE_POOL_MIN_DEMAND:
+        _first_sentence_demand[key] = demand
+        if len(_first_sentence_demand) > FIRST_SENTENCE_DEMAND_MAX_KEYS:
+            _first_sentence_demand.popitem(last=False)
+        return None
+
+    pool = _first_sentence_pools[key] = asyncio.Queue(maxsize=FIRST_SENTENCE_POOL_SIZE)
+    if len(_first_sentence_pools) > FIRST_SENTENCE_POOL_MAX_KEYS:
+        evicted_key, _ = _first_sentence_pools.popitem(last=False)
+        task = _first_sentence_refills.pop(evicted_key, None)
+        if task:
+            task.cancel()
+    return pool
+
+
+def _schedule_first_sentence_refill(
+    key: Tuple[str, str, str, str], pool: asyncio.Queue
+) -> None:
+    if key not in _first_sentence_refills and not pool.full():
+        _first_sentence_refills[key] = asyncio.create_task(
+            _refill_first_sentence_pool(key, pool)
+        )
+
+
+async def close_first_sentence_pools() -> None:
+    """Cancel background refill tasks (called on application shutdown)."""
+    tasks = list(_first_sentence_refills.values())
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    _first_sentence_refills.clear()
+    _first_sentence_pools.clear()
+    _first_sentence_demand.clear()
+
+
+async def get_first_sentence(
+    learning_language: str = "Turkish",
+    system_language: str = "English",
+    user_level: str = "A1 - Beginner",
+    purpose: str = "General Knowledge",
+    max_retries: int = 3,
+) -> Optional[str]:
+    """
+    Return a first sentence in the learning language for the pyramid exercise.
+
+    Sentences are served from a prewarmed pool when available; otherwise a one-off
+    Gemini call is made. A pool is only kept (and topped up in the background) for
+    keys that have been requested repeatedly.
+    """
+    key = (learning_language, system_language, user_level, purpose)
+    pool = _first_sentence_pool(key)
+    if pool is None:
+        return await _generate_first_sentence(*key, max_retries=max_retries)
+
+    sentence = None if pool.empty() else pool.get_nowait()
+    # Havuzdan alınan her cümlenin yerine arka planda yenisi üretilir
+    _schedule_first_sentence_refill(key, pool)
+    if sentence:
+        return sentence
+
+    return await _generate_first_sentence(*key, max_retries=max_retries)
+
+
+_STEP_PROMPT_BUILDERS = {
+    "expand": (_build_expand_prompt, PyramidExpandItem),
+    "shrink": (_build_shrink_prompt, PyramidShrinkItem),
+    "replace": (_build_replace_prompt, PyramidReplaceItem),
+    "paraphrase": (_build_paraphrase_prompt, PyramidParaphItem),
+}
+
+
+async def stream_step_options(
+    step_type: str,
+    sentence: str,
+    learning_language: str = "Turkish",
+    system_language: str = "English",
+    user_level: str = "A1 - Beginner",
+    purpose: str = "General Knowledge",
+    excluded_words: List[str] = None,
+) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Stream a pyramid step from Gemini, yielding each option as soon as it is complete.
+
+    Yields ("option", dict) for every option in generation order and finally
+    ("item", PyramidItem) with the fully validated step. Errors are raised to the
+    caller, since part of the response may already have been forwarded.
+    """
+    builder, response_schema = _STEP_PROMPT_BUILDERS[step_type]
+    preamble, request = builder(
+        sentence,
+        learning_language,
+        system_language,
+        user_level,
+        purpose,
+        _normalize_excluded_words(excluded_words),
+    )
+
+    parser = JsonArrayStreamParser("options")
+    # Akış boyunca slot tutulur; bağlantı yanıt bitene kadar açık kalır
+    async with gemini_slot():
+        cache_name = await _get_preamble_cache_name(preamble)
         try:
-            response = gemini_client.models.generate_content(
-                model="gemini-2.5-flash-preview-05-20",
-                contents=prompt,
-                config=types.GenerateContentConfig(
-                    response_mime_type="application/json",
-                    response_schema=str,
-                ),
+            stream = await gemini_client.aio.models.generate_content_stream(
+                model=GEMINI_MODEL,
+                contents=request if cache_name else preamble + request,
+                config=_response_config(response_schema, cache_name),
             )
-            return response.parsed
         except Exception as e:
-            retry_count += 1
-            if retry_count >= max_retries:
-                print(
-                    f"Error in get_first_sentence after {max_retries} attempts: {str(e)}"
-                )
-                return None
-            time.sleep(1)  # Wait before retrying
+            _forget_preamble_cache(preamble, e)
+            raise
+
+        async for chunk in stream:
+            text = chunk.text or ""
+            for option in parser.feed(text):
+                yield "option", option
+
+    yield "item", _response_adapter(response_schema).validate_json(parser.buffer)
@@ -1,8 +1,16 @@
-from .api import gemini_client
-from google.genai import types
+from .api import (
+    CircuitOpenError,
+    backoff_delay,
+    gemini_client,
+    gemini_slot,
+    json_response_config,
+    parse_json_response,
+)
+from .llm_cache import llm_cached
+from src.settings import GEMINI_MODERATION_MODEL
 from pydantic import BaseModel
 from typing import Optional, List
-import time
+import asyncio
 
 
 class ContentModerationResult(BaseModel):
@@ -17,7 +25,19 @@ class PurposeSummaryResult(BaseModel):
     summary: str  # Brief summary of the purpose
 
 
-def check_content_appropriateness(
+# Yanıt yapılandırmaları sabittir; her çağrıda yeniden oluşturulmaz
+_MODERATION_CONFIG = json_response_config(ContentModerationResult)
+_PURPOSE_CONFIG = json_response_config(PurposeSummaryResult)
+
+
+# Moderasyon tek bir evet/hayır sınıflandırmasıdır; kısa ve sabit talimat prompt'un başında yer alır
+_MODERATION_STATIC_PREFIX = """Classify whether the CONTENT is appropriate for an educational language learning platform used by all ages, given the PURPOSE.
+Flag sexual, violent, hateful, illegal, profane, spam or malicious content. Reply as JSON: {"is_appropriate": <boolean>}
+"""
+
+
+@llm_cached(ContentModerationResult, model=GEMINI_MODERATION_MODEL)
+async def check_content_appropriateness(
     content: str,
     purpose: str,
     max_retries: int = 3,
@@ -37,70 +57,35 @@ def check_content_appropriateness(
         Exception: If content moderation fails after all retries
     """
 
-    prompt = f"""
-
-**CONTENT MODERATION TASK:**
-You are a content moderation AI for educational platforms. Analyze the provided content for appropriateness in the context of: {purpose}
-
-**EVALUATION CRITERIA:**
-1. **Educational Appropriateness**: Is the content suitable for educational purposes?
-2. **Age Appropriateness**: Is the content appropriate for learners of all ages?
-3. **Cultural Sensitivity**: Does the content respect cultural differences and avoid offensive material?
-4. **Language Learning Suitability**: Is the content appropriate for language learning contexts?
-5. **Professional Standards**: Does the content meet professional educational standards?
-
-**CONTENT CATEGORIES TO FLAG:**
-- Explicit sexual content
-- Violence or graphic descriptions
-- Hate speech or discriminatory language
-- Illegal activities or dangerous behaviors
-- Inappropriate profanity or vulgar language
-- Content that promotes harmful ideologies
-- Spam or irrelevant content
-- Content that violates educational standards
-- Malicious content (e.g., phishing, scams)
-
-**SCORING:**
-- confidence_score: Rate your confidence in this assessment (0.0 = uncertain, 1.0 = very confident)
-- is_appropriate: true if content is appropriate, false if it should be flagged
-
-**OUTPUT FORMAT:**
-Respond with a JSON object matching the ContentModerationResult schema:
-{{
-  "is_appropriate": <boolean>,
-}}
-
-**CONTENT TO ANALYZE:**
-"{content}"
-
-**PURPOSE CONTEXT:**
-{purpose}
+    # Sabit talimat önde, değişen amaç ve içerik sonda (örtük önek önbelleği için)
+    prompt = f"""{_MODERATION_STATIC_PREFIX}
+PURPOSE: {purpose}
+CONTENT: "{content}"
 """
 
     retry_count = 0
     while retry_count < max_retries:
         try:
-            response = gemini_client.models.generate_content(
-                model="gemini-2.5-flash-preview-05-20",
-                contents=prompt,
-                config=types.GenerateContentConfig(
-                    response_mime_type="application/json",
-                    response_schema=ContentModerationResult,
-                ),
-            )
-            return response.parsed
+            async with gemini_slot():
+                response = await gemini_client.aio.models.generate_content(
+                    model=GEMINI_MODERATION_MODEL,
+                    contents=prompt,
+                    config=_MODERATION_CONFIG,
+                )
+            return parse_json_response(response, ContentModerationResult)
 
         except Exception as e:
             retry_count += 1
-            if retry_count >= max_retries:
+            if retry_count >= max_retries or isinstance(e, CircuitOpenError):
                 print(
-                    f"Error in check_content_appropriateness after {max_retries} attempts: {str(e)}"
+                    f"Error in check_content_appropriateness after {retry_count} attempts: {str(e)}"
                 )
                 return None
-            time.sleep(1)  # Wait before retrying
+            await asyncio.sleep(backoff_delay(retry_count - 1, e))  # Wait before retrying
 
 
-def summarize_user_purpose(
+@llm_cached(PurposeSummaryResult)
+async def summarize_user_purpose(
     user_explanation: str,
     max_retries: int = 3,
 ) -> Optional[PurposeSummaryResult]:
@@ -139,21 +124,19 @@ Respond with a JSON object matching the PurposeSummaryResult schema:
     retry_count = 0
     while retry_count < max_retries:
         try:
-            response = gemini_client.models.generate_content(
-                model="gemini-2.5-flash-preview-05-20",
-                contents=prompt,
-                config=types.GenerateContentConfig(
-                    response_mime_type="application/json",
-                    response_schema=PurposeSummaryResult,
-                ),
-            )
-            return response.parsed
+            async with gemini_slot():
+                response = await gemini_client.aio.models.generate_content(
+                    model="gemini-2.5-flash-preview-05-20",
+                    contents=prompt,
+                    config=_PURPOSE_CONFIG,
+                )
+            return parse_json_response(response, PurposeSummaryResult)
 
         except Exception as e:
             retry_count += 1
-            if retry_count >= max_retries:
+            if retry_count >= max_retries or isinstance(e, CircuitOpenError):
                 print(
-                    f"Error in summarize_user_purpose after {max_retries} attempts: {str(e)}"
+                    f"Error in summarize_user_purpose after {retry_count} attempts: {str(e)}"
                 )
                 return None
-            time.sleep(1)  # Wait before retrying
+            await asyncio.sleep(backoff_delay(retry_count - 1, e))  # Wait before retrying
@@ -1,43 +1,56 @@
-from src.models.vocabulary import VocabularyList
-from .api import gemini_client
+from src.models.vocabulary import VOCABULARY_ITEMS_ADAPTER, VocabularyList, VocabularyItem
+from .api import (
+    CircuitOpenError,
+    backoff_delay,
+    gemini_client,
+    gemini_slot,
+    json_response_config,
+    parse_json_response,
+)
+from .json_stream import JsonArrayStreamParser
+from .llm_cache import llm_cached
+import asyncio
 import logging
-import time
-from typing import List, Optional, Dict, Set
+import re
+from typing import Any, AsyncIterator, Iterable, List, Optional, Dict, Tuple
 from pydantic import ValidationError
-from google.genai import types
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
+# Sık görülen İngilizce ekler; her ek farklı bir harfle bittiği için sondan ilk eşleşen
+# (en uzun kök) seçilir, "es" yerine "s" kaldırılır
+_SUFFIX_RE = re.compile(r"^(.{3,})(?:ing|est|ed|er|ly|es|s)$", re.DOTALL)
+# Prompt'a eklenen en fazla kök sayısı (prompt'un çok uzamaması için)
+EXCLUDED_ROOTS_LIMIT = 50
 
-def create_vocabulary_list(
-    purpose: str,
-    level: str,
-    learning_language: str,
-    system_language: str = "English",
-    excluded_words: List[Dict[str, str]] = None,
-    max_retries: int = 3,
-    retry_delay: float = 1.0,
-) -> VocabularyList:
-    """
-    Generate a vocabulary list for language learning.
+# Yanıt yapılandırması sabittir; her çağrıda yeniden oluşturulmaz
+_VOCABULARY_CONFIG = json_response_config(VocabularyList)
 
-    Args:
-        purpose: The purpose for learning (e.g., "travel", "business")
-        level: Proficiency level (e.g., "beginner", "intermediate", "advanced")
-        learning_language: The target language being learned
-        system_language: The user's native/system language for translations
-        excluded_words: List of words to avoid suggesting (previously seen words)
-        max_retries: Maximum number of retry attempts on failure
-        retry_delay: Delay between retries in seconds
 
-    Returns:
-        VocabularyList: A list of vocabulary items with words, meanings, related words, and emojis
+# Kelime listesi format kuralları tüm isteklerde aynıdır ve prompt'un başında yer alır
+_VOCABULARY_STATIC_PREFIX = """
+    **VOCABULARY LIST FORMAT:**
+    Each word should be relevant to the purpose and level specified below.
+    All texts should be lowercase.
+    Provide each word in the 'word' field (in the learning language ONLY), its meaning in the 'meaning' field (in the system language ONLY), and exactly 5 related words (in the system language ONLY) under 'relevantWords'.
+    For each word, also provide one relevant emoji in the 'emoji' field that represents the word visually. Do not include example sentences.
+    Ensure all fields are properly filled for every word.
+    Ensure that the vocabulary list is diverse and covers a range of topics related to the purpose.
+    Ensure that meanings are clear and concise.
+    Ensure that meanings are not sentences or contains any punctuation. Meanings should be a single word or a short phrase.
+    DO NOT mix languages within a single field. Each field must contain content in only one specified language.
+"""
 
-    Raises:
-        ValueError: If input parameters are invalid
-        Exception: If vocabulary generation fails after all retries
-    """
+
+def _build_vocabulary_prompt(
+    purpose: str,
+    level: str,
+    learning_language: str,
+    system_language: str,
+    excluded_words: Optional[List[Dict[str, str]]],
+) -> str:
+    """Validate the inputs and build the vocabulary generation prompt."""
     # Input validation
     if not purpose or not isinstance(purpose, str):
         raise ValueError("Purpose must be a non-empty string")
@@ -52,21 +65,14 @@ def create_vocabulary_list(
     excluded_words_str = ""
 
     if excluded_words and len(excluded_words) > 0:
-        # Extract words to avoid
-        words_to_avoid = [
-            item.get("word", "").strip().lower()
-            for item in excluded_words
-            if "word" in item
-        ]
-        word_roots_to_avoid = _extract_word_roots(words_to_avoid)
+        # Extract words to avoid (most recent first); stemming stops once enough
+        # distinct roots are collected instead of processing the whole history
+        words_to_avoid = (item["word"] for item in excluded_words if "word" in item)
+        word_roots_to_avoid = _extract_word_roots(words_to_avoid, EXCLUDED_ROOTS_LIMIT)
 
         if word_roots_to_avoid:
-            # Convert set to list before slicing
-            word_roots_list = list(word_roots_to_avoid)
             # Format the excluded words list for the prompt
-            excluded_words_str = ", ".join(
-                word_roots_list[:50]
-            )  # Limit to 50 to avoid too long prompts
+            excluded_words_str = ", ".join(word_roots_to_avoid)
 
     # Modify the prompt template based on whether we have excluded words
     exclusion_text = (
@@ -75,26 +81,19 @@ def create_vocabulary_list(
         else ""
     )
 
-    prompt = f"""
+    # Statik format kuralları önde; dil, seviye, amaç ve hariç tutulan kelimeler sonda
+    prompt = f"""{_VOCABULARY_STATIC_PREFIX}
     **CRITICAL LANGUAGE REQUIREMENTS:**
+    - The learning language is {learning_language} and the system language is {system_language}.
     - ALL vocabulary words MUST be written EXCLUSIVELY in {learning_language}. Do NOT use any other language for the words.
     - ALL meanings MUST be written EXCLUSIVELY in {system_language}. Do NOT use any other language for meanings.
     - ALL relevant words MUST be written EXCLUSIVELY in {system_language}. Do NOT use any other language for relevant words.
-    - DO NOT mix languages within a single field. Each field must contain content in only one specified language.
     - Verify language accuracy: {learning_language} words must follow {learning_language} spelling, grammar, and vocabulary conventions.
     - Verify language accuracy: {system_language} translations must follow {system_language} spelling, grammar, and vocabulary conventions.
-    
+
     Generate between 25 and 35 useful words for a {level} level learner studying {learning_language} for {purpose}.
     {exclusion_text}
-    Each word should be relevant to the purpose and level specified.
-    All texts should be lowercase. 
-    Provide each word in the 'word' field (in {learning_language} ONLY), its meaning in the 'meaning' (in {system_language} ONLY) field, and exactly 5 related words (in {system_language} ONLY) under 'relevantWords'. 
-    For each word, also provide one relevant emoji in the 'emoji' field that represents the word visually. Do not include example sentences. 
-    Ensure all fields are properly filled for every word.
-    Ensure that the vocabulary list is diverse and covers a range of topics related to the purpose.
-    Ensure that meanings are clear and concise.
-    Ensure that meanings are not sentences or contains any punctuation. Meanings should be a single word or a short phrase.
-    
+
     **LANGUAGE COMPLIANCE CHECK:** Before finalizing your response, verify that:
     1. Every 'word' field contains text ONLY in {learning_language}
     2. Every 'meaning' field contains text ONLY in {system_language}
@@ -102,6 +101,55 @@ def create_vocabulary_list(
     4. No fields contain mixed languages or incorrect language usage
     """
 
+    return prompt
+
+
+def _validate_vocabulary_output(output: Optional[VocabularyList]) -> None:
+    """Raise ValueError for unusable lists; relevantWords are normalized by VocabularyItem."""
+    # Validate the response structure and content
+    if not output or not hasattr(output, "words") or not output.words:
+        raise ValueError("API returned empty vocabulary list")
+
+    # Ensure minimum word count
+    if len(output.words) < 10:
+        raise ValueError(
+            f"Insufficient words returned: {len(output.words)} (minimum 10 required)"
+        )
+
+
+@llm_cached(VocabularyList)
+async def create_vocabulary_list(
+    purpose: str,
+    level: str,
+    learning_language: str,
+    system_language: str = "English",
+    excluded_words: List[Dict[str, str]] = None,
+    max_retries: int = 3,
+    retry_delay: float = 1.0,
+) -> VocabularyList:
+    """
+    Generate a vocabulary list for language learning.
+
+    Args:
+        purpose: The purpose for learning (e.g., "travel", "business")
+        level: Proficiency level (e.g., "beginner", "intermediate", "advanced")
+        learning_language: The target language being learned
+        system_language: The user's native/system language for translations
+        excluded_words: List of words to avoid suggesting (previously seen words)
+        max_retries: Maximum number of retry attempts on failure
+        retry_delay: Delay between retries in seconds
+
+    Returns:
+        VocabularyList: A list of vocabulary items with words, meanings, related words, and emojis
+
+    Raises:
+        ValueError: If input parameters are invalid
+        Exception: If vocabulary generation fails after all retries
+    """
+    prompt = _build_vocabulary_prompt(
+        purpose, level, learning_language, system_language, excluded_words
+    )
+
     # Initialize retry counter and success flag
     retries = 0
     success = False
@@ -114,47 +162,28 @@ def create_vocabulary_list(
                 f"Attempting vocabulary generation (attempt {retries+1}/{max_retries})"
             )
 
-            response = gemini_client.models.generate_content(
-                model="gemini-2.5-flash-preview-05-20",
-                contents=prompt,
-                config=types.GenerateContentConfig(
-                    response_mime_type="application/json",
-                    response_schema=VocabularyList,
-                ),
-            )
-
-            output = response.parsed
-
-            # Validate the response structure and content
-            if not output or not hasattr(output, "words") or not output.words:
-                raise ValueError("API returned empty vocabulary list")
-
-            # Ensure minimum word count
-            if len(output.words) < 10:
-                raise ValueError(
-                    f"Insufficient words returned: {len(output.words)} (minimum 10 required)"
+            async with gemini_slot():
+                response = await gemini_client.aio.models.generate_content(
+                    model="gemini-2.5-flash-preview-05-20",
+                    contents=prompt,
+                    config=_VOCABULARY_CONFIG,
                 )
 
-            # Validate individual words
-            for item in output.words:
-                if (
-                    not item.word
-                    or not item.meaning
-                    or not item.relevantWords
-                    or len(item.relevantWords) != 5
-                ):
-                    logger.warning(f"Incomplete vocabulary item detected: {item}")
-                    # Fix missing relevant words if needed
-                    if not item.relevantWords or len(item.relevantWords) < 5:
-                        item.relevantWords = _ensure_five_relevant_words(
-                            item.relevantWords
-                        )
+            output = parse_json_response(response, VocabularyList)
+
+            _validate_vocabulary_output(output)
 
             success = True
             logger.info(
                 f"Successfully generated vocabulary list with {len(output.words)} words"
             )
 
+        except CircuitOpenError as e:
+            # Gemini is failing right now; retrying would only wait on the open breaker
+            logger.error(f"Vocabulary generation skipped: {str(e)}")
+            last_error = e
+            break
+
         except ValidationError as e:
             logger.error(f"Pydantic validation error: {str(e)}")
             last_error = e
@@ -172,10 +201,10 @@ def create_vocabulary_list(
 
         # Only delay if we're going to retry
         if not success and retries < max_retries:
-            # Exponential backoff
-            sleep_time = retry_delay * (2 ** (retries - 1))
+            # Exponential backoff with full jitter (or Gemini's Retry-After)
+            sleep_time = backoff_delay(retries - 1, last_error, base=retry_delay)
             logger.info(f"Retrying in {sleep_time:.2f} seconds...")
-            time.sleep(sleep_time)
+            await asyncio.sleep(sleep_time)
 
     # If we couldn't generate valid vocabulary after all retries
     if not success:
@@ -186,45 +215,69 @@ def create_vocabulary_list(
     return output
 
 
-def _ensure_five_relevant_words(relevant_words: Optional[List[str]]) -> List[str]:
-    """Ensure there are exactly 5 relevant words"""
-    if not relevant_words:
-        relevant_words = []
-
-    # If we have more than 5, trim the list
-    if len(relevant_words) > 5:
-        return relevant_words[:5]
-
-    # If we have less than 5, add placeholders
-    while len(relevant_words) < 5:
-        relevant_words.append(f"related_word_{len(relevant_words)+1}")
-
-    return relevant_words
+async def stream_vocabulary_list(
+    purpose: str,
+    level: str,
+    learning_language: str,
+    system_language: str = "English",
+    excluded_words: List[Dict[str, str]] = None,
+) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Stream a vocabulary list from Gemini, yielding each word as soon as it is complete.
 
+    Yields ("word", VocabularyItem) for every word in generation order and finally
+    ("list", VocabularyList) with the validated list. There is no retry here since
+    words may already have been forwarded; errors are raised to the caller.
+    """
+    prompt = _build_vocabulary_prompt(
+        purpose, level, learning_language, system_language, excluded_words
+    )
 
-def _extract_word_roots(words: List[str]) -> Set[str]:
+    parser = JsonArrayStreamParser("words")
+    words: List[VocabularyItem] = []
+    async with gemini_slot():
+        stream = await gemini_client.aio.models.generate_content_stream(
+            model="gemini-2.5-flash-preview-05-20",
+            contents=prompt,
+            config=_VOCABULARY_CONFIG,
+        )
+        async for chunk in stream:
+            objects = parser.feed(chunk.text or "")
+            if not objects:
+                continue
+            # Aynı parçada tamamlanan kelimeler tek seferde doğrulanır
+            for word in VOCABULARY_ITEMS_ADAPTER.validate_python(objects):
+                words.append(word)
+                yield "word", word
+
+    if parser.finished:
+        # Kelimeler akış sırasında zaten doğrulandı; liste yeniden doğrulanmaz
+        output = VocabularyList.model_construct(words=words)
+    else:
+        # Dizi kapanmadıysa (yarım yanıt) tam doğrulama anlamlı hatayı üretir
+        output = VocabularyList.model_validate_json(parser.buffer)
+    _validate_vocabulary_output(output)
+    yield "list", output
+
+
+def _extract_word_roots(words: Iterable[str], limit: Optional[int] = None) -> List[str]:
     """
     Extract word roots to help identify similar word variations.
     This is a simplified implementation that could be improved with
     language-specific stemming algorithms.
+
+    Roots are returned without duplicates in input order; with a limit, the input is
+    only consumed until that many distinct roots have been found.
     """
-    roots = set()
+    # Basic stemming for common suffixes, at most one suffix is removed and at least
+    # three characters are kept. Note: For a production application, use a proper
+    # stemming library like nltk.stem or language-specific stemmers
+    roots: Dict[str, None] = {}
     for word in words:
+        word = word.strip().lower()
         if not word:
             continue
-
-        # Basic stemming for common suffixes
-        # Note: For a production application, use a proper stemming library
-        # like nltk.stem or language-specific stemmers
-        word = word.lower().strip()
-
-        # Remove very common suffixes (this is a simplified approach)
-        for suffix in ["ing", "ed", "s", "es", "er", "est", "ly"]:
-            if word.endswith(suffix) and len(word) > len(suffix) + 2:
-                word = word[: -len(suffix)]
-                break
-
-        # Add both the original word and the simplified root
-        roots.add(word)
-
-    return roots
+        roots[_SUFFIX_RE.sub(r"\1", word)] = None
+        if limit is not None and len(roots) >= limit:
+            break
+    return list(roots)
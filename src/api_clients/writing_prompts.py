@@ -1,45 +1,19 @@
 from src.models.writing import DetailedWritingResponse
-from .api import gemini_client
-from google.genai import types
+from .api import gemini_client, gemini_slot, json_response_config, parse_json_response
+from .llm_cache import llm_cached
+import functools
 
 
-def create_writing_prompt(
-    user_text: str,
-    question: str = "",
-    learning_language: str = "English",
-    system_language: str = "English",
-) -> str:
-    """
-    Create a prompt for writing evaluation using Gemini
-
-    Args:
-        user_text: The text submitted by the user for evaluation
-        question: The question or prompt that the user is responding to
-        learning_language: The language the user is learning/writing in
-        system_language: The user's preferred language for feedback
-
-    Returns:
-        Formatted prompt string ready to send to Gemini
-    """
-    # Language context information
-    language_context = f"""
-**--- CRITICAL LANGUAGE REQUIREMENTS ---**
-- The user is learning: {learning_language}
-- The user's text is written in: {learning_language}
-- IMPORTANT: Provide ALL feedback, suggestions, and comments EXCLUSIVELY in {system_language}. Do NOT use any other language for feedback.
-- IMPORTANT: Evaluate the text according to {learning_language} language standards, grammar rules, and conventions ONLY.
-- IMPORTANT: When assessing grammar, spelling, and vocabulary, apply {learning_language} rules exclusively.
-- Verify language accuracy: All feedback must be written in {system_language} and must be grammatically correct in {system_language}.
-- Do NOT mix languages in your feedback or evaluation.
+# Yanıt yapılandırması sabittir; her çağrıda yeniden oluşturulmaz
+_WRITING_CONFIG = json_response_config(DetailedWritingResponse)
 
-"""
 
-    base_prompt = f"""
+# Değerlendirme kriterleri ve çıktı formatı tüm kullanıcılar için aynıdır; prompt'un başında
+# bayt bayt aynı tutulduğunda Gemini'nin örtük önek önbelleği (implicit caching) devreye girer.
+# Dil ve kullanıcı metni gibi değişen kısımlar en sona eklenir.
+_WRITING_STATIC_PREFIX = """
 You are a meticulous text evaluation AI. Your task is to analyze the user-provided text based on the detailed criteria below and return your findings in a structured JSON format.
-
-{language_context}
-**--- Question/Prompt Being Answered ---**
-{question if question else "No specific question provided. Evaluate the text as a standalone piece of writing."}
+The learning language and the feedback language are given in the LANGUAGE REQUIREMENTS section after the rubric.
 
 **--- Evaluation Criteria & Scoring Rubric ---**
 
@@ -63,9 +37,9 @@ You are a meticulous text evaluation AI. Your task is to analyze the user-provid
     *   2: Poor - Lacks a clear structure; ideas are jumbled and difficult to follow.
     *   1: Very Poor - No discernible organization.
 
-**3. Use of {learning_language} (Score 1-5):** Evaluate the technical correctness of the writing in {learning_language}.
-*   **Grammar & Punctuation:** Are sentence structures grammatically correct according to {learning_language} grammar rules? Is punctuation used properly according to {learning_language} conventions?
-*   **Spelling & Word Choice:** Are all words spelled correctly in {learning_language}? Is the vocabulary appropriate for the context and used accurately in {learning_language}?
+**3. Use of the Learning Language (Score 1-5):** Evaluate the technical correctness of the writing in the learning language.
+*   **Grammar & Punctuation:** Are sentence structures grammatically correct according to the learning language's grammar rules? Is punctuation used properly according to its conventions?
+*   **Spelling & Word Choice:** Are all words spelled correctly in the learning language? Is the vocabulary appropriate for the context and used accurately?
 *   **Scoring Guide:**
     *   5: Excellent - No or very few minor errors.
     *   4: Good - A few minor errors in grammar, spelling, or punctuation that do not impede understanding.
@@ -73,35 +47,75 @@ You are a meticulous text evaluation AI. Your task is to analyze the user-provid
     *   2: Poor - Frequent and significant errors that make the text hard to read.
     *   1: Very Poor - Riddled with errors, making it largely incomprehensible.
 
-**--- CRITICAL OUTPUT INSTRUCTIONS ---**
-
-ABSOLUTE REQUIREMENT: All feedback text, suggestions, and comments must be written EXCLUSIVELY in {system_language}. The user expects to receive feedback in {system_language}.
-
-**LANGUAGE COMPLIANCE FOR OUTPUT:**
-- Every word in the "feedback" field must be in {system_language}
-- Every word in the "suggestion" field must be in {system_language}
-- Every word in the "error" field descriptions must be in {system_language}
-- Do NOT mix languages in any output field
-- Verify that your entire response is written in {system_language} before submitting
+**--- Output Structure ---**
 
 Return your analysis in the following JSON structure:
 
   "score": <overall score on scale of 0-100>,
   "feedback": "<overall feedback summary in 1-3 sentences>",
-  "details": {{
+  "details": {
     "content_score": <1-5 score for content>,
     "organization_score": <1-5 score for organization>,
     "language_score": <1-5 score for language usage>,
     "total_score": <sum of all scores, max 15>
-  }},
+  },
   "feedback_items": [
-    {{
+    {
       "type": "Grammar|Spelling|Punctuation|Style",
       "error": "<specific error text>",
       "suggestion": "<correction or improvement suggestion>"
-    }}
+    }
     Include 0-5 specific issues, if any found
   ]
+"""
+_WRITING_PROMPT_HEAD = _WRITING_STATIC_PREFIX.lstrip()
+
+
+@functools.lru_cache(maxsize=64)
+def _language_context(learning_language: str, system_language: str) -> str:
+    """Language requirements block; identical for every text in the same language pair."""
+    return f"""
+**--- CRITICAL LANGUAGE REQUIREMENTS ---**
+- The user is learning: {learning_language}
+- The user's text is written in: {learning_language}
+- IMPORTANT: Provide ALL feedback, suggestions, and comments EXCLUSIVELY in {system_language}. Do NOT use any other language for feedback.
+- IMPORTANT: Evaluate the text according to {learning_language} language standards, grammar rules, and conventions ONLY.
+- IMPORTANT: When assessing grammar, spelling, and vocabulary, apply {learning_language} rules exclusively.
+- Verify language accuracy: All feedback must be written in {system_language} and must be grammatically correct in {system_language}.
+- Do NOT mix languages in your feedback or evaluation.
+
+ABSOLUTE REQUIREMENT: All feedback text, suggestions, and comments must be written EXCLUSIVELY in {system_language}. The user expects to receive feedback in {system_language}.
+
+**LANGUAGE COMPLIANCE FOR OUTPUT:**
+- Every word in the "feedback" field must be in {system_language}
+- Every word in the "suggestion" field must be in {system_language}
+- Every word in the "error" field descriptions must be in {system_language}
+- Do NOT mix languages in any output field
+- Verify that your entire response is written in {system_language} before submitting
+"""
+
+
+def create_writing_prompt(
+    user_text: str,
+    question: str = "",
+    learning_language: str = "English",
+    system_language: str = "English",
+) -> str:
+    """
+    Create a prompt for writing evaluation using Gemini
+
+    Args:
+        user_text: The text submitted by the user for evaluation
+        question: The question or prompt that the user is responding to
+        learning_language: The language the user is learning/writing in
+        system_language: The user's preferred language for feedback
+
+    Returns:
+        Formatted prompt string ready to send to Gemini
+    """
+    dynamic_suffix = f"""
+**--- Question/Prompt Being Answered ---**
+{question if question else "No specific question provided. Evaluate the text as a standalone piece of writing."}
 
 **--- Text to Evaluate ---**
 {user_text}
@@ -112,13 +126,20 @@ Before submitting your response, verify that:
 2. ALL suggestions are written ONLY in {system_language}
 3. ALL error descriptions are written ONLY in {system_language}
 4. You evaluated the text according to {learning_language} standards
-5. No mixing of languages occurred in your response
-"""
-
-    return base_prompt.strip()
+5. No mixing of languages occurred in your response"""
+
+    # Prompt tek bir birleştirmeyle kurulur; öndeki ve sondaki boşluklar önceden kırpılmıştır
+    return "".join(
+        (
+            _WRITING_PROMPT_HEAD,
+            _language_context(learning_language, system_language),
+            dynamic_suffix,
+        )
+    )
 
 
-def send_writing_prompt_to_gemini(
+@llm_cached(DetailedWritingResponse)
+async def send_writing_prompt_to_gemini(
     user_text: str,
     question: str = "",
     learning_language: str = "English",
@@ -142,14 +163,11 @@ def send_writing_prompt_to_gemini(
     )
 
     # Use structured outputs with the DetailedWritingResponse schema
-    # Note: gemini_client.models.generate_content is synchronous, not async
-    response = gemini_client.models.generate_content(
-        model="gemini-2.5-flash-preview-05-20",
-        contents=prompt,
-        config=types.GenerateContentConfig(
-            response_mime_type="application/json",
-            response_schema=DetailedWritingResponse,
-        ),
-    )
-
-    return response.parsed
+    async with gemini_slot():
+        response = await gemini_client.aio.models.generate_content(
+            model="gemini-2.5-flash-preview-05-20",
+            contents=prompt,
+            config=_WRITING_CONFIG,
+        )
+
+    return parse_json_response(response, DetailedWritingResponse)
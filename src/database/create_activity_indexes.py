@@ -0,0 +1,213 @@
+"""
+Create compound indexes for per-user activity collections (events, pyramids, saved sentences/vocabularies, word statistics)
+"""
+
+from pymongo import DeleteMany, IndexModel, UpdateOne
+from src.database.database import (
+    pyramid_table,
+    user_events_table,
+    saved_sentence_table,
+    saved_vocabulary_table,
+    vocabulary_statistics_table,
+)
+from src.models.saved_sentence import compute_sentence_hash
+from src.models.vocabulary import VocabularyStatistics
+import logging
+
+logger = logging.getLogger(__name__)
+
+def backfill_sentence_hashes(batch_size: int = 1000) -> int:
+    """
+    Set sentence_hash on saved sentences stored before the field existed, then remove
+    duplicates of the same (user_id, sentence_hash) so the unique index can be built
+    """
+    updated = 0
+    batch = []
+    cursor = saved_sentence_table.find(
+        {"sentence_hash": {"$exists": False}}, {"sentence": 1, "meaning": 1}
+    )
+    for doc in cursor:
+        batch.append(UpdateOne(
+            {"_id": doc["_id"]},
+            {"$set": {"sentence_hash": compute_sentence_hash(doc["sentence"], doc["meaning"])}}
+        ))
+        if len(batch) >= batch_size:
+            updated += saved_sentence_table.bulk_write(batch, ordered=False).modified_count
+            batch = []
+    if batch:
+        updated += saved_sentence_table.bulk_write(batch, ordered=False).modified_count
+
+    removed = remove_duplicate_saved_sentences()
+    if removed:
+        logger.info(f"Removed {removed} duplicate saved sentences")
+    return updated
+
+def remove_duplicate_saved_sentences() -> int:
+    """
+    Keep only the most recently saved copy of each sentence per user
+    (the old check-then-insert save could store the same sentence twice)
+    """
+    duplicates = saved_sentence_table.aggregate([
+        {"$sort": {"saved_at": -1}},
+        {"$group": {
+            "_id": {"user_id": "$user_id", "sentence_hash": "$sentence_hash"},
+            "ids": {"$push": "$_id"},
+            "count": {"$sum": 1},
+        }},
+        {"$match": {"count": {"$gt": 1}}},
+    ], allowDiskUse=True)
+    batch = [DeleteMany({"_id": {"$in": group["ids"][1:]}}) for group in duplicates]
+    if not batch:
+        return 0
+    return saved_sentence_table.bulk_write(batch, ordered=False).deleted_count
+
+def backfill_difficulty_scores(batch_size: int = 1000) -> int:
+    """
+    Store difficulty_score on word statistics written before the score was persisted
+    """
+    updated = 0
+    cursor = vocabulary_statistics_table.find(
+        {"difficulty_score": {"$exists": False}},
+        {
+            "letter_hints": 1,
+            "relevant_word_hints": 1,
+            "emoji_hints": 1,
+            "successful_attempts": 1,
+            "failed_attempts": 1,
+        },
+    ).batch_size(batch_size)
+    docs = []
+    for doc in cursor:
+        docs.append(doc)
+        if len(docs) >= batch_size:
+            updated += _write_difficulty_scores(docs)
+            docs = []
+    if docs:
+        updated += _write_difficulty_scores(docs)
+    return updated
+
+def _write_difficulty_scores(docs: list) -> int:
+    scores = VocabularyStatistics.bulk_difficulty_scores(docs)
+    batch = [
+        UpdateOne({"_id": doc["_id"]}, {"$set": {"difficulty_score": score}})
+        for doc, score in zip(docs, scores)
+    ]
+    return vocabulary_statistics_table.bulk_write(batch, ordered=False).modified_count
+
+def create_activity_indexes():
+    """
+    Create indexes matching the user_id-filtered, time-sorted queries of the services
+    """
+    try:
+        user_events_table.create_indexes([
+            # User event history, newest first
+            IndexModel([
+                ("user_id", 1),
+                ("timestamp", -1)
+            ], name="user_timeline"),
+
+            # Event history filtered by type (recent learning events, completed vocabulary events)
+            IndexModel([
+                ("user_id", 1),
+                ("event_type", 1),
+                ("timestamp", -1)
+            ], name="user_event_type_timeline"),
+
+            # Latest event of a specific activity (e.g. the current pyramid session)
+            IndexModel([
+                ("user_id", 1),
+                ("event_type", 1),
+                ("event_id", 1),
+                ("timestamp", -1)
+            ], name="user_activity_latest"),
+        ])
+
+        # Pyramid list is paged with an (updated_at, _id) keyset; replaces the created_at indexes
+        for old_index in ("user_pyramids_recent", "user_pyramids_status_recent"):
+            if old_index in pyramid_table.index_information():
+                pyramid_table.drop_index(old_index)
+        pyramid_table.create_indexes([
+            # Pyramid list, most recently updated first
+            IndexModel([
+                ("user_id", 1),
+                ("updated_at", -1),
+                ("_id", -1)
+            ], name="user_pyramids_updated"),
+
+            # Pyramid list filtered by completion status
+            IndexModel([
+                ("user_id", 1),
+                ("completed", 1),
+                ("updated_at", -1),
+                ("_id", -1)
+            ], name="user_pyramids_status_updated"),
+        ])
+
+        saved_sentence_table.create_indexes([
+            # Saved sentences list, most recent first
+            IndexModel([
+                ("user_id", 1),
+                ("saved_at", -1)
+            ], name="user_saved_at"),
+        ])
+
+        # Save/check/delete look sentences up by a 16-byte hash of (sentence, meaning)
+        # instead of indexing the two long strings
+        backfilled = backfill_sentence_hashes()
+        if backfilled:
+            logger.info(f"Backfilled sentence_hash on {backfilled} saved sentences")
+        # The old index is dropped only after the new one exists, so lookups are never unindexed
+        saved_sentence_table.create_index([
+            ("user_id", 1),
+            ("sentence_hash", 1)
+        ], name="user_sentence_hash", unique=True)
+        if "user_sentence_lookup" in saved_sentence_table.index_information():
+            saved_sentence_table.drop_index("user_sentence_lookup")
+
+        saved_vocabulary_table.create_indexes([
+            # One entry per saved word; also serves save/check/delete lookups
+            IndexModel([
+                ("user_id", 1),
+                ("word", 1),
+                ("meaning", 1)
+            ], name="user_saved_word", unique=True),
+
+            # Saved vocabulary list in save order
+            IndexModel([
+                ("user_id", 1),
+                ("saved_at", 1)
+            ], name="user_saved_vocabulary_at"),
+        ])
+
+        vocabulary_statistics_table.create_indexes([
+            # Per-word statistics updates (hints, attempts)
+            IndexModel([
+                ("user_id", 1),
+                ("word", 1),
+                ("meaning", 1)
+            ], name="user_word_lookup"),
+
+            # Recently seen words, newest first
+            IndexModel([
+                ("user_id", 1),
+                ("last_seen", -1)
+            ], name="user_last_seen"),
+
+            # Hardest words first (stored difficulty_score)
+            IndexModel([
+                ("user_id", 1),
+                ("difficulty_score", -1)
+            ], name="user_difficulty"),
+        ])
+
+        backfilled = backfill_difficulty_scores()
+        if backfilled:
+            logger.info(f"Backfilled difficulty_score on {backfilled} word statistics")
+
+        logger.info("Successfully created activity indexes")
+
+    except Exception as e:
+        logger.error(f"Error creating activity indexes: {str(e)}")
+
+if __name__ == "__main__":
+    create_activity_indexes()
@@ -0,0 +1,32 @@
+"""
+Create database indexes for the LLM response cache
+"""
+
+from src.database.database import llm_cache_table
+from src.api_clients.llm_cache import LLM_CACHE_TTL_SECONDS
+import logging
+
+logger = logging.getLogger(__name__)
+
+def create_llm_cache_indexes():
+    """
+    Create indexes on the LLM response cache collection
+    """
+    try:
+        # Exact-match lookups by prompt hash
+        llm_cache_table.create_index([
+            ("prompt_hash", 1)
+        ], name="prompt_hash_lookup", unique=True)
+
+        # MongoDB removes expired entries automatically
+        llm_cache_table.create_index([
+            ("created_at", 1)
+        ], name="llm_cache_ttl", expireAfterSeconds=LLM_CACHE_TTL_SECONDS)
+
+        logger.info("Successfully created LLM cache indexes")
+
+    except Exception as e:
+        logger.error(f"Error creating LLM cache indexes: {str(e)}")
+
+if __name__ == "__main__":
+    create_llm_cache_indexes()
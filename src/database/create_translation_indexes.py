@@ -2,52 +2,86 @@
 Create database indexes for translation cache to improve performance
 """
 
+from pymongo import DeleteMany, IndexModel
 from src.database.database import translation_cache_table
 import logging
 
 logger = logging.getLogger(__name__)
 
+def remove_duplicate_question_cache_entries() -> int:
+    """
+    Keep only the most recently used entry per cache_key (earlier versions allowed duplicates)
+    """
+    removed = 0
+    duplicates = translation_cache_table.aggregate([
+        {"$match": {"cache_key": {"$exists": True}}},
+        {"$sort": {"last_used": -1}},
+        {"$group": {"_id": "$cache_key", "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+    ], allowDiskUse=True)
+    batch = [DeleteMany({"_id": {"$in": group["ids"][1:]}}) for group in duplicates]
+    if batch:
+        removed = translation_cache_table.bulk_write(batch, ordered=False).deleted_count
+    return removed
+
 def create_translation_cache_indexes():
     """
     Create indexes on translation cache collection for optimal performance
     """
     try:
-        # Index for text translation lookups
-        translation_cache_table.create_index([
-            ("text_hash", 1),
-            ("source_language", 1),
-            ("target_language", 1)
-        ], name="text_translation_lookup")
-        
-        # Index for question cache lookups
-        translation_cache_table.create_index([
-            ("cache_key", 1)
-        ], name="question_cache_lookup")
-        
-        # Index for cache cleanup (by last_used date)
-        translation_cache_table.create_index([
-            ("last_used", 1)
-        ], name="cache_cleanup")
-        
-        # Index for question-specific cache clearing
-        translation_cache_table.create_index([
-            ("question_id", 1)
-        ], name="question_cache_clear")
-        
-        # Index for language-specific cache clearing
-        translation_cache_table.create_index([
-            ("target_language", 1)
-        ], name="language_cache_clear")
-        
-        # Index for usage statistics
-        translation_cache_table.create_index([
-            ("usage_count", -1)
-        ], name="usage_stats")
-        
+        # question_cache_lookup was a plain index before; recreating it under the same name
+        # as unique would fail with IndexOptionsConflict, so duplicates and the old index go first
+        existing = translation_cache_table.index_information()
+        if "question_cache_lookup" in existing and not existing["question_cache_lookup"].get("unique"):
+            removed = remove_duplicate_question_cache_entries()
+            if removed:
+                logger.info(f"Removed {removed} duplicate question cache entries")
+            translation_cache_table.drop_index("question_cache_lookup")
+
+        translation_cache_table.create_indexes([
+            # Index for text translation lookups
+            IndexModel([
+                ("text_hash", 1),
+                ("source_language", 1),
+                ("target_language", 1)
+            ], name="text_translation_lookup"),
+
+            # Index for question cache lookups (only question entries carry a cache_key)
+            IndexModel([
+                ("cache_key", 1)
+            ], name="question_cache_lookup", unique=True,
+                partialFilterExpression={"cache_key": {"$exists": True}}),
+
+            # Index for cache cleanup (by last_used date)
+            IndexModel([
+                ("last_used", 1)
+            ], name="cache_cleanup"),
+
+            # Index for question-specific cache clearing
+            IndexModel([
+                ("question_id", 1)
+            ], name="question_cache_clear"),
+
+            # Index for language-specific cache clearing and per-language cleanup scans
+            IndexModel([
+                ("target_language", 1),
+                ("last_used", 1)
+            ], name="language_last_used"),
+
+            # Index for usage statistics
+            IndexModel([
+                ("usage_count", -1)
+            ], name="usage_stats"),
+        ])
+
+        # The single-field language index is covered by language_last_used
+        if "language_cache_clear" in translation_cache_table.index_information():
+            translation_cache_table.drop_index("language_cache_clear")
+
         logger.info("Successfully created translation cache indexes")
         
     except Exception as e:
         logger.error(f"Error creating translation cache indexes: {str(e)}")
 
 if __name__ == "__main__":
-    create_translation_cache_indexes()
\ No newline at end of file
+    create_translation_cache_indexes()
@@ -1,12 +1,29 @@
+from anyio import to_thread
 from pymongo.mongo_client import MongoClient
 from pymongo.server_api import ServerApi
-from src.settings import DATABASE_URL
+from src.settings import (
+    DATABASE_URL,
+    MONGO_COMPRESSORS,
+    MONGO_MAX_POOL_SIZE,
+    MONGO_MIN_POOL_SIZE,
+)
 
-client = MongoClient(DATABASE_URL, server_api=ServerApi("1"))
+# MongoClient bağlantıları arka planda açar; import sırasında sunucuya istek atılmaz
+client = MongoClient(
+    DATABASE_URL,
+    server_api=ServerApi("1"),
+    maxPoolSize=MONGO_MAX_POOL_SIZE,
+    minPoolSize=MONGO_MIN_POOL_SIZE,
+    compressors=MONGO_COMPRESSORS,
+    serverSelectionTimeoutMS=3000,
+    socketTimeoutMS=10000,
+    retryWrites=True,
+)
 db = client["Edifica"]
 user_table = db["User"]
 pyramid_table = db["Pyramid"]
 saved_sentence_table = db["SavedSentence"]
+saved_vocabulary_table = db["SavedVocabulary"]
 vocabulary_table = db["Vocabulary"]
 writing_table = db["Writing"]
 writing_answer_table = db["WritingAnswer"]
@@ -14,9 +31,14 @@ user_progress_table = db["UserProgress"]
 user_events_table = db["UserEvent"]
 vocabulary_statistics_table = db["VocabularyStatistic"]
 translation_cache_table = db["TranslationCache"]
+llm_cache_table = db["LLMCache"]
 
-try:
-    client.admin.command("ping")
-    print("Pinged your deployment. You successfully connected to MongoDB!")
-except Exception as e:
-    print(e)
+
+async def healthcheck() -> bool:
+    """Ping the deployment without blocking the event loop."""
+    try:
+        await to_thread.run_sync(client.admin.command, "ping")
+        return True
+    except Exception as e:
+        print(e)
+        return False
@@ -0,0 +1,52 @@
+"""
+Move saved vocabulary words embedded in User documents into the SavedVocabulary collection
+"""
+
+from pymongo import UpdateOne
+from src.database.database import user_table, saved_vocabulary_table
+import logging
+
+logger = logging.getLogger(__name__)
+
+def migrate_saved_vocabularies() -> int:
+    """
+    Copy each user's embedded saved_vocabularies into SavedVocabulary and remove the array
+
+    Returns:
+        Number of saved vocabulary entries written
+    """
+    migrated = 0
+    try:
+        cursor = user_table.find(
+            {"saved_vocabularies": {"$exists": True}}, {"saved_vocabularies": 1}
+        )
+        for user in cursor:
+            user_id = str(user["_id"])
+            operations = [
+                # Upsert keeps the migration re-runnable and skips duplicates in old arrays
+                UpdateOne(
+                    {"user_id": user_id, "word": item.get("word"), "meaning": item.get("meaning")},
+                    {"$setOnInsert": {
+                        "relevantWords": item.get("relevantWords", []),
+                        "emoji": item.get("emoji"),
+                        "saved_at": item.get("saved_at"),
+                    }},
+                    upsert=True,
+                )
+                for item in user.get("saved_vocabularies") or []
+            ]
+            if operations:
+                result = saved_vocabulary_table.bulk_write(operations, ordered=False)
+                migrated += result.upserted_count
+
+            user_table.update_one({"_id": user["_id"]}, {"$unset": {"saved_vocabularies": ""}})
+
+        logger.info(f"Migrated {migrated} saved vocabulary entries")
+
+    except Exception as e:
+        logger.error(f"Error migrating saved vocabularies: {str(e)}")
+
+    return migrated
+
+if __name__ == "__main__":
+    migrate_saved_vocabularies()
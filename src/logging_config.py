@@ -0,0 +1,62 @@
+import logging
+import queue
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+LOG_FORMAT = "time=%(asctime)s level=%(levelname)s logger=%(name)s msg=%(message)s"
+# Aynı log kaydının tekrar yazılması için beklenecek süre (saniye)
+RATE_LIMIT_INTERVAL_SECONDS = 10.0
+RATE_LIMIT_MAX_KEYS = 1024
+
+
+class RateLimitFilter(logging.Filter):
+    """Drop repeats of the same log call (logger, level, message, args, exception type) within a time window."""
+
+    def __init__(self, interval: float = RATE_LIMIT_INTERVAL_SECONDS):
+        super().__init__()
+        self.interval = interval
+        self._last_emitted = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        # Aynı mesajla loglanan farklı hata türleri birbirini bastırmasın
+        exc_type = record.exc_info[0] if record.exc_info else None
+        try:
+            key = (record.name, record.levelno, record.msg, record.args, exc_type)
+            hash(key)
+        except TypeError:
+            key = (record.name, record.levelno, record.msg, exc_type)
+
+        now = time.monotonic()
+        last = self._last_emitted.get(key)
+        if last is not None and now - last < self.interval:
+            return False
+
+        if len(self._last_emitted) >= RATE_LIMIT_MAX_KEYS:
+            self._last_emitted.clear()
+        self._last_emitted[key] = now
+        return True
+
+
+def setup_logging(level: int = logging.INFO) -> QueueListener:
+    """
+    Route all log records through a queue so that formatting and stream I/O run on a
+    background thread instead of the event loop.
+
+    Returns:
+        The started QueueListener; call stop() on shutdown to flush remaining records
+    """
+    log_queue = queue.SimpleQueue()
+
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.addFilter(RateLimitFilter())
+
+    root_logger = logging.getLogger()
+    root_logger.setLevel(level)
+    root_logger.addHandler(queue_handler)
+
+    listener.start()
+    return listener
@@ -0,0 +1,117 @@
+from typing import Iterable, List, Tuple
+
+# Minimal, saf ASGI CORS katmanı. Preflight (OPTIONS) yanıtları önceden hazırlanır
+# ve uygulamaya hiç ulaşmadan döndürülür; diğer isteklerde başlıklar yalnızca
+# http.response.start mesajına eklenir.
+
+Headers = List[Tuple[bytes, bytes]]
+
+
+class FastCORS:
+    def __init__(
+        self,
+        app,
+        allow_origins: Iterable[str] = ("*",),
+        allow_methods: Iterable[str] = ("*",),
+        allow_headers: Iterable[str] = ("*",),
+        allow_credentials: bool = False,
+        expose_headers: Iterable[str] = (),
+        max_age: int = 600,
+    ):
+        self.app = app
+        self.allow_origins = frozenset(allow_origins)
+        self.allow_all_origins = "*" in self.allow_origins
+        self.allow_all_headers = "*" in allow_headers
+        self.allow_credentials = allow_credentials
+
+        if "*" in allow_methods:
+            allow_methods = ("DELETE", "GET", "HEAD", "OPTIONS", "PATCH", "POST", "PUT")
+
+        # Origin'den bağımsız başlıklar bir kez hesaplanır
+        self.simple_headers: Headers = []
+        self.preflight_headers: Headers = [
+            (b"access-control-allow-methods", ", ".join(allow_methods).encode("latin-1")),
+            (b"access-control-max-age", str(max_age).encode("latin-1")),
+            (b"content-length", b"2"),
+            (b"content-type", b"text/plain; charset=utf-8"),
+        ]
+        if not self.allow_all_headers:
+            self.preflight_headers.append(
+                (b"access-control-allow-headers", ", ".join(allow_headers).encode("latin-1"))
+            )
+        if allow_credentials:
+            self.simple_headers.append((b"access-control-allow-credentials", b"true"))
+            self.preflight_headers.append((b"access-control-allow-credentials", b"true"))
+        expose_headers = list(expose_headers)
+        if expose_headers:
+            # Tarayıcıdaki istemcilerin okuyabileceği yanıt başlıkları (ör. sayfalama imleci)
+            self.simple_headers.append(
+                (b"access-control-expose-headers", ", ".join(expose_headers).encode("latin-1"))
+            )
+
+        # Kimlik bilgisi gerektirmeyen, tüm origin'lere açık yapılandırmada "*" döndürülebilir
+        self.wildcard_origin = self.allow_all_origins and not allow_credentials
+
+        # Sabit origin listesinde her origin için tam başlık listeleri önceden hazırlanır
+        self.simple_headers_by_origin = {}
+        self.preflight_headers_by_origin = {}
+        if not self.allow_all_origins:
+            for allowed_origin in self.allow_origins:
+                origin_bytes = allowed_origin.encode("latin-1")
+                origin_headers = self._origin_headers(origin_bytes)
+                self.simple_headers_by_origin[origin_bytes] = (
+                    self.simple_headers + origin_headers
+                )
+                self.preflight_headers_by_origin[origin_bytes] = (
+                    self.preflight_headers + origin_headers
+                )
+
+    def _origin_headers(self, origin: bytes) -> Headers:
+        if self.wildcard_origin:
+            return [(b"access-control-allow-origin", b"*")]
+        return [(b"access-control-allow-origin", origin), (b"vary", b"Origin")]
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        origin = None
+        request_method = None
+        request_headers = None
+        for name, value in scope["headers"]:
+            if name == b"origin":
+                origin = value
+            elif name == b"access-control-request-method":
+                request_method = value
+            elif name == b"access-control-request-headers":
+                request_headers = value
+
+        if origin is None or not (
+            self.allow_all_origins or origin in self.simple_headers_by_origin
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        if scope["method"] == "OPTIONS" and request_method is not None:
+            headers = self.preflight_headers_by_origin.get(origin)
+            if headers is None:
+                headers = self.preflight_headers + self._origin_headers(origin)
+            else:
+                headers = list(headers)
+            if self.allow_all_headers and request_headers:
+                headers.append((b"access-control-allow-headers", request_headers))
+            await send({"type": "http.response.start", "status": 200, "headers": headers})
+            await send({"type": "http.response.body", "body": b"OK"})
+            return
+
+        extra_headers = self.simple_headers_by_origin.get(origin)
+        if extra_headers is None:
+            extra_headers = self.simple_headers + self._origin_headers(origin)
+
+        async def send_with_cors(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + extra_headers
+            await send(message)
+
+        await self.app(scope, receive, send_with_cors)
@@ -1,6 +1,5 @@
-from typing import List, TypeVar, Generic, Union, Literal, Optional  # Optional eklendi
-from bson import ObjectId
-from pydantic import BaseModel, Field  # Field eklendi
+from typing import Annotated, List, Tuple, TypeVar, Generic, Union, Literal, Optional  # Optional eklendi
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter  # Field eklendi
 from datetime import datetime  # datetime eklendi
 
 
@@ -49,9 +48,9 @@ class PyramidItemBase(BaseModel, Generic[T]):
     options: List[T]
     selected_option: Optional[int] = None  # Kullanıcının seçtiği opsiyonun indeksi
     selected_sentence: Optional[str] = None  # Seçilen opsiyona karşılık gelen cümle
-    option_words: List[str] = Field(
-        default_factory=list
-    )  # Affected sentence elements to avoid repetition
+    # Affected sentence elements to avoid repetition. Boş tuple tüm örnekler arasında
+    # paylaşılır; alan yerinde değiştirilmez, servisler yeni bir liste atar.
+    option_words: Tuple[str, ...] = ()
 
 
 # Literal step_type kullanan özelleşmiş sınıflar
@@ -73,11 +72,26 @@ class PyramidParaphItem(
     step_type: Literal["paraphrase"] = "paraphrase"
 
 
-# Tüm piramit adımları için Union tipi
-PyramidItem = Union[
-    PyramidExpandItem, PyramidShrinkItem, PyramidReplaceItem, PyramidParaphItem
+# Tüm piramit adımları için Union tipi. step_type alanı ayırıcı (discriminator) olarak
+# kullanıldığı için doğrulama her varyantı sırayla denemek yerine doğrudan doğru modele gider.
+PyramidItem = Annotated[
+    Union[PyramidExpandItem, PyramidShrinkItem, PyramidReplaceItem, PyramidParaphItem],
+    Field(discriminator="step_type"),
 ]
 
+# Tek bir adımı doğrulamak için modül yüklenirken bir kez derlenen doğrulayıcı
+PYRAMID_ITEM_ADAPTER = TypeAdapter(PyramidItem)
+
+
+# Birden fazla cümle için adım seçeneklerini tek istekte üretmek amacıyla kullanılan modeller
+class PyramidBatchRequestItem(BaseModel):
+    step_type: Literal["expand", "shrink", "replace", "paraphrase"]
+    sentence: str
+
+
+class PyramidBatchRequest(BaseModel):
+    items: List[PyramidBatchRequestItem] = Field(..., min_length=1, max_length=20)
+
 
 # Veritabanı ve ana iş mantığı için kullanılacak model
 class Pyramid(BaseModel):
@@ -88,14 +102,12 @@ class Pyramid(BaseModel):
     total_steps: int
     last_step: int  # 0-indexed
     completed: bool = False
-    created_at: datetime = Field(default_factory=datetime.now)
-    updated_at: datetime = Field(default_factory=datetime.now)
+    # Zaman damgaları oluşturma sırasında açıkça (UTC) verilir; DB'den okunan belgelerde
+    # her zaman bulunduğu için varsayılan fabrika çalıştırılmaz.
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
 
-    class Config:
-        populate_by_name = True  # Alias'ların çalışması için
-        json_encoders = {
-            ObjectId: str
-        }  # ObjectId'nin str'ye çevrilmesi için (eğer ObjectId direkt modelde kullanılırsa)
+    model_config = ConfigDict(populate_by_name=True)  # Alias'ların çalışması için
 
 
 # API çıktısı için model (DB'den gelen _id'yi id olarak sunar)
@@ -109,6 +121,15 @@ class PyramidOut(BaseModel):
     # İstenirse created_at, updated_at da eklenebilir
 
 
+# Yalnızca mevcut adımı döndüren hafif API çıktısı (diğer adımlar okunmaz)
+class PyramidCurrentOut(BaseModel):
+    id: str
+    step_index: int
+    total_steps: int
+    completed: bool = False
+    step: PyramidItem
+
+
 # Bu model artık doğrudan Pyramid modeli içinde ele alındığı için gereksiz olabilir.
 # class PyramidIn(Pyramid): # DB'ye yazılacak model için _id yerine id alabilir
 #     pass
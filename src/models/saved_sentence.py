@@ -1,11 +1,22 @@
+import hashlib
+from dataclasses import dataclass, field
 from typing import Optional
-from pydantic import BaseModel, Field
+from pydantic import dataclasses as pydantic_dataclasses
 from datetime import datetime
 
 
-class SavedSentence(BaseModel):
+def compute_sentence_hash(sentence: str, meaning: str) -> bytes:
+    """16-byte key for (sentence, meaning); indexed instead of the two long strings"""
+    return hashlib.blake2b(
+        sentence.encode("utf-8") + b"\0" + meaning.encode("utf-8"), digest_size=16
+    ).digest()
+
+
+# Yalnızca servis içinde oluşturulup MongoDB'ye yazılan kayıt; doğrulama gerekmediği için dataclass
+@dataclass(slots=True)
+class SavedSentence:
     """Model for saved sentences from pyramid exercises"""
-    
+
     user_id: str
     sentence: str  # The sentence that was saved (could be original or transformed)
     meaning: str  # The meaning/translation of the sentence
@@ -13,10 +24,16 @@ class SavedSentence(BaseModel):
     source_sentence: str  # The original sentence before transformation
     pyramid_id: Optional[str] = None  # Reference to the pyramid this came from
     step_number: Optional[int] = None  # Which step in the pyramid
-    saved_at: datetime = Field(default_factory=datetime.utcnow)
+    saved_at: datetime = field(default_factory=datetime.utcnow)
+    sentence_hash: bytes = field(init=False)  # compute_sentence_hash(sentence, meaning)
+
+    def __post_init__(self):
+        self.sentence_hash = compute_sentence_hash(self.sentence, self.meaning)
 
 
-class SaveSentenceRequest(BaseModel):
+# İstek gövdeleri yalnızca okunup atıldığı için slots'lu, değiştirilemez Pydantic dataclass'ları
+@pydantic_dataclasses.dataclass(frozen=True, slots=True)
+class SaveSentenceRequest:
     """Request model for saving a sentence"""
     
     sentence: str
@@ -27,14 +44,16 @@ class SaveSentenceRequest(BaseModel):
     step_number: Optional[int] = None
 
 
-class DeleteSavedSentenceRequest(BaseModel):
+@pydantic_dataclasses.dataclass(frozen=True, slots=True)
+class DeleteSavedSentenceRequest:
     """Request model for deleting a saved sentence"""
     
     sentence: str
     meaning: str
 
 
-class CheckSavedSentenceRequest(BaseModel):
+@pydantic_dataclasses.dataclass(frozen=True, slots=True)
+class CheckSavedSentenceRequest:
     """Request model for checking if a sentence is saved"""
     
     sentence: str
@@ -1,41 +1,44 @@
-from pydantic import BaseModel, Field
-from typing import Optional
+from dataclasses import dataclass, field
 from datetime import datetime
+from typing import Optional
+
+# Bu kayıtlar yalnızca servis içinde oluşturulup MongoDB'ye yazılır (API sınırından geçmez);
+# doğrulama gerektirmedikleri için Pydantic yerine slots'lu dataclass kullanılır.
 
 
-class TranslationCache(BaseModel):
+@dataclass(slots=True)
+class TranslationCache:
     """Model for caching translations to avoid repeated API calls"""
-    
-    original_text: str = Field(..., description="Original text to be translated")
-    translated_text: str = Field(..., description="Translated text")
-    source_language: str = Field(..., description="Source language code")
-    target_language: str = Field(..., description="Target language code")
-    text_hash: str = Field(..., description="Hash of original text for fast lookup")
-    created_at: datetime = Field(default_factory=datetime.utcnow, description="When the translation was cached")
-    last_used: datetime = Field(default_factory=datetime.utcnow, description="When the translation was last accessed")
-    usage_count: int = Field(default=1, description="Number of times this translation has been used")
-    
-    class Config:
-        # Allow arbitrary field names for MongoDB compatibility
-        extra = "allow"
-        # Use enum values for serialization
-        use_enum_values = True
-
-
-class WritingQuestionCache(BaseModel):
+
+    original_text: str  # Original text to be translated
+    translated_text: str  # Translated text
+    source_language: str  # Source language code
+    target_language: str  # Target language code
+    text_hash: str  # Hash of original text for fast lookup
+    created_at: datetime = field(default_factory=datetime.utcnow)  # When the translation was cached
+    last_used: Optional[datetime] = None  # When the translation was last accessed (defaults to created_at)
+    usage_count: int = 1  # Number of times this translation has been used
+
+    def __post_init__(self):
+        # Yeni kayıtta iki zaman damgası aynı anı gösterir; saat yalnızca bir kez okunur
+        if self.last_used is None:
+            self.last_used = self.created_at
+
+
+@dataclass(slots=True)
+class WritingQuestionCache:
     """Model for caching translated writing questions"""
-    
-    question_id: str = Field(..., description="Unique identifier for the question")
-    target_language: str = Field(..., description="Target language for the translation")
-    translated_data: dict = Field(..., description="Complete translated question data")
-    original_data: dict = Field(..., description="Original question data for reference")
-    cache_key: str = Field(..., description="Unique cache key for fast lookup")
-    created_at: datetime = Field(default_factory=datetime.utcnow, description="When the question was cached")
-    last_used: datetime = Field(default_factory=datetime.utcnow, description="When the cache was last accessed")
-    usage_count: int = Field(default=1, description="Number of times this cache has been used")
-    
-    class Config:
-        # Allow arbitrary field names for MongoDB compatibility
-        extra = "allow"
-        # Use enum values for serialization
-        use_enum_values = True
\ No newline at end of file
+
+    question_id: str  # Unique identifier for the question
+    target_language: str  # Target language for the translation
+    translated_data: dict  # Complete translated question data
+    original_data: dict  # Original question data for reference
+    cache_key: str  # Unique cache key for fast lookup
+    created_at: datetime = field(default_factory=datetime.utcnow)  # When the question was cached
+    last_used: Optional[datetime] = None  # When the cache was last accessed (defaults to created_at)
+    usage_count: int = 1  # Number of times this cache has been used
+
+    def __post_init__(self):
+        # Yeni kayıtta iki zaman damgası aynı anı gösterir; saat yalnızca bir kez okunur
+        if self.last_used is None:
+            self.last_used = self.created_at
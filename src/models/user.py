@@ -1,32 +1,50 @@
 from datetime import datetime, timezone
 from pydantic import BaseModel, EmailStr, Field
+from pydantic import dataclasses as pydantic_dataclasses
 from typing import List, Dict, Any, Optional
 
 
-class UserOut(BaseModel):
-    id: str
+def _now_utc() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+# Sabit anahtarlı istatistikler tipli alanlarla tutulur (Dict[str, Any] yerine);
+# JSON/DB biçimi aynı kalır.
+class PyramidStats(BaseModel):
+    time: int = 0  # saniye cinsinden
+    sentences: int = 0  # toplam cümle sayısı
+    success_rate: float = 0.0  # başarı oranı
+
+
+class VocabularyStats(BaseModel):
+    time: int = 0  # saniye cinsinden
+    vocabularies: int = 0  # toplam kelime sayısı
+    success_rate: float = 0.0  # başarı oranı
+
+
+# UserOut, UserIn ve User'ın ortak profil alanları
+class UserBase(BaseModel):
     username: str
     email: EmailStr
     learning_language: str
     system_language: str = "English"  # Default to English
     purpose: str
     level: str
+
+
+class UserOut(UserBase):
+    id: str
     pyramids: List[str] = []  # List of pyramid IDs
     vocabulary_lists: List[Dict[str, Any]] = []
-    saved_vocabularies: List[Dict[str, Any]] = []  # List of saved vocabulary words
-    pyramid_stats: Dict[str, Any] = {}
-    vocabulary_stats: Dict[str, Any] = {}
+    # Giriş/profil yanıtlarında boş döner; kaydedilen kelimeler /vocabulary/saved ile alınır
+    saved_vocabularies: List[Dict[str, Any]] = []
+    pyramid_stats: PyramidStats = Field(default_factory=PyramidStats)
+    vocabulary_stats: VocabularyStats = Field(default_factory=VocabularyStats)
     xp: int = 0  # Kullanıcı deneyim puanı (varsayılan değer 0)
 
 
-class UserIn(BaseModel):
-    username: str
-    email: EmailStr
+class UserIn(UserBase):
     password: str
-    learning_language: str
-    system_language: str = "English"  # Default to English
-    purpose: str
-    level: str
 
 
 class UserUpdate(BaseModel):
@@ -40,41 +58,36 @@ class UserUpdate(BaseModel):
     xp: Optional[int] = None  # İsteğe bağlı XP güncellemesi
 
 
-class User(BaseModel):
+class User(UserBase):
     id: str
-    username: str
-    email: EmailStr
     password_hash: str
 
-    learning_language: str
-    system_language: str = "English"  # Default to English
-    purpose: str
-    level: str
-
     is_active: bool = Field(True)
 
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    created_at: datetime = Field(default_factory=_now_utc)
+    updated_at: datetime = Field(default_factory=_now_utc)
 
     vocabulary_lists: List[str] = []
     pyramids: List[str] = []
-    saved_vocabularies: List[Dict[str, Any]] = []  # List of saved vocabulary words
+    # Saved vocabulary words are stored in the SavedVocabulary collection, not on the user
 
     xp: int = 0  # Kullanıcı deneyim puanı (varsayılan değer 0)
 
-    pyramid_stats: Dict[str, Any] = {
-        "time": 0,  # saniye cinsinden (integer)
-        "sentences": 0,  # toplam cümle sayısı (integer)
-        "success_rate": 0.0,  # başarı oranı (float)
-    }
+    pyramid_stats: PyramidStats = Field(default_factory=PyramidStats)
 
-    vocabulary_stats: Dict[str, Any] = {
-        "time": 0,  # saniye cinsinden (integer)
-        "vocabularies": 0,  # toplam kelime sayısı (integer)
-        "success_rate": 0.0,  # başarı oranı (float)
-    }
+    vocabulary_stats: VocabularyStats = Field(default_factory=VocabularyStats)
 
-class PasswordChange(BaseModel):
+
+# Yalnızca okunup atılan istek gövdesi; slots'lu, değiştirilemez Pydantic dataclass
+@pydantic_dataclasses.dataclass(frozen=True, slots=True)
+class PasswordChange:
     current_password: str
     new_password: str
 
+
+# /login form alanları; route urlencoded gövdeyi doğrudan ayrıştırıp bunu oluşturur
+@pydantic_dataclasses.dataclass(frozen=True, slots=True)
+class LoginCredentials:
+    username: str
+    password: str
+
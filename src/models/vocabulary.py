@@ -1,5 +1,6 @@
 from typing import List, Dict, Optional
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter, field_validator
+from pydantic import dataclasses as pydantic_dataclasses
 from datetime import datetime
 
 
@@ -9,12 +10,30 @@ class VocabularyItem(BaseModel):
     relevantWords: List[str]
     emoji: str
 
+    @field_validator("relevantWords")
+    @classmethod
+    def ensure_five_relevant_words(cls, relevant_words: List[str]) -> List[str]:
+        """Trim or pad with placeholders so there are exactly 5 relevant words"""
+        if len(relevant_words) == 5:
+            return relevant_words
+        if len(relevant_words) > 5:
+            return relevant_words[:5]
+        return relevant_words + [
+            f"related_word_{i}" for i in range(len(relevant_words) + 1, 6)
+        ]
+
 
 class VocabularyList(BaseModel):
     words: List[VocabularyItem]
 
 
-class SaveVocabularyRequest(BaseModel):
+# Birden fazla kelimeyi tek çağrıda doğrulamak için modül yüklenirken bir kez derlenen doğrulayıcı
+VOCABULARY_ITEMS_ADAPTER = TypeAdapter(List[VocabularyItem])
+
+
+# İstek gövdeleri yalnızca okunup atıldığı için slots'lu, değiştirilemez Pydantic dataclass'ları
+@pydantic_dataclasses.dataclass(frozen=True, slots=True)
+class SaveVocabularyRequest:
     word: str
     meaning: str
     relevantWords: List[str]
@@ -25,6 +44,10 @@ class SaveVocabularyRequest(BaseModel):
 class VocabularyStatistics(BaseModel):
     """Model for tracking statistics for a specific word for a user"""
 
+    # Yalnızca servis içinde kullanılır; şema ilk kullanımda kurulur.
+    # Kayıtlar oluşturulduktan sonra değiştirilmez (frozen), bilinmeyen alanlar (_id) atlanır
+    model_config = ConfigDict(defer_build=True, frozen=True, extra="ignore")
+
     user_id: str
     word: str
     meaning: str
@@ -45,46 +68,85 @@ class VocabularyStatistics(BaseModel):
     successful_attempts: int = 0
     failed_attempts: int = 0
 
-    # Timestamps
+    # Timestamps (a new record reads the clock once; the others default to first_seen)
     first_seen: datetime = Field(default_factory=datetime.utcnow)
-    last_seen: datetime = Field(default_factory=datetime.utcnow)
-    last_attempt: datetime = Field(default_factory=datetime.utcnow)
+    last_seen: datetime = Field(default_factory=lambda data: data["first_seen"])
+    last_attempt: datetime = Field(default_factory=lambda data: data["first_seen"])
 
-    # Difficulty score (calculated field, not stored)
+    # Difficulty score, stored and recomputed whenever a hint/attempt counter changes
     difficulty_score: float = 0.0
 
-    def calculate_difficulty_score(self) -> float:
+    @classmethod
+    def from_mongo(cls, doc: dict) -> "VocabularyStatistics":
+        """Trusted DB kaydından doğrulama yapmadan nesne oluşturur (eksik alanlar varsayılanı alır)"""
+        return cls.model_construct(**doc)
+
+    @staticmethod
+    def score_from_counts(
+        letter_hints: int,
+        relevant_word_hints: int,
+        emoji_hints: int,
+        successful_attempts: int,
+        failed_attempts: int,
+    ) -> float:
         """
-        Calculate a difficulty score for this word based on hint usage and success rate
+        Difficulty score from raw hint/attempt counts
         Higher score = more difficult word
         """
         # Base score from hint usage (letter hints weighted higher)
-        hint_score = (
-            (self.letter_hints * 1.5) + self.relevant_word_hints + self.emoji_hints
-        )
+        hint_score = (letter_hints * 1.5) + relevant_word_hints + emoji_hints
 
         # Adjust for success/failure ratio
-        total_attempts = self.successful_attempts + self.failed_attempts
+        total_attempts = successful_attempts + failed_attempts
         if total_attempts > 0:
-            success_rate = self.successful_attempts / total_attempts
             # Inverse of success rate - lower success rate means higher difficulty
-            success_factor = 1 - success_rate
+            success_factor = 1 - successful_attempts / total_attempts
             hint_score = hint_score * (1 + success_factor)
 
-        # Time decay factor - more recent words get higher priority
-        # (This won't be used in storage, just in the calculation)
-        self.difficulty_score = hint_score
         return hint_score
 
+    @classmethod
+    def bulk_difficulty_scores(cls, docs: List[Dict]) -> List[float]:
+        """
+        Difficulty scores for raw statistics documents in one pass,
+        without building a model object per word
+        """
+        score = cls.score_from_counts
+        return [
+            score(
+                doc.get("letter_hints", 0),
+                doc.get("relevant_word_hints", 0),
+                doc.get("emoji_hints", 0),
+                doc.get("successful_attempts", 0),
+                doc.get("failed_attempts", 0),
+            )
+            for doc in docs
+        ]
+
+    def calculate_difficulty_score(self) -> float:
+        """
+        Calculate a difficulty score for this word based on hint usage and success rate
+        Higher score = more difficult word
+        """
+        return self.score_from_counts(
+            self.letter_hints,
+            self.relevant_word_hints,
+            self.emoji_hints,
+            self.successful_attempts,
+            self.failed_attempts,
+        )
+
 
-class HintUsageRequest(BaseModel):
+@pydantic_dataclasses.dataclass(frozen=True, slots=True)
+class HintUsageRequest:
     word: str
     meaning: str
     hint_type: str  # "letter", "relevant_word", or "emoji"
     system_language: Optional[str] = None  # Changed from default "English" to None
 
 
-class AttemptResult(BaseModel):
+@pydantic_dataclasses.dataclass(frozen=True, slots=True)
+class AttemptResult:
     word: str
     meaning: str
     success: bool  # True if the attempt was successful, False otherwise
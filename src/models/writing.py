@@ -1,9 +1,16 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
+from pydantic import dataclasses as pydantic_dataclasses
 from typing import Optional, List, Dict, Literal
 from datetime import datetime, timezone
 
-# Request model for writing evaluation endpoints
-class WritingEvaluationRequest(BaseModel):
+
+def _now_utc() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+# Request model for writing evaluation endpoints (read once; slotted, frozen dataclass)
+@pydantic_dataclasses.dataclass(frozen=True, slots=True)
+class WritingEvaluationRequest:
     text: str
     question: Optional[str] = ""
 
@@ -19,6 +26,15 @@ class ScenarioAnswer(BaseModel):
     scenario_text: str = Field(description="The scenario question text")
     answer: str = Field(description="User's answer to this scenario")
 
+    @staticmethod
+    def combine(items: List["ScenarioAnswer"]) -> str:
+        """Join non-empty answers as "scenario: answer" blocks separated by blank lines"""
+        return "\n\n".join(
+            f"{item.scenario_text}: {item.answer}"
+            for item in items
+            if item.answer and item.answer.strip()
+        )
+
 # Request model for answering writing questions with multiple scenarios
 class WritingScenarioAnswerRequest(BaseModel):
     question_id: str
@@ -33,12 +49,19 @@ class WritingEvaluationDetails(BaseModel):
     total_score: int = Field(description="Sum of all scores (max 15)")
     xp_earned: Optional[int] = Field(default=None, description="XP awarded to user (total_score × 10)")
 
+# Yalnızca servis içinde kullanılan modellerde (response_model ya da Gemini şeması olmayanlar)
+# şema ilk kullanımda kurulur (defer_build); import sırasında maliyet oluşmaz.
+
 # Corresponds to WritingCriteria in frontend
 class WritingCriteriaCategory(BaseModel):
+    model_config = ConfigDict(defer_build=True)
+
     description: str
     factors: List[str]
 
 class WritingCriteria(BaseModel):
+    model_config = ConfigDict(defer_build=True)
+
     content: WritingCriteriaCategory
     organization: WritingCriteriaCategory
     language: WritingCriteriaCategory
@@ -62,6 +85,9 @@ class DetailedWritingResponse(WritingResponse):
 
 # Database model for storing user responses to specific questions
 class WritingQuestionResponse(BaseModel):
+    # Kayıt olarak yazılıp okunur, sonradan değiştirilmez; DB'den gelen _id atlanır
+    model_config = ConfigDict(defer_build=True, frozen=True, extra="ignore")
+
     user_id: str
     question_id: str
     level: str
@@ -76,15 +102,15 @@ class WritingQuestionResponse(BaseModel):
     total_score: int
     xp_earned: Optional[int] = None
     feedback_items: Optional[List[WritingFeedbackItem]] = None
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    created_at: datetime = Field(default_factory=_now_utc)
     updated_at: Optional[datetime] = None
 
     @classmethod
     def from_evaluation(cls, user_id: str, question_id: str, level: str, question_text: str, 
                        user_answer: str, evaluation: DetailedWritingResponse, 
                        scenario_answers: Optional[List[ScenarioAnswer]] = None):
-        """Create a WritingQuestionResponse from evaluation"""
-        return cls(
+        """Create a WritingQuestionResponse from evaluation (already validated, so no re-validation)"""
+        return cls.model_construct(
             user_id=user_id,
             question_id=question_id,
             level=level,
@@ -118,6 +144,9 @@ class WritingScenarioAnswerResponse(BaseModel):
 
 # Models for writing questions
 class WritingQuestion(BaseModel):
+    # Seviye yanıtları önbellekte paylaşılır; solved gibi alanlar model_copy ile değiştirilir
+    model_config = ConfigDict(defer_build=True, frozen=True)
+
     id: str = Field(description="Question identifier (e.g., B1, E1, I1, A1)")
     name: str = Field(description="Short name of the question")
     full_name: str = Field(description="Full question text with emoji")
@@ -1,15 +1,60 @@
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
+import logging
+from urllib.parse import parse_qs
+from fastapi import APIRouter, Depends, HTTPException, Request
+from src.models.user import LoginCredentials, UserOut
 from src.services.authentication_service import login, verify_token
 from src.services.event_service import log_login, log_app_open
 
 router = APIRouter()
 
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login")
+logger = logging.getLogger(__name__)
 
+# Gövde elle okunduğu için OpenAPI'de form şeması ayrıca tanımlanır
+_LOGIN_FORM_SCHEMA = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "application/x-www-form-urlencoded": {
+                "schema": {
+                    "type": "object",
+                    "required": ["username", "password"],
+                    "properties": {
+                        "username": {"type": "string"},
+                        "password": {"type": "string", "format": "password"},
+                    },
+                }
+            }
+        },
+    }
+}
 
-@router.post("/login")
-async def login_endpoint(form_data: OAuth2PasswordRequestForm = Depends()):
+
+async def read_login_form(request: Request) -> LoginCredentials:
+    """
+    Parse the login form. The usual urlencoded body is read directly as bytes;
+    other content types (multipart clients) fall back to Starlette's form parser.
+    """
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("application/x-www-form-urlencoded"):
+        try:
+            body = (await request.body()).decode()
+        except UnicodeDecodeError:
+            raise HTTPException(status_code=422, detail="Form body must be UTF-8 encoded")
+        fields = parse_qs(body, keep_blank_values=True)
+        username = fields.get("username", [None])[0]
+        password = fields.get("password", [None])[0]
+    else:
+        form = await request.form()
+        username = form.get("username")
+        password = form.get("password")
+
+    if not isinstance(username, str) or not isinstance(password, str):
+        raise HTTPException(status_code=422, detail="username and password are required")
+    return LoginCredentials(username=username, password=password)
+
+
+@router.post("/login", openapi_extra=_LOGIN_FORM_SCHEMA)
+async def login_endpoint(form_data: LoginCredentials = Depends(read_login_form)):
     try:
         user = await login(form_data)
         log_login(user["user_id"])
@@ -17,27 +62,20 @@ async def login_endpoint(form_data: OAuth2PasswordRequestForm = Depends()):
     except HTTPException:
         # Re-raise the exception to maintain the original error
         raise
-    except Exception as e:
+    except Exception:
         # Log the exception details for debugging
-        print(f"Login error: {str(e)}")
+        logger.exception("Login error")
         raise HTTPException(
             status_code=500, detail="An error occurred during login. Please try again."
         )
 
 
 @router.post("/log-app-open")
-async def app_open_endpoint(token: str = Depends(oauth2_scheme)):
+async def app_open_endpoint(user: UserOut = Depends(verify_token)):
     """
     Endpoint to log when the application is opened
     """
-    # Get user from token
-    user = await verify_token(token)
-    # Assuming get_current_user_id is a function that verifies the token and retrieves the user ID
-    if not user:
-        raise HTTPException(
-            status_code=401, detail="Invalid authentication credentials"
-        )
-
+    # verify_token is resolved as a dependency, so FastAPI reuses its result within the request
     # Log the app open event
     log_app_open(user.id)
     return {"message": "App open event logged successfully"}
@@ -2,13 +2,14 @@
 
 from fastapi import APIRouter, Request, HTTPException
 from fastapi.responses import JSONResponse
-from pydantic import BaseModel
+from pydantic import dataclasses as pydantic_dataclasses
 from src.services.google_service import verify_google_id_token
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 
-class GoogleLoginRequest(BaseModel):
+@pydantic_dataclasses.dataclass(frozen=True, slots=True)
+class GoogleLoginRequest:
     id_token: str
 
 
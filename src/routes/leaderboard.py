@@ -1,34 +1,36 @@
 from fastapi import APIRouter, Depends, HTTPException
-from typing import List, Dict, Any
+from fastapi.responses import ORJSONResponse
 from src.models.user import UserOut
 from src.services.leaderboard_service import get_leaderboard, get_leaderboard_for_user
 from src.services.authentication_service import verify_token
 
 router = APIRouter(prefix="/leaderboard", tags=["leaderboard"])
 
+# Yanıtlar doğrudan ORJSONResponse olarak döndürülür; OpenAPI'de JSON içerik tipi belirtilir
+_JSON_RESPONSES = {200: {"content": {"application/json": {}}}}
 
-@router.get("/get", response_model=Dict[str, Any])
+
+@router.get("/get", responses=_JSON_RESPONSES)
 async def read_leaderboard(user: UserOut = Depends(verify_token)):
     """
     Endpoint to get the leaderboard data.
     """
     try:
-        leaderboard_data = get_leaderboard()
-        return leaderboard_data
+        # Önbellekteki sözlük yalnızca düz değerler içerir; jsonable_encoder atlanır
+        return ORJSONResponse(get_leaderboard())
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Leaderboard data cannot be retrieved: {str(e)}"
         )
 
 
-@router.get("/get/me", response_model=Dict[str, Any])
+@router.get("/get/me", responses=_JSON_RESPONSES)
 async def read_my_rank(user: UserOut = Depends(verify_token)):
     """
     This endpoint returns the leaderboard data for the authenticated user.
     """
     try:
-        leaderboard_data = get_leaderboard_for_user(user.id)
-        return leaderboard_data
+        return ORJSONResponse(get_leaderboard_for_user(user.id))
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Leaderboard data cannot be retrieved: {str(e)}"
@@ -1,14 +1,24 @@
-from datetime import datetime
-from fastapi import APIRouter, HTTPException, Body, Depends, Query
-from typing import Dict, List, Any, Optional
+import asyncio
+import functools
+import logging
+from anyio import to_thread
+from fastapi import APIRouter, HTTPException, Body, Depends, Query, Response
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, Dict, List, Any, Optional
 from bson import ObjectId  # ObjectId importu eksikti
 
 # Model importları artık bu dosyadan değil, src.models.pyramid'den yapılmalı
 from src.models.user import UserOut
-from src.models.pyramid import PyramidOut, PyramidItem  # PyramidItem da gerekiyor
+from src.models.pyramid import (
+    PyramidOut,
+    PyramidCurrentOut,
+    PyramidItem,  # PyramidItem da gerekiyor
+    PyramidBatchRequest,
+)
 from src.services import pyramid_service
 from src.services.authentication_service import verify_token
-from src.services.content_check_service import check_user_content
+from src.services.content_check_service import check_user_content, check_user_contents
+from src.settings import PYRAMID_LLM_MAX_CONCURRENCY
 from src.services.event_service import (
     create_pyramid_event,
     add_pyramid_step,
@@ -21,25 +31,88 @@ from src.services.event_service import (
 
 router = APIRouter(prefix="/pyramid", tags=["Pyramid Exercise"])
 
+logger = logging.getLogger(__name__)
+
+# LLM'e giden piramit endpoint'leri (oluşturma, önizleme, sonraki adım) süreç başına sınırlanır
+_pyramid_llm_semaphore = asyncio.Semaphore(PYRAMID_LLM_MAX_CONCURRENCY)
+
+
+async def _stream_with_llm_slot(lines: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Akış boyunca (yalnızca başlatılırken değil) LLM eşzamanlılık slotunu tutar"""
+    async with _pyramid_llm_semaphore:
+        async for line in lines:
+            yield line
+
+
+def _oid(value: Any, detail: str = "Geçerli bir piramit ID'si gereklidir.") -> ObjectId:
+    """Geçersiz ID'leri veritabanına gitmeden 422 ile reddeder"""
+    if not isinstance(value, str) or not ObjectId.is_valid(value):
+        raise HTTPException(status_code=422, detail=detail)
+    return ObjectId(value)
+
+
+def _load_and_authorize(
+    pyramid_id: str,
+    user_id: str,
+    projection: Optional[Dict[str, int]] = None,
+    not_found_detail: str = "Piramit bulunamadı.",
+    forbidden_detail: str = "Bu piramide erişim yetkiniz yok.",
+) -> Dict[str, Any]:
+    """
+    Kullanıcının piramidini tek sorguda okur (user_id filtreye dahil).
+    Bulunamazsa yalnızca 404/403 ayrımı için ikinci bir sayım yapılır.
+    """
+    pyramid_oid = _oid(pyramid_id)
+
+    pyramid_doc = pyramid_service.pyramid_table.find_one(
+        {"_id": pyramid_oid, "user_id": user_id}, projection
+    )
+    if pyramid_doc:
+        return pyramid_doc
+    if pyramid_service.pyramid_table.count_documents({"_id": pyramid_oid}, limit=1):
+        raise HTTPException(status_code=403, detail=forbidden_detail)
+    raise HTTPException(status_code=404, detail=not_found_detail)
+
+
+async def _load_and_authorize_async(pyramid_id: str, user_id: str, **kwargs) -> Dict[str, Any]:
+    """_load_and_authorize'ın async endpoint'ler için sürümü; PyMongo sorgusu thread havuzunda çalışır"""
+    return await to_thread.run_sync(
+        functools.partial(_load_and_authorize, pyramid_id, user_id, **kwargs)
+    )
+
 
 @router.get("/list", response_model=List[PyramidOut])
-async def get_user_pyramids(
+def get_user_pyramids(
+    response: Response,
     completed: Optional[bool] = Query(None, description="Filter by completion status"),
     limit: Optional[int] = Query(50, description="Maximum number of pyramids to return"),
-    offset: Optional[int] = Query(0, description="Number of pyramids to skip"),
+    offset: Optional[int] = Query(
+        0, description="Number of pyramids to skip (ignored when cursor is given)"
+    ),
+    cursor: Optional[str] = Query(
+        None, description="X-Next-Cursor value from the previous page"
+    ),
     user: UserOut = Depends(verify_token),
 ):
-    """Get all pyramids for the authenticated user with optional filtering."""
+    """
+    Get the authenticated user's pyramids, most recently updated first.
+    The cursor for the next page is returned in the X-Next-Cursor header.
+    """
     try:
-        pyramids = pyramid_service.get_user_pyramids(
+        pyramids, next_cursor = pyramid_service.get_user_pyramids(
             user_id=user.id,
             completed=completed,
             limit=limit,
-            offset=offset
+            offset=offset,
+            cursor=cursor,
         )
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
         return pyramids
-    except Exception as e:
-        print(f"Error in /list: {e}")
+    except ValueError as ve:
+        raise HTTPException(status_code=422, detail=str(ve))
+    except Exception:
+        logger.exception("Error in /list")
         raise HTTPException(
             status_code=500, detail="Kullanıcı piramitleri alınırken bir sunucu hatası oluştu."
         )
@@ -56,16 +129,17 @@ async def create_pyramid_endpoint(
         
         # Check content appropriateness
         if start_sentence:
-            check_user_content(start_sentence, "sentence", str(user.id))
+            await check_user_content(start_sentence, "sentence", str(user.id))
         
-        new_pyramid = pyramid_service.create_pyramid(user, start_sentence)
+        async with _pyramid_llm_semaphore:
+            new_pyramid = await pyramid_service.create_pyramid(user, start_sentence)
         return new_pyramid
     except ValueError as ve:
-        print(f"!!! YAKALANAN HATA DETAYI: {ve}")  # <-- BU SATIRI EKLEYİN
+        logger.warning("Pyramid create rejected: %s", ve)
         raise HTTPException(status_code=400, detail=str(ve))
-    except Exception as e:
+    except Exception:
         # Üretimde daha genel bir hata mesajı
-        print(f"Error in /create: {e}")
+        logger.exception("Error in /create")
         raise HTTPException(
             status_code=500, detail="Piramit oluşturulurken bir sunucu hatası oluştu."
         )
@@ -90,33 +164,105 @@ async def preview_next_step_options_endpoint(
                 status_code=422, detail="Geçerli bir piramit ID'si gereklidir."
             )
 
-        # Yetkilendirme (pyramid_service içinde de yapılabilir ama burada da bir katman olması iyi)
-        pyramid_doc = pyramid_service.pyramid_table.find_one(
-            {"_id": ObjectId(pyramid_id)}
+        # Yetkilendirme; okunan belge servise verilir, servis tekrar okumaz
+        pyramid_doc = await _load_and_authorize_async(
+            pyramid_id,
+            user.id,
+            not_found_detail="Belirtilen ID ile piramit bulunamadı.",
+            forbidden_detail="Bu piramidi görüntüleme yetkiniz yok.",
         )
-        if not pyramid_doc:
-            raise HTTPException(
-                status_code=404, detail="Belirtilen ID ile piramit bulunamadı."
-            )
-        if pyramid_doc.get("user_id") != user.id:
-            raise HTTPException(
-                status_code=403, detail="Bu piramidi görüntüleme yetkiniz yok."
-            )
 
-        preview_data = pyramid_service.preview_next_step_options(pyramid_id, user)
+        async with _pyramid_llm_semaphore:
+            preview_data = await pyramid_service.preview_next_step_options(
+                pyramid_id, user, pyramid_doc
+            )
         return preview_data
     except ValueError as ve:  # Servisten gelen beklenen hatalar
         raise HTTPException(status_code=422, detail=str(ve))
     except HTTPException:  # Zaten HTTPException ise yeniden fırlat
-        raise HTTPException(status_code=500, detail="Bilinmeyen HTTP hatası oluştu.")
-    except Exception as e:
-        print(f"Error in /preview/next-step-options: {e}")
+        raise
+    except Exception:
+        logger.exception("Error in /preview/next-step-options")
         raise HTTPException(
             status_code=500,
             detail="Önizleme seçenekleri alınırken bir sunucu hatası oluştu.",
         )
 
 
+@router.post(
+    "/stream/next-step-options",
+    summary="Bir sonraki adımın seçeneklerini üretildikçe NDJSON olarak akıtır",
+)
+async def stream_next_step_options_endpoint(
+    data: dict = Body(..., example={"pyramid_id": "piramit_id_buraya"}),
+    user: UserOut = Depends(verify_token),
+):
+    """
+    Seçili cümle için bir sonraki adımın seçeneklerini Gemini'den geldikçe gönderir.
+    Her satır {"type": "option", ...}; son satır doğrulanmış adımı içeren {"type": "item", ...}.
+    """
+    try:
+        pyramid_id = data.get("pyramid_id")
+        if not pyramid_id or not isinstance(pyramid_id, str) or not pyramid_id.strip():
+            raise HTTPException(
+                status_code=422, detail="Geçerli bir piramit ID'si gereklidir."
+            )
+
+        pyramid_doc = await _load_and_authorize_async(
+            pyramid_id,
+            user.id,
+            not_found_detail="Belirtilen ID ile piramit bulunamadı.",
+            forbidden_detail="Bu piramidi görüntüleme yetkiniz yok.",
+        )
+
+        lines = pyramid_service.stream_next_step_options(pyramid_id, user, pyramid_doc)
+        return StreamingResponse(
+            _stream_with_llm_slot(lines), media_type="application/x-ndjson"
+        )
+    except ValueError as ve:
+        raise HTTPException(status_code=422, detail=str(ve))
+    except HTTPException:
+        raise
+    except Exception:
+        logger.exception("Error in /stream/next-step-options")
+        raise HTTPException(
+            status_code=500,
+            detail="Seçenek akışı başlatılırken bir sunucu hatası oluştu.",
+        )
+
+
+@router.post(
+    "/batch",
+    response_model=Dict[str, Any],
+    summary="Birden fazla cümle için adım seçeneklerini tek istekte üretir",
+)
+async def batch_step_options_endpoint(
+    data: PyramidBatchRequest,
+    user: UserOut = Depends(verify_token),
+):
+    """
+    Verilen her (adım türü, cümle) çifti için seçenekleri eşzamanlı olarak üretir.
+    Sonuçlar istek sırasıyla döner; üretilemeyen öğeler için null döner.
+    """
+    try:
+        # İstemcinin gönderdiği tüm cümleler tek moderasyon isteğiyle kontrol edilir
+        await check_user_contents(
+            (item.sentence for item in data.items), "sentence", str(user.id)
+        )
+
+        async with _pyramid_llm_semaphore:
+            results = await pyramid_service.create_batch_step_options(data.items, user)
+        return {"results": results}
+    except HTTPException:
+        raise
+    except Exception:
+        logger.exception("Error in /batch")
+        raise HTTPException(
+            status_code=500,
+            detail="Toplu adım seçenekleri üretilirken bir sunucu hatası oluştu.",
+        )
+
+
 @router.post(
     "/update-step-selection",
     response_model=Dict[
@@ -124,7 +270,7 @@ async def preview_next_step_options_endpoint(
     ],  # Örneğin: {"message": "...", "selected_sentence": "..."
     summary="Kullanıcının mevcut adımdaki seçimini kaydeder",
 )
-async def update_pyramid_step_selection_endpoint(
+def update_pyramid_step_selection_endpoint(
     data: dict = Body(
         ..., example={"pyramid_id": "piramit_id", "selected_option_index": 0}
     ),
@@ -146,18 +292,12 @@ async def update_pyramid_step_selection_endpoint(
                 detail="Seçilen opsiyon indeksi geçerli bir pozitif tam sayı olmalıdır.",
             )
 
-        pyramid_doc_auth = pyramid_service.pyramid_table.find_one(
-            {"_id": ObjectId(pyramid_id)}
+        pyramid_doc = _load_and_authorize(
+            pyramid_id, user.id, forbidden_detail="Bu piramidi güncelleme yetkiniz yok."
         )
-        if not pyramid_doc_auth:
-            raise HTTPException(status_code=404, detail="Piramit bulunamadı.")
-        if pyramid_doc_auth.get("user_id") != user.id:
-            raise HTTPException(
-                status_code=403, detail="Bu piramidi güncelleme yetkiniz yok."
-            )
 
         update_result = pyramid_service.save_user_selection_for_step(
-            pyramid_id, selected_option_index
+            pyramid_id, selected_option_index, pyramid_doc
         )
         return (
             update_result  # Bu {"selected_sentence": "...", ...} gibi bir dict döndürür
@@ -167,9 +307,9 @@ async def update_pyramid_step_selection_endpoint(
             status_code=400, detail=str(ve)
         )  # 400 Bad Request veya 404/422 olabilir
     except HTTPException:
-        raise HTTPException(status_code=500, detail="Sunucu hatası oluştu.")
-    except Exception as e:
-        print(f"Error in /update-step-selection: {e}")
+        raise
+    except Exception:
+        logger.exception("Error in /update-step-selection")
         raise HTTPException(
             status_code=500, detail="Seçim kaydedilirken bir sunucu hatası oluştu."
         )
@@ -180,7 +320,7 @@ async def update_pyramid_step_selection_endpoint(
     response_model=PyramidOut,
     summary="Önceden hazırlanmış bir adımı piramide ekler",
 )
-async def append_predefined_step_endpoint(
+def append_predefined_step_endpoint(
     data: Dict = Body(
         ..., example={"pyramid_id": "piramit_id", "next_step_item": "{...}"}
     ),
@@ -202,18 +342,12 @@ async def append_predefined_step_endpoint(
                 detail="Sonraki adım verisi sözlük formatında olmalıdır.",
             )
 
-        pyramid_doc_auth = pyramid_service.pyramid_table.find_one(
-            {"_id": ObjectId(pyramid_id)}
+        pyramid_doc = _load_and_authorize(
+            pyramid_id, user.id, forbidden_detail="Bu piramidi güncelleme yetkiniz yok."
         )
-        if not pyramid_doc_auth:
-            raise HTTPException(status_code=404, detail="Piramit bulunamadı.")
-        if pyramid_doc_auth.get("user_id") != user.id:
-            raise HTTPException(
-                status_code=403, detail="Bu piramidi güncelleme yetkiniz yok."
-            )
 
         updated_pyramid = pyramid_service.append_given_step(
-            pyramid_id, next_step_item_dict, user
+            pyramid_id, next_step_item_dict, user, pyramid_doc
         )
         return updated_pyramid  # Bu PyramidOut nesnesi olmalı
     except ValueError as ve:
@@ -221,9 +355,9 @@ async def append_predefined_step_endpoint(
             status_code=400, detail=str(ve)
         )  # Örn: Adım eklenemiyorsa (son adım vs.)
     except HTTPException:
-        raise HTTPException(status_code=500, detail="Sunucu hatası oluştu.")
-    except Exception as e:
-        print(f"Error in /append-step: {e}")
+        raise
+    except Exception:
+        logger.exception("Error in /append-step")
         raise HTTPException(
             status_code=500, detail="Adım eklenirken bir sunucu hatası oluştu."
         )
@@ -247,40 +381,35 @@ async def complete_pyramid_endpoint(
         if not pyramid_id:
             raise HTTPException(status_code=422, detail="Piramit ID'si gereklidir.")
 
-        pyramid_doc_auth = pyramid_service.pyramid_table.find_one(
-            {"_id": ObjectId(pyramid_id)}
+        _oid(pyramid_id)
+
+        # Piramit tek bir koşullu yazmayla tamamlanır; skip_xp yalnızca XP adımını atlar
+        completion_result = await pyramid_service.complete_pyramid_with_xp(
+            pyramid_id, user.id, event_id, award_xp=not skip_xp
         )
-        if not pyramid_doc_auth:
-            raise HTTPException(status_code=404, detail="Piramit bulunamadı.")
-        if pyramid_doc_auth.get("user_id") != user.id:
-            raise HTTPException(
-                status_code=403, detail="Bu piramidi tamamlama yetkiniz yok."
+        if completion_result.get("status") == "not_found":
+            # Yazma eşleşmedi: piramit yok (404), başkasına ait (403) ya da zaten tamamlanmış
+            await _load_and_authorize_async(
+                pyramid_id,
+                user.id,
+                projection={"_id": 1},
+                forbidden_detail="Bu piramidi tamamlama yetkiniz yok.",
             )
-        if pyramid_doc_auth.get("completed"):
             return {"message": "Bu piramit zaten daha önce tamamlanmış.", "xp_earned": 0}
-
-        if skip_xp:
-            # Just mark as completed without XP
-            pyramid_service.pyramid_table.update_one(
-                {"_id": ObjectId(pyramid_id)},
-                {"$set": {"completed": True, "updated_at": datetime.utcnow()}},
+        if completion_result.get("status") != "success":
+            # XP adımı başarısız oldu; piramit tamamlanmadı, istemci yeniden deneyebilir
+            raise HTTPException(
+                status_code=500, detail="Piramit tamamlanırken bir sunucu hatası oluştu."
             )
-            return {
-                "message": "Piramit başarıyla tamamlandı.",
-                "xp_earned": 0
-            }
-        else:
-            # Complete the pyramid and award XP
-            completion_result = await pyramid_service.complete_pyramid_with_xp(pyramid_id, user.id, event_id)
-            
-            return {
-                "message": "Piramit başarıyla tamamlandı.",
-                "xp_earned": completion_result.get("xp_earned", 0)
-            }
+
+        return {
+            "message": "Piramit başarıyla tamamlandı.",
+            "xp_earned": completion_result.get("xp_earned", 0)
+        }
     except HTTPException:
         raise
-    except Exception as e:
-        print(f"Error in /complete: {e}")
+    except Exception:
+        logger.exception("Error in /complete")
         raise HTTPException(
             status_code=500, detail="Piramit tamamlanırken bir sunucu hatası oluştu."
         )
@@ -291,16 +420,13 @@ async def complete_pyramid_endpoint(
     response_model=PyramidOut,
     summary="ID ile piramit verisini getirir",
 )
-async def get_pyramid_endpoint(
+def get_pyramid_endpoint(
     pyramid_id: str,
     user: UserOut = Depends(verify_token),
 ):
     """ID ile belirtilen piramidin verilerini getirir."""
     try:
-        if not pyramid_id.strip():  # Boşluk kontrolü
-            raise HTTPException(
-                status_code=422, detail="Geçerli bir piramit ID'si gereklidir."
-            )
+        _oid(pyramid_id)
 
         # get_pyramid_by_id Pyramid modelini döndürür.
         # FastAPI bunu response_model'e göre (PyramidOut) otomatik serialize eder.
@@ -320,13 +446,38 @@ async def get_pyramid_endpoint(
         raise HTTPException(status_code=404, detail=str(ve))
     except HTTPException:
         raise
-    except Exception as e:
-        print(f"Error in /get/{pyramid_id}: {e}")
+    except Exception:
+        logger.exception("Error in /get/%s", pyramid_id)
         raise HTTPException(
             status_code=500, detail="Piramit verisi alınırken bir sunucu hatası oluştu."
         )
 
 
+@router.get(
+    "/get/{pyramid_id}/current",
+    response_model=PyramidCurrentOut,
+    summary="Piramidin yalnızca mevcut adımını getirir",
+)
+def get_current_step_endpoint(
+    pyramid_id: str,
+    user: UserOut = Depends(verify_token),
+):
+    """Tüm adımları göndermek yerine sadece steps[last_step] adımını döndürür."""
+    try:
+        _oid(pyramid_id)
+
+        return pyramid_service.get_current_step(pyramid_id, user.id)
+    except ValueError as ve:
+        raise HTTPException(status_code=404, detail=str(ve))
+    except HTTPException:
+        raise
+    except Exception:
+        logger.exception("Error in /get/%s/current", pyramid_id)
+        raise HTTPException(
+            status_code=500, detail="Piramit adımı alınırken bir sunucu hatası oluştu."
+        )
+
+
 # Fallback olarak tutulan /create/next-step-options (isteğe bağlı)
 # Eğer bu endpoint'i kaldırmayı düşünüyorsanız, buradan silebilirsiniz.
 @router.delete(
@@ -334,16 +485,13 @@ async def get_pyramid_endpoint(
     response_model=Dict[str, str],
     summary="Piramidi siler",
 )
-async def delete_pyramid_endpoint(
+def delete_pyramid_endpoint(
     pyramid_id: str,
     user: UserOut = Depends(verify_token),
 ):
     """Belirtilen ID'ye sahip piramidi siler."""
     try:
-        if not pyramid_id.strip():
-            raise HTTPException(
-                status_code=422, detail="Geçerli bir piramit ID'si gereklidir."
-            )
+        _oid(pyramid_id)
 
         result = pyramid_service.delete_pyramid(pyramid_id, user.id)
         return result
@@ -351,8 +499,8 @@ async def delete_pyramid_endpoint(
         raise HTTPException(status_code=404, detail=str(ve))
     except HTTPException:
         raise
-    except Exception as e:
-        print(f"Error in /delete/{pyramid_id}: {e}")
+    except Exception:
+        logger.exception("Error in /delete/%s", pyramid_id)
         raise HTTPException(
             status_code=500, detail="Piramit silinirken bir sunucu hatası oluştu."
         )
@@ -377,26 +525,23 @@ async def create_next_step_fallback_endpoint(
         if not pyramid_id:
             raise HTTPException(status_code=422, detail="Piramit ID'si gereklidir.")
 
-        pyramid_doc_auth = pyramid_service.pyramid_table.find_one(
-            {"_id": ObjectId(pyramid_id)}
+        pyramid_doc = await _load_and_authorize_async(
+            pyramid_id, user.id, forbidden_detail="Bu piramidi güncelleme yetkiniz yok."
         )
-        if not pyramid_doc_auth:
-            raise HTTPException(status_code=404, detail="Piramit bulunamadı.")
-        if pyramid_doc_auth.get("user_id") != user.id:
-            raise HTTPException(
-                status_code=403, detail="Bu piramidi güncelleme yetkiniz yok."
-            )
 
         # Bu fonksiyon, önceki analizimizdeki gibi, kullanıcının son seçtiği cümleyi kullanacak şekilde
         # pyramid_service içinde güncellenmiş olmalı.
-        updated_pyramid = pyramid_service.create_next_step_options(pyramid_id, user)
+        async with _pyramid_llm_semaphore:
+            updated_pyramid = await pyramid_service.create_next_step_options(
+                pyramid_id, user, pyramid_doc
+            )
         return updated_pyramid
     except ValueError as ve:
         raise HTTPException(status_code=400, detail=str(ve))
     except HTTPException:
         raise
-    except Exception as e:
-        print(f"Error in /create/next-step-options-fallback: {e}")
+    except Exception:
+        logger.exception("Error in /create/next-step-options-fallback")
         raise HTTPException(
             status_code=500,
             detail="Bir sonraki adım oluşturulürken bir sunucu hatası oluştu (fallback).",
@@ -410,7 +555,7 @@ async def create_next_step_fallback_endpoint(
     response_model=Dict[str, Any],
     summary="Create a new pyramid event for tracking"
 )
-async def create_pyramid_event_endpoint(
+def create_pyramid_event_endpoint(
     data: dict = Body(..., example={"pyramid_id": "pyramid_id_here"}),
     user: UserOut = Depends(verify_token),
 ):
@@ -421,11 +566,13 @@ async def create_pyramid_event_endpoint(
             raise HTTPException(status_code=422, detail="Pyramid ID is required.")
         
         # Verify pyramid belongs to user
-        pyramid_doc = pyramid_service.pyramid_table.find_one({"_id": ObjectId(pyramid_id)})
-        if not pyramid_doc:
-            raise HTTPException(status_code=404, detail="Pyramid not found.")
-        if pyramid_doc.get("user_id") != user.id:
-            raise HTTPException(status_code=403, detail="Access denied to this pyramid.")
+        _load_and_authorize(
+            pyramid_id,
+            user.id,
+            projection={"_id": 1},
+            not_found_detail="Pyramid not found.",
+            forbidden_detail="Access denied to this pyramid.",
+        )
         
         event = create_pyramid_event(user.id, pyramid_id)
         return {
@@ -435,8 +582,8 @@ async def create_pyramid_event_endpoint(
         }
     except HTTPException:
         raise
-    except Exception as e:
-        print(f"Error creating pyramid event: {e}")
+    except Exception:
+        logger.exception("Error creating pyramid event")
         raise HTTPException(status_code=500, detail="Error creating pyramid event.")
 
 
@@ -445,13 +592,14 @@ async def create_pyramid_event_endpoint(
     response_model=Dict[str, Any],
     summary="Add a step to an existing pyramid event"
 )
-async def add_pyramid_step_endpoint(
+def add_pyramid_step_endpoint(
     event_id: str,
     data: dict = Body(..., example={"step": {...}, "step_type": "expand"}),
     user: UserOut = Depends(verify_token),
 ):
     """Add a completed step to the pyramid event for tracking."""
     try:
+        _oid(event_id, "Invalid event ID.")
         step_data = data.get("step")
         step_type = data.get("step_type")
         
@@ -473,8 +621,8 @@ async def add_pyramid_step_endpoint(
         }
     except HTTPException:
         raise
-    except Exception as e:
-        print(f"Error adding step to pyramid event: {e}")
+    except Exception:
+        logger.exception("Error adding step to pyramid event")
         raise HTTPException(status_code=500, detail="Error adding step to pyramid event.")
 
 
@@ -489,8 +637,9 @@ async def complete_pyramid_event_endpoint(
 ):
     """Complete a pyramid event and award XP to the user."""
     try:
+        _oid(event_id, "Invalid event ID.")
         # Verify event belongs to user
-        event = get_pyramid_event(event_id)
+        event = await to_thread.run_sync(get_pyramid_event, event_id)
         if not event:
             raise HTTPException(status_code=404, detail="Event not found.")
         if event.get("user_id") != user.id:
@@ -500,19 +649,19 @@ async def complete_pyramid_event_endpoint(
         if not completed_event:
             raise HTTPException(status_code=500, detail="Failed to complete pyramid event.")
         
-        xp_earned = completed_event.get("details", {}).get("xp_earned", 0)
+        details = completed_event.get("details") or {}
         return {
             "message": "Pyramid event completed successfully.",
             "event_id": event_id,
-            "xp_earned": xp_earned,
-            "duration_seconds": completed_event.get("details", {}).get("duration_seconds", 0),
-            "accuracy_rate": completed_event.get("details", {}).get("accuracy_rate", 0.0),
-            "avg_time_per_step": completed_event.get("details", {}).get("avg_time_per_step", 0.0)
+            "xp_earned": details.get("xp_earned", 0),
+            "duration_seconds": details.get("duration_seconds", 0),
+            "accuracy_rate": details.get("accuracy_rate", 0.0),
+            "avg_time_per_step": details.get("avg_time_per_step", 0.0)
         }
     except HTTPException:
         raise
-    except Exception as e:
-        print(f"Error completing pyramid event: {e}")
+    except Exception:
+        logger.exception("Error completing pyramid event")
         raise HTTPException(status_code=500, detail="Error completing pyramid event.")
 
 
@@ -521,45 +670,61 @@ async def complete_pyramid_event_endpoint(
     response_model=Dict[str, Any],
     summary="Get pyramid event details"
 )
-async def get_pyramid_event_endpoint(
+def get_pyramid_event_endpoint(
     event_id: str,
     user: UserOut = Depends(verify_token),
 ):
     """Get details of a specific pyramid event."""
     try:
+        _oid(event_id, "Invalid event ID.")
         event = get_pyramid_event(event_id)
         if not event:
             raise HTTPException(status_code=404, detail="Event not found.")
         if event.get("user_id") != user.id:
             raise HTTPException(status_code=403, detail="Access denied to this event.")
         
+        details = event.get("details") or {}
         return {
             "event_id": event_id,
             "pyramid_id": event.get("event_id"),
-            "completed": event.get("details", {}).get("completed", False),
-            "total_steps": event.get("details", {}).get("total_steps", 0),
-            "completed_steps": event.get("details", {}).get("completed_steps", 0),
-            "duration_seconds": event.get("details", {}).get("duration_seconds", 0),
-            "accuracy_rate": event.get("details", {}).get("accuracy_rate", 0.0),
-            "avg_time_per_step": event.get("details", {}).get("avg_time_per_step", 0.0),
-            "xp_earned": event.get("details", {}).get("xp_earned", 0),
-            "session_start": event.get("details", {}).get("session_start"),
-            "session_end": event.get("details", {}).get("session_end"),
-            "step_types": event.get("details", {}).get("step_types", [])
+            "completed": details.get("completed", False),
+            "total_steps": details.get("total_steps", 0),
+            "completed_steps": details.get("completed_steps", 0),
+            "duration_seconds": details.get("duration_seconds", 0),
+            "accuracy_rate": details.get("accuracy_rate", 0.0),
+            "avg_time_per_step": details.get("avg_time_per_step", 0.0),
+            "xp_earned": details.get("xp_earned", 0),
+            "session_start": details.get("session_start"),
+            "session_end": details.get("session_end"),
+            "step_types": details.get("step_types", [])
         }
     except HTTPException:
         raise
-    except Exception as e:
-        print(f"Error getting pyramid event: {e}")
+    except Exception:
+        logger.exception("Error getting pyramid event")
         raise HTTPException(status_code=500, detail="Error retrieving pyramid event.")
 
 
+def _pyramid_event_summary(event: Dict[str, Any], details: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "event_id": event["_id"],
+        "pyramid_id": event.get("event_id"),
+        "timestamp": event.get("timestamp"),
+        "completed": details.get("completed", False),
+        "total_steps": details.get("total_steps", 0),
+        "duration_seconds": details.get("duration_seconds", 0),
+        "accuracy_rate": details.get("accuracy_rate", 0.0),
+        "xp_earned": details.get("xp_earned", 0),
+        "step_types": details.get("step_types", []),
+    }
+
+
 @router.get(
     "/events/recent",
     response_model=List[Dict[str, Any]],
     summary="Get recent completed pyramid events"
 )
-async def get_recent_pyramid_events_endpoint(
+def get_recent_pyramid_events_endpoint(
     days: int = Query(5, description="Number of days to look back"),
     user: UserOut = Depends(verify_token),
 ):
@@ -567,21 +732,10 @@ async def get_recent_pyramid_events_endpoint(
     try:
         events = get_recent_completed_pyramid_events(user.id, days)
         
-        result = []
-        for event in events:
-            result.append({
-                "event_id": str(event["_id"]),
-                "pyramid_id": event.get("event_id"),
-                "timestamp": event.get("timestamp"),
-                "completed": event.get("details", {}).get("completed", False),
-                "total_steps": event.get("details", {}).get("total_steps", 0),
-                "duration_seconds": event.get("details", {}).get("duration_seconds", 0),
-                "accuracy_rate": event.get("details", {}).get("accuracy_rate", 0.0),
-                "xp_earned": event.get("details", {}).get("xp_earned", 0),
-                "step_types": event.get("details", {}).get("step_types", [])
-            })
-        
-        return result
-    except Exception as e:
-        print(f"Error getting recent pyramid events: {e}")
+        return [
+            _pyramid_event_summary(event, event.get("details") or {})
+            for event in events
+        ]
+    except Exception:
+        logger.exception("Error getting recent pyramid events")
         raise HTTPException(status_code=500, detail="Error retrieving recent pyramid events.")
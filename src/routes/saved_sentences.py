@@ -1,3 +1,4 @@
+from anyio import to_thread
 from fastapi import APIRouter, Depends, Body
 from src.services.saved_sentence_service import (
     save_sentence,
@@ -7,7 +8,7 @@ from src.services.saved_sentence_service import (
     get_saved_sentences_count
 )
 from src.services.authentication_service import verify_token
-from src.services.content_check_service import check_user_content
+from src.services.content_check_service import check_user_contents
 from src.models.saved_sentence import (
     SaveSentenceRequest,
     DeleteSavedSentenceRequest,
@@ -24,19 +25,19 @@ async def save_sentence_endpoint(
     """
     Save a sentence to the user's saved sentences list
     """
-    # Check content appropriateness
-    if save_data.sentence:
-        check_user_content(save_data.sentence, "sentence", str(current_user.id))
-    if save_data.meaning:
-        check_user_content(save_data.meaning, "sentence", str(current_user.id))
-    if save_data.source_sentence:
-        check_user_content(save_data.source_sentence, "sentence", str(current_user.id))
-    
-    return save_sentence(current_user.id, save_data)
+    # Check content appropriateness (all fields in one moderation request)
+    await check_user_contents(
+        (save_data.sentence, save_data.meaning, save_data.source_sentence),
+        "sentence",
+        str(current_user.id),
+    )
+
+    # Moderasyon beklendiği için endpoint async kalır; PyMongo yazması thread havuzunda çalışır
+    return await to_thread.run_sync(save_sentence, current_user.id, save_data)
 
 
 @router.delete("/delete")
-async def delete_saved_sentence_endpoint(
+def delete_saved_sentence_endpoint(
     delete_data: DeleteSavedSentenceRequest, current_user=Depends(verify_token)
 ):
     """
@@ -50,7 +51,7 @@ async def delete_saved_sentence_endpoint(
 
 
 @router.get("/get")
-async def get_saved_sentences_endpoint(current_user=Depends(verify_token)):
+def get_saved_sentences_endpoint(current_user=Depends(verify_token)):
     """
     Get all saved sentences for a user
     """
@@ -58,7 +59,7 @@ async def get_saved_sentences_endpoint(current_user=Depends(verify_token)):
 
 
 @router.post("/check")
-async def check_saved_sentence_endpoint(
+def check_saved_sentence_endpoint(
     check_data: CheckSavedSentenceRequest, current_user=Depends(verify_token)
 ):
     """
@@ -72,7 +73,7 @@ async def check_saved_sentence_endpoint(
 
 
 @router.get("/count")
-async def get_saved_sentences_count_endpoint(current_user=Depends(verify_token)):
+def get_saved_sentences_count_endpoint(current_user=Depends(verify_token)):
     """
     Get the count of saved sentences for a user
     """
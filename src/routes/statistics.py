@@ -1,6 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Body
+from fastapi import APIRouter, Depends, HTTPException, status, Body, Response
 from src.models.user import UserOut
-from src.services.statistics_service import get_user_statistics, update_user_statistics
+from src.services.statistics_service import (
+    get_user_statistics,
+    get_user_statistics_json,
+    update_user_statistics,
+)
 from src.services.authentication_service import verify_token
 from typing import Dict, Any
 
@@ -10,16 +14,17 @@ router = APIRouter(
 )
 
 
-@router.get("/get/all", response_model=Dict[str, Any])
-async def get_statistics(user: UserOut = Depends(verify_token)):
+@router.get("/get/all", responses={200: {"content": {"application/json": {}}}})
+def get_statistics(user: UserOut = Depends(verify_token)):
     """
     Get all statistics for the authenticated user
     """
-    return get_user_statistics(user.id)
+    # Önbellekteki JSON baytları yeniden doğrulanmadan/serileştirilmeden gönderilir
+    return Response(content=get_user_statistics_json(user.id), media_type="application/json")
 
 
 @router.get("/get/vocabulary", response_model=Dict[str, Any])
-async def get_vocabulary_statistics(
+def get_vocabulary_statistics(
     user: UserOut = Depends(verify_token),
 ):
     """
@@ -38,7 +43,7 @@ async def get_vocabulary_statistics(
 
 
 @router.get("/get/pyramid", response_model=Dict[str, Any])
-async def get_pyramid_statistics(user: UserOut = Depends(verify_token)):
+def get_pyramid_statistics(user: UserOut = Depends(verify_token)):
     """
     Get pyramid statistics for the authenticated user
     """
@@ -55,7 +60,7 @@ async def get_pyramid_statistics(user: UserOut = Depends(verify_token)):
 
 
 @router.put("/update/{stats_type}", response_model=Dict[str, Any])
-async def update_statistics(
+def update_statistics(
     stats_type: str,
     stats_data: Dict[str, Any] = Body(...),
     user: UserOut = Depends(verify_token),
@@ -1,12 +1,45 @@
+import asyncio
+import functools
+from typing import Dict
+
+from anyio import to_thread
 from fastapi import APIRouter, Depends
 from src.models.user import UserOut
 from src.services import suggested_module_service
 from src.services.authentication_service import verify_token
+from src.settings import SUGGESTED_MODULE_CACHE_TTL
 
 router = APIRouter(prefix="/suggested-module", tags=["suggested-module"])
 
+# user_id -> öneri hesaplaması. Aynı kullanıcının eşzamanlı istekleri tek hesaplamayı bekler;
+# başarılı sonuç SUGGESTED_MODULE_CACHE_TTL saniye daha tutulur, hatalar hemen bırakılır.
+_suggestions: Dict[str, "asyncio.Task[str]"] = {}
+
+
+def _forget_suggestion(user_id: str, task: "asyncio.Task[str]") -> None:
+    if _suggestions.get(user_id) is task:
+        del _suggestions[user_id]
+
+
+def _on_suggestion_done(user_id: str, task: "asyncio.Task[str]") -> None:
+    if task.cancelled() or task.exception() is not None:
+        _forget_suggestion(user_id, task)
+    else:
+        task.get_loop().call_later(
+            SUGGESTED_MODULE_CACHE_TTL, _forget_suggestion, user_id, task
+        )
+
 
 @router.get("/get")
 async def get_suggested_module(user: UserOut = Depends(verify_token)):
-    module_type = suggested_module_service.get_suggested_module_type(user.id)
+    task = _suggestions.get(user.id)
+    if task is None:
+        # PyMongo sorguları thread havuzunda çalışır
+        task = asyncio.create_task(
+            to_thread.run_sync(suggested_module_service.get_suggested_module_type, user.id)
+        )
+        task.add_done_callback(functools.partial(_on_suggestion_done, user.id))
+        _suggestions[user.id] = task
+    # Bir istemcinin bağlantısı kopsa da diğerlerinin beklediği hesaplama iptal edilmez
+    module_type = await asyncio.shield(task)
     return {"module_type": module_type}
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from fastapi import APIRouter, Depends, HTTPException, Body
 from src.models.user import UserIn, UserOut, UserUpdate, PasswordChange
 from src.services.user_service import (
@@ -21,14 +23,14 @@ router = APIRouter(prefix="/user", tags=["User"])
 async def register(user_data: UserIn):
     # Check username content appropriateness
     if user_data.username:
-        check_user_content(user_data.username, "username")
+        await check_user_content(user_data.username, "username")
     
     # Process user purpose if provided
     if user_data.purpose:
         # Create user first, then update with processed purpose
         user = create_user(user_data)
         try:
-            process_user_purpose_explanation(
+            await process_user_purpose_explanation(
                 user_explanation=user_data.purpose,
                 user_id=str(user["id"]),
                 update_user_profile=True
@@ -59,12 +61,12 @@ async def get_user(user_id: str, current_user=Depends(verify_token)):
 async def update_user_route(user_data: UserUpdate, current_user=Depends(verify_token)):
     # Check username content appropriateness if being updated
     if user_data.username:
-        check_user_content(user_data.username, "username", str(current_user.id))
+        await check_user_content(user_data.username, "username", str(current_user.id))
     
     # Process user purpose if provided
     if user_data.purpose:
         try:
-            process_user_purpose_explanation(
+            await process_user_purpose_explanation(
                 user_explanation=user_data.purpose,
                 user_id=str(current_user.id),
                 update_user_profile=True
@@ -128,7 +130,7 @@ async def logout(current_user=Depends(verify_token)):
 
 @router.get("/events")
 async def get_activities(
-    limit: int = 50, event_type: EventType = None, current_user=Depends(verify_token)
+    limit: int = 50, event_type: Optional[EventType] = None, current_user=Depends(verify_token)
 ):
     """Get user activity history"""
     events = get_user_events(str(current_user.id), event_type, limit)
@@ -1,6 +1,9 @@
-from fastapi import APIRouter, Depends, Body
+from anyio import to_thread
+from fastapi import APIRouter, Depends, Body, HTTPException
+from fastapi.responses import StreamingResponse
 from src.services.vocabulary_service import (
     create_vocabulary,
+    stream_vocabulary,
     return_test_data,
     track_hint_usage,
     track_attempt_result,
@@ -16,7 +19,7 @@ from src.services.vocabulary_service import (
     get_popular_vocabularies,
 )
 from src.services.authentication_service import verify_token
-from src.services.content_check_service import check_user_content
+from src.services.content_check_service import check_user_contents
 from src.models.vocabulary import HintUsageRequest, AttemptResult, SaveVocabularyRequest
 from src.services.event_service import (
     create_vocabulary_event,
@@ -32,18 +35,34 @@ router = APIRouter(prefix="/vocabulary", tags=["Vocabulary"])
 
 
 @router.post("/create")
-def create_vocabulary_endpoint(
+async def create_vocabulary_endpoint(
     data: dict = Body(...), current_user=Depends(verify_token)
 ):
     system_language = data.get(
         "system_language", "English"
     )  # Default to English if not provided
-    return create_vocabulary(current_user.id, system_language)
+    return await create_vocabulary(current_user.id, system_language)
+
+
+@router.post("/stream/create")
+async def stream_vocabulary_endpoint(
+    data: dict = Body(...), current_user=Depends(verify_token)
+):
+    """
+    Create a vocabulary list and stream it as NDJSON: one "word" line per generated
+    word as soon as it is ready, then a final "list" line with the stored list
+    """
+    system_language = data.get("system_language", "English")
+    try:
+        lines = await stream_vocabulary(current_user.id, system_language)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return StreamingResponse(lines, media_type="application/x-ndjson")
 
 
 @router.get("/test")
-def test_vocabulary_endpoint(current_user=Depends(verify_token)):
-    return return_test_data(current_user.id)
+async def test_vocabulary_endpoint(current_user=Depends(verify_token)):
+    return await return_test_data(current_user.id)
 
 
 @router.post("/track-hint")
@@ -99,23 +118,21 @@ def get_word_statistics_endpoint(current_user=Depends(verify_token)):
 
 
 @router.post("/save")
-def save_vocabulary_endpoint(
+async def save_vocabulary_endpoint(
     save_data: SaveVocabularyRequest, current_user=Depends(verify_token)
 ):
     """
     Save a vocabulary word to the user's saved_vocabularies list
     """
-    # Check content appropriateness
-    if save_data.word:
-        check_user_content(save_data.word, "vocabulary", str(current_user.id))
-    if save_data.meaning:
-        check_user_content(save_data.meaning, "vocabulary", str(current_user.id))
-    if save_data.relevantWords:
-        for relevant_word in save_data.relevantWords:
-            if relevant_word:
-                check_user_content(relevant_word, "vocabulary", str(current_user.id))
-    
-    return save_vocabulary(current_user.id, save_data)
+    # Check content appropriateness (all fields in one moderation request)
+    await check_user_contents(
+        (save_data.word, save_data.meaning, *(save_data.relevantWords or [])),
+        "vocabulary",
+        str(current_user.id),
+    )
+
+    # Moderasyon beklendiği için endpoint async kalır; PyMongo yazması thread havuzunda çalışır
+    return await to_thread.run_sync(save_vocabulary, current_user.id, save_data)
 
 
 @router.delete("/delete/saved")
@@ -1,6 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+import logging
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import ORJSONResponse
 from src.services.authentication_service import verify_token
-from src.services.content_check_service import check_user_content
+from src.services.content_check_service import check_user_content, check_user_contents
 from src.models.writing import (
     DetailedWritingResponse, 
     WritingEvaluationRequest, 
@@ -33,6 +35,8 @@ from typing import Optional
 
 router = APIRouter(prefix="/writing", tags=["Writing Evaluation"])
 
+logger = logging.getLogger(__name__)
+
 @router.post("/evaluate", response_model=DetailedWritingResponse)
 async def evaluate_writing(
     request: WritingEvaluationRequest,
@@ -47,7 +51,7 @@ async def evaluate_writing(
     try:
         # Check content appropriateness for user text only
         if request.text:
-            check_user_content(request.text, "writing", str(user.id) if user else None)
+            await check_user_content(request.text, "writing", str(user.id) if user else None)
         
         # Get user_id if user is authenticated
         user_id = str(user.id) if user else None
@@ -62,8 +66,8 @@ async def evaluate_writing(
         )
         
         return result
-    except Exception as e:
-        print(f"Error in writing evaluation: {str(e)}")
+    except Exception:
+        logger.exception("Error in writing evaluation")
         raise HTTPException(status_code=500, detail="Failed to evaluate writing")
 
 @router.post("/evaluate/guest", response_model=DetailedWritingResponse)
@@ -77,7 +81,7 @@ async def evaluate_writing_guest(request: WritingEvaluationRequest):
     try:
         # Check content appropriateness for user text only
         if request.text:
-            check_user_content(request.text, "writing")
+            await check_user_content(request.text, "writing")
         
         # Use writing service to evaluate text without user_id (no XP awarded)
         # For guest users, default to English for both languages
@@ -89,8 +93,8 @@ async def evaluate_writing_guest(request: WritingEvaluationRequest):
         )
         
         return result
-    except Exception as e:
-        print(f"Error in guest writing evaluation: {str(e)}")
+    except Exception:
+        logger.exception("Error in guest writing evaluation")
         raise HTTPException(status_code=500, detail="Failed to evaluate writing")
 
 @router.post("/answer", response_model=WritingAnswerResponse)
@@ -110,7 +114,7 @@ async def answer_writing_question_endpoint(
     try:
         # Check content appropriateness
         if request.answer:
-            check_user_content(request.answer, "writing", str(user.id))
+            await check_user_content(request.answer, "writing", str(user.id))
         
         result = await answer_writing_question(
             user_id=str(user.id),
@@ -130,8 +134,8 @@ async def answer_writing_question_endpoint(
         return result
     except HTTPException:
         raise
-    except Exception as e:
-        print(f"Error answering writing question: {str(e)}")
+    except Exception:
+        logger.exception("Error answering writing question")
         raise HTTPException(status_code=500, detail="Failed to process writing answer")
 
 @router.post("/answer-scenarios", response_model=WritingScenarioAnswerResponse)
@@ -151,12 +155,17 @@ async def answer_writing_question_scenarios_endpoint(
     try:
         # Check content appropriateness for all scenario answers
         if request.scenario_answers:
-            for scenario_answer in request.scenario_answers:
-                if scenario_answer.answer:
-                    check_user_content(scenario_answer.answer, "writing", str(user.id))
+            # Tüm cevaplar tek moderasyon isteğiyle kontrol edilir
+            await check_user_contents(
+                (scenario_answer.answer for scenario_answer in request.scenario_answers),
+                "writing",
+                str(user.id),
+            )
         
-        print(f"DEBUG: Received scenario answer request for question {request.question_id}, level {request.level}")
-        print(f"DEBUG: Number of scenario answers: {len(request.scenario_answers)}")
+        logger.debug(
+            "Scenario answer request for question %s, level %s (%d answers)",
+            request.question_id, request.level, len(request.scenario_answers),
+        )
         result = await answer_writing_question_with_scenarios(
             user_id=str(user.id),
             request=request,
@@ -173,8 +182,8 @@ async def answer_writing_question_scenarios_endpoint(
         return result
     except HTTPException:
         raise
-    except Exception as e:
-        print(f"Error answering writing question with scenarios: {str(e)}")
+    except Exception:
+        logger.exception("Error answering writing question with scenarios")
         raise HTTPException(status_code=500, detail="Failed to process writing scenario answers")
 
 @router.get("/answer/{level}/{question_id}")
@@ -206,8 +215,8 @@ async def get_user_answer(
         return response
     except HTTPException:
         raise
-    except Exception as e:
-        print(f"Error retrieving user answer: {str(e)}")
+    except Exception:
+        logger.exception("Error retrieving user answer")
         raise HTTPException(status_code=500, detail="Failed to retrieve answer")
 
 
@@ -232,12 +241,13 @@ async def get_questions_by_level(
                 status_code=404, 
                 detail=f"No questions found for level: {level}"
             )
-            
-        return questions
+
+        # response_model yalnızca dokümantasyon için; model doğrudan pydantic-core ile JSON'a yazılır
+        return Response(content=questions.model_dump_json(), media_type="application/json")
     except HTTPException:
         raise
-    except Exception as e:
-        print(f"Error retrieving writing questions for level {level}: {str(e)}")
+    except Exception:
+        logger.exception("Error retrieving writing questions for level %s", level)
         raise HTTPException(status_code=500, detail="Failed to retrieve writing questions")
 
 
@@ -251,9 +261,9 @@ async def get_available_levels():
     """
     try:
         levels = get_all_writing_levels()
-        return {"levels": levels}
-    except Exception as e:
-        print(f"Error retrieving writing levels: {str(e)}")
+        return ORJSONResponse({"levels": levels})
+    except Exception:
+        logger.exception("Error retrieving writing levels")
         raise HTTPException(status_code=500, detail="Failed to retrieve writing levels")
 
 
@@ -270,9 +280,9 @@ async def get_writing_progress(
     """
     try:
         progress = get_user_writing_progress(str(user.id), level)
-        return progress
-    except Exception as e:
-        print(f"Error retrieving writing progress for level {level}: {str(e)}")
+        return ORJSONResponse(progress)
+    except Exception:
+        logger.exception("Error retrieving writing progress for level %s", level)
         raise HTTPException(status_code=500, detail="Failed to retrieve writing progress")
 
 
@@ -289,8 +299,8 @@ async def get_suggested_question(
     try:
         question = get_first_unsolved_question(str(user.id), user.learning_language)
         return {"question": question}
-    except Exception as e:
-        print(f"Error retrieving suggested question: {str(e)}")
+    except Exception:
+        logger.exception("Error retrieving suggested question")
         raise HTTPException(status_code=500, detail="Failed to retrieve suggested question")
 
 
@@ -330,8 +340,8 @@ async def create_writing_session_event(
         return {"event_id": event["_id"], "message": "Writing session started"}
     except HTTPException:
         raise
-    except Exception as e:
-        print(f"Error creating writing event: {str(e)}")
+    except Exception:
+        logger.exception("Error creating writing event")
         raise HTTPException(status_code=500, detail="Failed to create writing session")
 
 
@@ -358,8 +368,8 @@ async def get_writing_session_event(
         return event
     except HTTPException:
         raise
-    except Exception as e:
-        print(f"Error retrieving writing event: {str(e)}")
+    except Exception:
+        logger.exception("Error retrieving writing event")
         raise HTTPException(status_code=500, detail="Failed to retrieve writing session")
 
 
@@ -406,8 +416,8 @@ async def update_writing_session_progress(
         return {"message": "Progress updated successfully", "event": updated_event}
     except HTTPException:
         raise
-    except Exception as e:
-        print(f"Error updating writing progress: {str(e)}")
+    except Exception:
+        logger.exception("Error updating writing progress")
         raise HTTPException(status_code=500, detail="Failed to update writing progress")
 
 
@@ -427,7 +437,7 @@ async def complete_writing_session(
     try:
         # Check content appropriateness
         if final_answer:
-            check_user_content(final_answer, "writing", str(user.id))
+            await check_user_content(final_answer, "writing", str(user.id))
         
         # Verify the event belongs to the user
         event = get_writing_event(event_id)
@@ -477,8 +487,8 @@ async def complete_writing_session(
         }
     except HTTPException:
         raise
-    except Exception as e:
-        print(f"Error completing writing session: {str(e)}")
+    except Exception:
+        logger.exception("Error completing writing session")
         raise HTTPException(status_code=500, detail="Failed to complete writing session")
 
 
@@ -496,11 +506,12 @@ async def get_recent_writing_events(
     try:
         events = get_recent_completed_writing_events(str(user.id), days)
         
-        return {
+        # _id alanları servis tarafında str'ye çevrilir; geri kalan alanlar orjson ile doğrudan yazılır
+        return ORJSONResponse({
             "events": events,
             "total_events": len(events),
             "days": days
-        }
-    except Exception as e:
-        print(f"Error retrieving recent writing events: {str(e)}")
+        })
+    except Exception:
+        logger.exception("Error retrieving recent writing events")
         raise HTTPException(status_code=500, detail="Failed to retrieve recent writing events")
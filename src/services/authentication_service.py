@@ -1,8 +1,11 @@
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
+import threading
+import time
 import bcrypt
-from src.models.user import UserOut
+from src.models.user import LoginCredentials, UserOut
 from fastapi import Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
+from fastapi.security import OAuth2PasswordBearer
 import jwt
 from src.settings import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
 from pydantic import BaseModel
@@ -34,6 +37,51 @@ def create_refresh_token(data: dict) -> str:
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
+# Çözülmüş token claim'leri token string'ine göre saklanır (süreç başına, en fazla
+# _TOKEN_CACHE_SIZE kayıt, en eski kullanılan atılır). Süresi dolan kayıt okunurken silinir.
+_TOKEN_CACHE_SIZE = 4096
+_token_cache: "OrderedDict[str, dict]" = OrderedDict()
+_token_cache_lock = threading.Lock()
+
+
+def _decode_access_token(token: str) -> dict:
+    """
+    Decode a bearer token, reusing the claims of tokens seen recently.
+    Invalid tokens raise and are not cached; expiry is re-checked on every cache hit.
+    """
+    with _token_cache_lock:
+        payload = _token_cache.get(token)
+        if payload is not None:
+            _token_cache.move_to_end(token)
+
+    if payload is not None:
+        exp = payload.get("exp")
+        if exp is None or exp > time.time():
+            return payload
+        with _token_cache_lock:
+            _token_cache.pop(token, None)
+        raise jwt.ExpiredSignatureError("Signature has expired")
+
+    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    with _token_cache_lock:
+        _token_cache[token] = payload
+        if len(_token_cache) > _TOKEN_CACHE_SIZE:
+            _token_cache.popitem(last=False)
+    return payload
+
+
+# Yalnızca UserOut için gereken alanlar okunur (şifre hash'i vb. taşınmaz)
+_TOKEN_USER_PROJECTION = {
+    "username": 1,
+    "email": 1,
+    "learning_language": 1,
+    "system_language": 1,
+    "purpose": 1,
+    "level": 1,
+    "xp": 1,
+}
+
+
 async def verify_token(token: str = Depends(oauth2_scheme)):
     credentials_exception = HTTPException(
         status_code=401,
@@ -41,7 +89,7 @@ async def verify_token(token: str = Depends(oauth2_scheme)):
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = _decode_access_token(token)
         user_id = payload.get("sub")
         if not user_id:
             raise credentials_exception
@@ -49,7 +97,7 @@ async def verify_token(token: str = Depends(oauth2_scheme)):
         if not ObjectId.is_valid(user_id):
             raise credentials_exception
 
-        user_doc = user_table.find_one({"_id": ObjectId(user_id)})
+        user_doc = user_table.find_one({"_id": ObjectId(user_id)}, _TOKEN_USER_PROJECTION)
         if not user_doc:
             raise credentials_exception
 
@@ -62,7 +110,6 @@ async def verify_token(token: str = Depends(oauth2_scheme)):
             purpose=user_doc["purpose"],
             level=user_doc["level"],
             xp=user_doc.get("xp", 0),
-            refresh_token=user_doc.get("refresh_token", ""),
         )
     except jwt.InvalidTokenError:
         raise credentials_exception
@@ -76,8 +123,7 @@ def verify_jwt_token(token: str) -> dict:
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
+        return _decode_access_token(token)
     except jwt.InvalidTokenError:
         raise credentials_exception
 
@@ -108,7 +154,7 @@ def verify_password(password: str, hashed_password: str) -> bool:
     return bcrypt.checkpw(password.encode(), hashed_password.encode())
 
 
-async def login(form_data: OAuth2PasswordRequestForm = Depends()):
+async def login(form_data: LoginCredentials):
     user_doc = user_table.find_one({"email": form_data.username})
     if not user_doc or not verify_password(
         form_data.password, user_doc["password_hash"]
@@ -10,28 +10,29 @@ using AI-powered analysis. It includes:
 Usage Examples:
 
 # Content Moderation
-result = moderate_user_content(
+result = await moderate_user_content(
     content="Hello, I want to learn English for my job",
     purpose="language learning",
     user_id="user123"
 )
 
 # Purpose Processing
-purpose_result = process_user_purpose_explanation(
+purpose_result = await process_user_purpose_explanation(
     user_explanation="I want to learn Spanish because I'm moving to Madrid for work",
     user_id="user123",
     update_user_profile=True
 )
 
 # Educational Content Validation
-validation_result = validate_educational_content(
+validation_result = await validate_educational_content(
     content="The cat sits on the mat",
     content_type="vocabulary",
     educational_level="beginner"
 )
 """
 
-from typing import Optional, Dict, Any
+import asyncio
+from typing import Iterable, Optional, Dict, Any
 from datetime import datetime, timezone
 from bson import ObjectId
 from fastapi import HTTPException, status
@@ -43,12 +44,17 @@ from src.api_clients.user_prompts import (
     PurposeSummaryResult,
 )
 from src.database.database import user_table
+from src.settings import MODERATION_MAX_CONCURRENCY
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Aynı anda yürüyen moderasyon kontrolleri sınırlanır; ani yüklerde istekler
+# burada sıraya girer, dışarıya açılan bağlantı sayısı büyümez
+_moderation_semaphore = asyncio.Semaphore(MODERATION_MAX_CONCURRENCY)
 
-def moderate_user_content(
+
+async def moderate_user_content(
     content: str,
     purpose: str,
     user_id: Optional[str] = None,
@@ -87,7 +93,7 @@ def moderate_user_content(
             )
 
         # Check content appropriateness using AI
-        moderation_result = check_content_appropriateness(
+        moderation_result = await check_content_appropriateness(
             content=content.strip(),
             purpose=purpose.strip(),
         )
@@ -139,7 +145,7 @@ def moderate_user_content(
         )
 
 
-def process_user_purpose_explanation(
+async def process_user_purpose_explanation(
     user_explanation: str,
     user_id: str,
     update_user_profile: bool = True,
@@ -183,7 +189,7 @@ def process_user_purpose_explanation(
                 )
 
         # Summarize user purpose using AI
-        summary_result = summarize_user_purpose(
+        summary_result = await summarize_user_purpose(
             user_explanation=user_explanation.strip(),
         )
 
@@ -296,7 +302,7 @@ def get_content_moderation_history(
         )
 
 
-def validate_educational_content(
+async def validate_educational_content(
     content: str,
     content_type: str,
     educational_level: str = "intermediate",
@@ -317,7 +323,7 @@ def validate_educational_content(
         purpose = f"{educational_level} level {content_type} for language learning"
 
         # Use the general moderation function with educational context
-        result = moderate_user_content(
+        result = await moderate_user_content(
             content=content,
             purpose=purpose,
         )
@@ -341,7 +347,7 @@ def validate_educational_content(
         )
 
 
-def check_user_content(
+async def check_user_content(
     content: str,
     content_type: str = "general",
     user_id: Optional[str] = None,
@@ -364,7 +370,8 @@ def check_user_content(
     """
     try:
         purpose = f"{content_type} content for language learning"
-        result = moderate_user_content(content=content, purpose=purpose, user_id=user_id)
+        async with _moderation_semaphore:
+            result = await moderate_user_content(content=content, purpose=purpose, user_id=user_id)
         
         if not result["is_appropriate"] and raise_on_inappropriate:
             raise HTTPException(
@@ -384,3 +391,26 @@ def check_user_content(
                 detail="Content validation service is currently unavailable"
             )
         return True  # Default to allowing content if service fails
+
+
+async def check_user_contents(
+    contents: Iterable[Optional[str]],
+    content_type: str = "general",
+    user_id: Optional[str] = None,
+    raise_on_inappropriate: bool = True,
+) -> bool:
+    """
+    Check several related texts (e.g. a sentence, its meaning and its source) with a
+    single moderation request instead of one request per text.
+
+    Empty texts are skipped. The texts are moderated together, so the result is False
+    (or HTTPException is raised) if any of them is inappropriate.
+    """
+    texts = [content.strip() for content in contents if content and content.strip()]
+    if not texts:
+        return True
+    if len(texts) == 1:
+        return await check_user_content(texts[0], content_type, user_id, raise_on_inappropriate)
+
+    combined = "\n\n".join(f"{index}. {text}" for index, text in enumerate(texts, 1))
+    return await check_user_content(combined, content_type, user_id, raise_on_inappropriate)
@@ -1,8 +1,18 @@
+import functools
 from datetime import datetime, timedelta
+from anyio import to_thread
 from bson import ObjectId
-from typing import Union, List
+from typing import Optional, Union, List
 from src.database.database import user_events_table, writing_table
-from src.models.user_event import UserEvent, EventType, VocabularyEvent, WritingEvent, PyramidEvent
+from pymongo import ReturnDocument
+from src.models.user_event import (
+    UserEvent,
+    EventType,
+    VocabularyEvent,
+    WritingEvent,
+    PyramidEvent,
+    PyramidStepDetail,
+)
 from src.models.pyramid import (
     PyramidShrinkItem,
     PyramidExpandItem,
@@ -36,20 +46,20 @@ def log_login(user_id: str) -> dict:
     """Log a user login event"""
     event = UserEvent(
         user_id=user_id,
-        event_type=EventType.LOGIN,
+        event_type="login",
     )
     return log_user_event(event)
 
 
 def log_logout(user_id: str) -> dict:
     """Log a user logout event"""
-    event = UserEvent(user_id=user_id, event_type=EventType.LOGOUT)
+    event = UserEvent(user_id=user_id, event_type="logout")
     return log_user_event(event)
 
 
 def log_refresh_token(user_id: str) -> dict:
     """Log a refresh token event"""
-    event = UserEvent(user_id=user_id, event_type=EventType.REFRESH_TOKEN)
+    event = UserEvent(user_id=user_id, event_type="refresh_token")
     return log_user_event(event)
 
 
@@ -64,7 +74,7 @@ def log_learning_activity(
 
 
 def get_user_events(
-    user_id: str, event_type: EventType = None, limit: int = 50
+    user_id: str, event_type: Optional[EventType] = None, limit: int = 50
 ) -> list:
     """Get user events, optionally filtered by event type"""
     query = {"user_id": user_id}
@@ -82,10 +92,14 @@ def get_user_events(
 
 def log_app_open(user_id: str) -> dict:
     """Log when the application is opened by a user"""
-    event = UserEvent(user_id=user_id, event_type=EventType.APP_OPEN)
+    event = UserEvent(user_id=user_id, event_type="app_open")
     return log_user_event(event)
 
 
+# Öğrenme event tipleri
+LEARNING_EVENT_TYPES = ["pyramid", "vocabulary", "writing", "email"]
+
+
 def get_recent_learning_events(user_id: str, days: int = 5) -> list:
     """
     Son belirli gün sayısı içindeki öğrenme etkinliklerini getirir
@@ -103,18 +117,10 @@ def get_recent_learning_events(user_id: str, days: int = 5) -> list:
         hour=0, minute=0, second=0, microsecond=0
     ) - timedelta(days=days)
 
-    # Öğrenme event tipleri
-    learning_event_types = [
-        EventType.PYRAMID.value,
-        EventType.VOCABULARY.value,
-        EventType.WRITING.value,
-        EventType.EMAIL.value,
-    ]
-
     # MongoDB sorgusu
     query = {
         "user_id": user_id,
-        "event_type": {"$in": learning_event_types},
+        "event_type": {"$in": LEARNING_EVENT_TYPES},
         "timestamp": {"$gte": cutoff_date},
     }
 
@@ -127,6 +133,42 @@ def get_recent_learning_events(user_id: str, days: int = 5) -> list:
     return events
 
 
+def get_daily_learning_xp(user_id: str, days: int = 7, default_xp: int = 10) -> dict:
+    """
+    Son belirli gün sayısı içindeki öğrenme etkinliklerinin XP'sini gün bazında toplar.
+    Toplama MongoDB'de yapılır; event belgeleri uygulamaya taşınmaz.
+
+    Args:
+        user_id (str): Kullanıcı ID
+        days (int, optional): Kaç günlük veri toplanacağı. Varsayılan 7.
+        default_xp (int, optional): xp_earned içermeyen eventler için sayılan XP. Varsayılan 10.
+
+    Returns:
+        dict: "YYYY-MM-DD" (UTC gün) -> toplam XP
+    """
+    cutoff_date = datetime.utcnow().replace(
+        hour=0, minute=0, second=0, microsecond=0
+    ) - timedelta(days=days)
+
+    pipeline = [
+        {
+            "$match": {
+                "user_id": user_id,
+                "event_type": {"$in": LEARNING_EVENT_TYPES},
+                "timestamp": {"$gte": cutoff_date},
+            }
+        },
+        {
+            "$group": {
+                "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$timestamp"}},
+                "xp": {"$sum": {"$ifNull": ["$details.xp_earned", default_xp]}},
+            }
+        },
+    ]
+
+    return {doc["_id"]: doc["xp"] for doc in user_events_table.aggregate(pipeline)}
+
+
 ##########################################
 ###### Vocabulary Event Functions ########
 ##########################################
@@ -198,7 +240,7 @@ def get_vocabulary_event(event_id: str) -> dict:
         return None
 
     event = user_events_table.find_one(
-        {"_id": ObjectId(event_id), "event_type": EventType.VOCABULARY}
+        {"_id": ObjectId(event_id), "event_type": "vocabulary"}
     )
 
     if event:
@@ -222,7 +264,7 @@ def get_vocabulary_event_by_list_id(user_id: str, vocabulary_list_id: str) -> di
     event = user_events_table.find_one(
         {
             "user_id": user_id,
-            "event_type": EventType.VOCABULARY,
+            "event_type": "vocabulary",
             "event_id": vocabulary_list_id,
         },
         sort=[("timestamp", -1)],
@@ -249,36 +291,27 @@ async def complete_vocabulary_event(event_id: str) -> dict:
 
     # Get the current event
     event = user_events_table.find_one(
-        {"_id": ObjectId(event_id), "event_type": EventType.VOCABULARY}
+        {"_id": ObjectId(event_id), "event_type": "vocabulary"}
     )
 
     if not event:
         return None
 
-    # Create a VocabularyEvent object to use its methods
-    # Convert the MongoDB document to a VocabularyEvent
-    event_copy = event.copy()
-    event_copy["_id"] = str(event_copy["_id"])  # Convert ObjectId to string
-
-    # Move details fields to top-level for the VocabularyEvent constructor
-    if "details" in event_copy and isinstance(event_copy["details"], dict):
-        for key, value in event_copy["details"].items():
-            event_copy[key] = value
-
-    vocab_event = VocabularyEvent(**event_copy)
+    # Create a VocabularyEvent object to use its methods (trusted DB document, no re-validation)
+    vocab_event = VocabularyEvent.from_mongo(event)
 
     # Calculate accuracy
     vocab_event.calculate_accuracy()
 
     # Mark as completed
-    vocab_event.completed = True
+    vocab_event.details["completed"] = True
 
     # Calculate XP
     earned_xp = vocab_event.calculate_xp()
 
     # Update the event in the database
     updated_data = {
-        "details.accuracy_rate": vocab_event.accuracy_rate,
+        "details.accuracy_rate": vocab_event.details.get("accuracy_rate", 0.0),
         "details.completed": True,
         "details.xp_earned": earned_xp,
     }
@@ -298,14 +331,14 @@ async def complete_vocabulary_event(event_id: str) -> dict:
         # Log a learning activity summary event
         log_learning_activity(
             user_id=event["user_id"],
-            event_type=EventType.VOCABULARY,
+            event_type="vocabulary",
             activity_id=event["event_id"],
             details={
                 "completed": True,
-                "accuracy_rate": vocab_event.accuracy_rate,
+                "accuracy_rate": vocab_event.details.get("accuracy_rate", 0.0),
                 "xp_earned": earned_xp,
-                "duration_seconds": vocab_event.duration_seconds,
-                "total_hints": vocab_event.total_hints,
+                "duration_seconds": vocab_event.details.get("duration_seconds", 0),
+                "total_hints": vocab_event.details.get("total_hints", 0),
                 "summary": True,  # Flag to indicate this is a summary event
             },
         )
@@ -336,7 +369,7 @@ def get_recent_completed_vocabulary_events(user_id: str, days: int = 5) -> list:
     # Query for completed events
     query = {
         "user_id": user_id,
-        "event_type": EventType.VOCABULARY,
+        "event_type": "vocabulary",
         "details.completed": True,
         "timestamp": {"$gte": cutoff_date},
     }
@@ -399,18 +432,18 @@ def add_pyramid_step(event_id: str, step: PyramidItem, step_type: str) -> dict:
     if not ObjectId.is_valid(event_id):
         return None
 
-    # Convert the step to dict for storage
+    # Store a compact, typed step record (with timestamp) instead of the whole step dict
     step_dict = step.model_dump() if hasattr(step, "model_dump") else step
-    
-    # Add timestamp to step
-    step_dict["timestamp"] = datetime.utcnow().isoformat()
+    step_detail = PyramidStepDetail.model_validate(
+        {**step_dict, "step_type": step_type}
+    ).model_dump()
 
-    # Add the step to the steps array and increment counters
-    result = user_events_table.update_one(
+    # Add the step to the steps array, increment counters and return the updated event
+    updated_event = user_events_table.find_one_and_update(
         {"_id": ObjectId(event_id)},
         {
             "$push": {
-                "details.steps_detail": step_dict,
+                "details.steps_detail": step_detail,
                 "details.step_types": step_type
             },
             "$inc": {
@@ -421,14 +454,12 @@ def add_pyramid_step(event_id: str, step: PyramidItem, step_type: str) -> dict:
                 "details.last_step_timestamp": int(datetime.utcnow().timestamp())
             },
         },
+        return_document=ReturnDocument.AFTER,
     )
 
-    if result.modified_count > 0:
-        # Get the updated event
-        updated_event = user_events_table.find_one({"_id": ObjectId(event_id)})
-        if updated_event:
-            updated_event["_id"] = str(updated_event["_id"])
-            return updated_event
+    if updated_event:
+        updated_event["_id"] = str(updated_event["_id"])
+        return updated_event
     return None
 
 
@@ -479,7 +510,7 @@ def get_pyramid_event(event_id: str) -> dict:
         return None
 
     event = user_events_table.find_one(
-        {"_id": ObjectId(event_id), "event_type": EventType.PYRAMID}
+        {"_id": ObjectId(event_id), "event_type": "pyramid"}
     )
 
     if event:
@@ -501,7 +532,7 @@ def get_pyramid_event_by_id(user_id: str, pyramid_id: str) -> dict:
     """
     # Get the most recent event for this pyramid
     event = user_events_table.find_one(
-        {"user_id": user_id, "event_type": EventType.PYRAMID, "event_id": pyramid_id},
+        {"user_id": user_id, "event_type": "pyramid", "event_id": pyramid_id},
         sort=[("timestamp", -1)],
     )
 
@@ -524,29 +555,22 @@ async def complete_pyramid_event(event_id: str) -> dict:
     if not ObjectId.is_valid(event_id):
         return None
 
-    # Get the current event
-    event = user_events_table.find_one(
-        {"_id": ObjectId(event_id), "event_type": EventType.PYRAMID}
+    # Get the current event (PyMongo calls run in the thread pool; this is awaited from async routes)
+    event = await to_thread.run_sync(
+        user_events_table.find_one,
+        {"_id": ObjectId(event_id), "event_type": "pyramid"},
     )
 
     if not event:
         return None
 
-    # Create a PyramidEvent object to use its methods
-    # Convert the MongoDB document to a PyramidEvent
-    event_copy = event.copy()
-    event_copy["_id"] = str(event_copy["_id"])  # Convert ObjectId to string
-
-    # Move details fields to top-level for the PyramidEvent constructor
-    if "details" in event_copy and isinstance(event_copy["details"], dict):
-        for key, value in event_copy["details"].items():
-            event_copy[key] = value
-
-    pyramid_event = PyramidEvent(**event_copy)
+    # Create a PyramidEvent object to use its methods (trusted DB document, no re-validation)
+    pyramid_event = PyramidEvent.from_mongo(event)
 
     # Set completion data
-    pyramid_event.session_end = datetime.utcnow()
-    pyramid_event.completed = True
+    details = pyramid_event.details
+    details["session_end"] = datetime.utcnow()
+    details["completed"] = True
 
     # Calculate session duration
     pyramid_event.calculate_session_duration()
@@ -562,16 +586,19 @@ async def complete_pyramid_event(event_id: str) -> dict:
 
     # Update the event in the database
     updated_data = {
-        "details.session_end": pyramid_event.session_end.isoformat(),
+        "details.session_end": details["session_end"],
         "details.completed": True,
-        "details.duration_seconds": pyramid_event.duration_seconds,
-        "details.accuracy_rate": pyramid_event.accuracy_rate,
-        "details.avg_time_per_step": pyramid_event.avg_time_per_step,
+        "details.duration_seconds": details.get("duration_seconds", 0),
+        "details.accuracy_rate": details.get("accuracy_rate", 0.0),
+        "details.avg_time_per_step": details.get("avg_time_per_step", 0.0),
         "details.xp_earned": earned_xp,
     }
 
-    result = user_events_table.update_one(
-        {"_id": ObjectId(event_id)}, {"$set": updated_data}
+    # Only the first completion counts; a repeated or concurrent call does not award XP again
+    result = await to_thread.run_sync(
+        user_events_table.update_one,
+        {"_id": ObjectId(event_id), "details.completed": {"$ne": True}},
+        {"$set": updated_data},
     )
 
     if result.modified_count > 0:
@@ -583,31 +610,46 @@ async def complete_pyramid_event(event_id: str) -> dict:
                 await update_xp(user_id, current_xp["xp"] + earned_xp)
 
         # Log a learning activity summary event
-        log_learning_activity(
+        await to_thread.run_sync(functools.partial(
+            log_learning_activity,
             user_id=event["user_id"],
-            event_type=EventType.PYRAMID,
+            event_type="pyramid",
             activity_id=event["event_id"],
             details={
                 "completed": True,
                 "xp_earned": earned_xp,
-                "duration_seconds": pyramid_event.duration_seconds,
-                "accuracy_rate": pyramid_event.accuracy_rate,
-                "avg_time_per_step": pyramid_event.avg_time_per_step,
-                "total_steps": pyramid_event.total_steps,
-                "completed_steps": pyramid_event.completed_steps,
-                "step_types": pyramid_event.step_types,
+                "duration_seconds": details.get("duration_seconds", 0),
+                "accuracy_rate": details.get("accuracy_rate", 0.0),
+                "avg_time_per_step": details.get("avg_time_per_step", 0.0),
+                "total_steps": details.get("total_steps", 0),
+                "completed_steps": details.get("completed_steps", 0),
+                "step_types": details.get("step_types", []),
                 "summary": True,  # Flag to indicate this is a summary event
             },
-        )
+        ))
 
         # Return the updated event
-        updated_event = user_events_table.find_one({"_id": ObjectId(event_id)})
+        updated_event = await to_thread.run_sync(
+            user_events_table.find_one, {"_id": ObjectId(event_id)}
+        )
         if updated_event:
             updated_event["_id"] = str(updated_event["_id"])
             return updated_event
     return None
 
 
+_PYRAMID_EVENT_SUMMARY_PROJECTION = {
+    "event_id": 1,
+    "timestamp": 1,
+    "details.completed": 1,
+    "details.total_steps": 1,
+    "details.duration_seconds": 1,
+    "details.accuracy_rate": 1,
+    "details.xp_earned": 1,
+    "details.step_types": 1,
+}
+
+
 def get_recent_completed_pyramid_events(user_id: str, days: int = 5) -> list:
     """
     Get completed pyramid events for a user within the specified number of days
@@ -617,7 +659,7 @@ def get_recent_completed_pyramid_events(user_id: str, days: int = 5) -> list:
         days (int): Number of days to look back
 
     Returns:
-        list: List of completed pyramid events
+        list: Completed pyramid events (summary fields only), newest first
     """
     # Calculate cutoff date
     cutoff_date = datetime.utcnow() - timedelta(days=days)
@@ -625,12 +667,15 @@ def get_recent_completed_pyramid_events(user_id: str, days: int = 5) -> list:
     # Query for completed events
     query = {
         "user_id": user_id,
-        "event_type": EventType.PYRAMID,
+        "event_type": "pyramid",
         "details.completed": True,
         "timestamp": {"$gte": cutoff_date},
     }
 
-    events = list(user_events_table.find(query).sort("timestamp", -1))
+    # Adım detayları (steps, steps_detail) okunmaz; yalnızca özet alanları döner
+    events = list(
+        user_events_table.find(query, _PYRAMID_EVENT_SUMMARY_PROJECTION).sort("timestamp", -1)
+    )
 
     # Convert ObjectId to string
     for event in events:
@@ -721,7 +766,7 @@ def get_writing_event(event_id: str) -> dict:
         return None
 
     event = user_events_table.find_one(
-        {"_id": ObjectId(event_id), "event_type": EventType.WRITING}
+        {"_id": ObjectId(event_id), "event_type": "writing"}
     )
 
     if event:
@@ -745,7 +790,7 @@ def get_writing_event_by_question_id(user_id: str, question_id: str) -> dict:
     event = user_events_table.find_one(
         {
             "user_id": user_id,
-            "event_type": EventType.WRITING,
+            "event_type": "writing",
             "event_id": question_id,
         },
         sort=[("timestamp", -1)],
@@ -774,33 +819,25 @@ async def complete_writing_event(event_id: str, final_answer: str, ai_feedback:
 
     # Get the current event
     event = user_events_table.find_one(
-        {"_id": ObjectId(event_id), "event_type": EventType.WRITING}
+        {"_id": ObjectId(event_id), "event_type": "writing"}
     )
 
     if not event:
         return None
 
-    # Create a WritingEvent object to use its methods
-    # Convert the MongoDB document to a WritingEvent
-    event_copy = event.copy()
-    event_copy["_id"] = str(event_copy["_id"])  # Convert ObjectId to string
-
-    # Move details fields to top-level for the WritingEvent constructor
-    if "details" in event_copy and isinstance(event_copy["details"], dict):
-        for key, value in event_copy["details"].items():
-            event_copy[key] = value
-
-    writing_event = WritingEvent(**event_copy)
+    # Create a WritingEvent object to use its methods (trusted DB document, no re-validation)
+    writing_event = WritingEvent.from_mongo(event)
 
     # Set completion data
-    writing_event.session_end = datetime.utcnow()
-    writing_event.completed = True
-    writing_event.final_answer = final_answer
-    writing_event.ai_feedback = ai_feedback
+    details = writing_event.details
+    details["session_end"] = datetime.utcnow()
+    details["completed"] = True
+    details["final_answer"] = final_answer
+    details["ai_feedback"] = ai_feedback
     
     # Calculate word and character counts
-    writing_event.word_count = len(final_answer.split())
-    writing_event.character_count = len(final_answer)
+    details["word_count"] = len(final_answer.split())
+    details["character_count"] = len(final_answer)
 
     # Calculate session duration
     writing_event.calculate_session_duration()
@@ -810,13 +847,13 @@ async def complete_writing_event(event_id: str, final_answer: str, ai_feedback:
 
     # Update the event in the database
     updated_data = {
-        "details.session_end": writing_event.session_end.isoformat(),
+        "details.session_end": details["session_end"],
         "details.completed": True,
         "details.final_answer": final_answer,
         "details.ai_feedback": ai_feedback,
-        "details.word_count": writing_event.word_count,
-        "details.character_count": writing_event.character_count,
-        "details.duration_seconds": writing_event.duration_seconds,
+        "details.word_count": details.get("word_count", 0),
+        "details.character_count": details.get("character_count", 0),
+        "details.duration_seconds": details.get("duration_seconds", 0),
         "details.xp_earned": earned_xp,
     }
 
@@ -852,9 +889,9 @@ async def complete_writing_event(event_id: str, final_answer: str, ai_feedback:
             # Create question response record
             question_response = WritingQuestionResponse.from_evaluation(
                 user_id=event["user_id"],
-                question_id=writing_event.question_id,
-                level=writing_event.level,
-                question_text=writing_event.question_text or "",
+                question_id=details.get("question_id", ""),
+                level=details.get("level", ""),
+                question_text=details.get("question_text") or "",
                 user_answer=final_answer,
                 evaluation=evaluation
             )
@@ -862,7 +899,7 @@ async def complete_writing_event(event_id: str, final_answer: str, ai_feedback:
             # Save to writing_table to mark question as solved
             question_response_dict = question_response.model_dump()
             writing_table.replace_one(
-                {"user_id": event["user_id"], "question_id": writing_event.question_id, "level": writing_event.level},
+                {"user_id": event["user_id"], "question_id": details.get("question_id", ""), "level": details.get("level", "")},
                 question_response_dict,
                 upsert=True
             )
@@ -873,14 +910,14 @@ async def complete_writing_event(event_id: str, final_answer: str, ai_feedback:
         # Log a learning activity summary event
         log_learning_activity(
             user_id=event["user_id"],
-            event_type=EventType.WRITING,
+            event_type="writing",
             activity_id=event["event_id"],
             details={
                 "completed": True,
                 "xp_earned": earned_xp,
-                "duration_seconds": writing_event.duration_seconds,
-                "word_count": writing_event.word_count,
-                "level": writing_event.level,
+                "duration_seconds": details.get("duration_seconds", 0),
+                "word_count": details.get("word_count", 0),
+                "level": details.get("level", ""),
                 "summary": True,  # Flag to indicate this is a summary event
             },
         )
@@ -911,7 +948,7 @@ def get_recent_completed_writing_events(user_id: str, days: int = 5) -> list:
     # Query for completed events
     query = {
         "user_id": user_id,
-        "event_type": EventType.WRITING,
+        "event_type": "writing",
         "details.completed": True,
         "timestamp": {"$gte": cutoff_date},
     }
@@ -1,18 +1,64 @@
 # src/services/google_service.py
 
 from fastapi import HTTPException
+from anyio import to_thread
 from datetime import timedelta
 import secrets
+import threading
+import time
 from google.oauth2 import id_token
+from google.auth import transport
 from google.auth.transport import requests as google_requests
 
-from src.settings import ACCESS_TOKEN_EXPIRE_MINUTES
+from src.settings import ACCESS_TOKEN_EXPIRE_MINUTES, GOOGLE_CERTS_CACHE_TTL
 from src.database.database import user_table
 from src.services.user_service import create_user as create_local_user
 from src.services.authentication_service import create_access_token
 from src.models.user import UserIn
 
 
+class _CachedCertsRequest(transport.Request):
+    """
+    Transport that keeps successful GET responses (Google's public certs) for
+    GOOGLE_CERTS_CACHE_TTL seconds, so token verification does not fetch the
+    certs on every login. A lock collapses concurrent fetches on a cache miss.
+    """
+
+    def __init__(self):
+        self._request = google_requests.Request()  # tek session, bağlantılar yeniden kullanılır
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def _cached(self, url):
+        cached = self._cache.get(url)
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1]
+        return None
+
+    def __call__(self, url, method="GET", body=None, headers=None, timeout=None, **kwargs):
+        if method != "GET" or body is not None:
+            return self._request(
+                url, method=method, body=body, headers=headers, timeout=timeout, **kwargs
+            )
+
+        response = self._cached(url)
+        if response is not None:
+            return response
+
+        with self._lock:
+            response = self._cached(url)
+            if response is None:
+                response = self._request(
+                    url, method=method, headers=headers, timeout=timeout, **kwargs
+                )
+                if response.status == 200:
+                    self._cache[url] = (time.monotonic() + GOOGLE_CERTS_CACHE_TTL, response)
+            return response
+
+
+_certs_request = _CachedCertsRequest()
+
+
 async def verify_google_id_token(token: str):
     """
     1. Verify the Google ID token
@@ -22,7 +68,10 @@ async def verify_google_id_token(token: str):
     try:
         # "audience" should be your Web client ID from Google Cloud console
         # or the Android/iOS client IDs if you validated that as well
-        id_info = id_token.verify_oauth2_token(token, google_requests.Request())
+        # Doğrulama senkron çalışır (sertifika indirme dahil); event loop'u bloklamamak için thread'de
+        id_info = await to_thread.run_sync(
+            id_token.verify_oauth2_token, token, _certs_request
+        )
 
         # Basic checks
         if "email" not in id_info:
@@ -1,12 +1,31 @@
-from typing import List, Dict, Any
+import time
+from typing import List, Dict, Any, Optional, Tuple
 from src.database.database import user_table
+from src.settings import LEADERBOARD_CACHE_TTL
 from bson import ObjectId
 
+# (son kullanma zamanı, veri); XP değiştiğinde sıfırlanır
+_leaderboard_cache: Optional[Tuple[float, Dict[str, Any]]] = None
+
+
+def invalidate_leaderboard_cache() -> None:
+    """
+    Önbellekteki genel liderlik tablosunu geçersiz kılar (XP güncellemelerinden sonra çağrılır).
+    """
+    global _leaderboard_cache
+    _leaderboard_cache = None
+
 
 def get_leaderboard() -> Dict[str, Any]:
     """
     Liderlik tablosu verilerini getiren fonksiyon.
+    Sonuç tüm kullanıcılar için aynı olduğundan LEADERBOARD_CACHE_TTL saniye boyunca bellekten döner.
     """
+    global _leaderboard_cache
+    cached = _leaderboard_cache
+    if cached is not None and cached[0] > time.monotonic():
+        return cached[1]
+
     leaderboard_data = []
 
     # XP sıralamasına göre azalan şekilde kullanıcıları çek
@@ -23,7 +42,9 @@ def get_leaderboard() -> Dict[str, Any]:
         )
         rank += 1
 
-    return {"leaderboard": leaderboard_data}
+    result = {"leaderboard": leaderboard_data}
+    _leaderboard_cache = (time.monotonic() + LEADERBOARD_CACHE_TTL, result)
+    return result
 
 
 def get_leaderboard_for_user(user_id: str) -> Dict[str, Any]:
@@ -1,14 +1,21 @@
-from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import base64
+import functools
+import logging
 import random
 from datetime import datetime, timezone
-from typing import Dict, List, Union, Optional
+from typing import AsyncIterator, Dict, List, Tuple, Union, Optional
 
+import orjson
+from anyio import to_thread
 from bson import ObjectId
+from pymongo import ReturnDocument
 
 # Model importları src.models.pyramid'den yapılmalı
 from src.models.pyramid import (
     Pyramid,  # Ana DB modeli (alias _id içerir)
     PyramidOut,  # API çıkış modeli
+    PyramidCurrentOut,
     PyramidItem,  # Union tipi: PyramidExpandItem, PyramidShrinkItem, etc.
     PyramidOptionsBase,
     PyramidShrinkOptions,
@@ -20,6 +27,8 @@ from src.models.pyramid import (
     PyramidReplaceItem,
     PyramidParaphItem,
     PyramidOptionConcreteTypes,  # T için kullanılan Union
+    PyramidBatchRequestItem,
+    PYRAMID_ITEM_ADAPTER,
 )
 from src.models.user import UserOut
 from src.api_clients.pyramid_prompts import (
@@ -28,6 +37,7 @@ from src.api_clients.pyramid_prompts import (
     replace_word as ai_replace_word,
     paraphrase_sentence as ai_paraphrase_sentence,
     get_first_sentence as ai_get_first_sentence,
+    stream_step_options as ai_stream_step_options,
 )
 from src.database.database import user_table, pyramid_table
 from src.services.event_service import (
@@ -36,8 +46,11 @@ from src.services.event_service import (
     update_pyramid_event,
     complete_pyramid_event,
 )
+from src.models.user_event import PyramidStepDetail
 from src.services.xp_service import get_xp, update_xp
 
+logger = logging.getLogger(__name__)
+
 
 def _collect_option_words_from_previous_steps(
     pyramid_steps: List[PyramidItem],
@@ -76,23 +89,16 @@ def _parse_step_item_from_dict(step_dict: Dict, expected_step_type: str) -> Pyra
     # step_dict['step_type'] alanı, preview_next_step_options tarafından doldurulmuş olabilir.
     # expected_step_type ise pyramid.step_types listesinden gelir. İkisi tutarlı olmalı.
 
-    # Gelen dict'in Pydantic modelinin __init__ metoduna uygun olması gerekir.
-    # Model dosyalarında step_type alanları Literal olarak tanımlandığı için,
-    # Pydantic gelen dict'teki step_type ile modeldeki Literal'ı eşleştirecektir.
+    # step_type alanı ayırıcı olduğu için tek bir derlenmiş doğrulayıcı yeterli;
+    # dict'te step_type yoksa beklenen tür kullanılır, farklıysa reddedilir.
     try:
-        if expected_step_type == "expand":
-            return PyramidExpandItem.model_validate(step_dict)
-        elif expected_step_type == "paraphrase":
-            # PyramidParaphOptions, options listesinde PyramidParaphItem içinde olacak
-            return PyramidParaphItem.model_validate(step_dict)
-        elif expected_step_type == "replace":
-            return PyramidReplaceItem.model_validate(step_dict)
-        elif expected_step_type == "shrink":
-            return PyramidShrinkItem.model_validate(step_dict)
-        else:
+        if step_dict.get("step_type", expected_step_type) != expected_step_type:
             raise ValueError(
-                f"Bilinmeyen veya beklenmeyen adım türü ({expected_step_type}) için ayrıştırma yapılamadı."
+                f"Adım türü uyuşmuyor: {step_dict.get('step_type')} != {expected_step_type}"
             )
+        return PYRAMID_ITEM_ADAPTER.validate_python(
+            {**step_dict, "step_type": expected_step_type}
+        )
     except Exception as e:  # PydanticValidationError dahil
         # print(f"Pydantic validation error while parsing step item for type {expected_step_type}: {e}")
         # print(f"Data causing error: {step_dict}")
@@ -101,8 +107,18 @@ def _parse_step_item_from_dict(step_dict: Dict, expected_step_type: str) -> Pyra
         )
 
 
-def create_pyramid(user: UserOut, start_sentence_str: str) -> PyramidOut:
-    user_from_db = user_table.find_one({"_id": ObjectId(user.id)})
+def _store_new_pyramid(pyramid_dict_for_db: Dict, user_id: str) -> None:
+    pyramid_table.insert_one(pyramid_dict_for_db)
+    user_table.update_one(
+        {"_id": ObjectId(user_id)}, {"$push": {"pyramids": str(pyramid_dict_for_db["_id"])}}
+    )
+
+
+async def create_pyramid(user: UserOut, start_sentence_str: str) -> PyramidOut:
+    # PyMongo çağrıları event loop'u bloklamamak için thread havuzunda çalışır
+    user_from_db = await to_thread.run_sync(
+        user_table.find_one, {"_id": ObjectId(user.id)}, {"level": 1}
+    )
     if not user_from_db:
         raise ValueError("Kullanıcı bulunamadı ve piramit oluşturulamadı.")
 
@@ -120,7 +136,7 @@ def create_pyramid(user: UserOut, start_sentence_str: str) -> PyramidOut:
     sentence_for_first_step = (
         start_sentence_str
         if start_sentence_str
-        else get_initial_sentence(user.learning_language, user_level, user_purpose)
+        else await get_initial_sentence(user.learning_language, user_level, user_purpose)
     )
 
     total_steps = set_total_steps(user_level)
@@ -143,7 +159,7 @@ def create_pyramid(user: UserOut, start_sentence_str: str) -> PyramidOut:
             f"Geçersiz ilk adım türü: {first_step_type}"
         )  # creator_fn PyramidItem (Union) tipinde bir nesne döndürmeli
     # For the first step, there are no previous option_words to exclude
-    first_step_item: PyramidItem = creator_fn(
+    first_step_item: PyramidItem = await creator_fn(
         sentence_for_first_step,
         user.learning_language,
         user.system_language,
@@ -152,6 +168,7 @@ def create_pyramid(user: UserOut, start_sentence_str: str) -> PyramidOut:
         [],  # No excluded words for first step
     )
 
+    created_at = datetime.now(timezone.utc)
     pyramid_instance_data = {
         "_id": str(pyramid_mongo_id),  # Pydantic modeli için str ID
         "user_id": user.id,
@@ -160,8 +177,8 @@ def create_pyramid(user: UserOut, start_sentence_str: str) -> PyramidOut:
         "total_steps": total_steps,
         "last_step": 0,
         "completed": False,
-        "created_at": datetime.now(timezone.utc),
-        "updated_at": datetime.now(timezone.utc),
+        "created_at": created_at,
+        "updated_at": created_at,
     }
     # Pydantic modelini oluştur (DB'ye yazmadan önce)
     pyramid_pydantic_instance = Pyramid.model_validate(pyramid_instance_data)
@@ -173,10 +190,7 @@ def create_pyramid(user: UserOut, start_sentence_str: str) -> PyramidOut:
     )  # by_alias _id'yi handle eder
     pyramid_dict_for_db["_id"] = pyramid_mongo_id  # ObjectId olarak ayarla
 
-    pyramid_table.insert_one(pyramid_dict_for_db)
-    user_table.update_one(
-        {"_id": ObjectId(user.id)}, {"$push": {"pyramids": str(pyramid_mongo_id)}}
-    )
+    await to_thread.run_sync(_store_new_pyramid, pyramid_dict_for_db, user.id)
 
     # create_pyramid_event(user.id, str(pyramid_mongo_id)) # Gerekirse
 
@@ -185,9 +199,9 @@ def create_pyramid(user: UserOut, start_sentence_str: str) -> PyramidOut:
     )  # Pyramid'den PyramidOut'a
 
 
-def get_initial_sentence(learning_language: str, user_level: str, purpose: str) -> str:
+async def get_initial_sentence(learning_language: str, user_level: str, purpose: str) -> str:
     try:
-        ai_sentence = ai_get_first_sentence(
+        ai_sentence = await ai_get_first_sentence(
             learning_language, user_level=user_level, purpose=purpose
         )
         if (
@@ -213,9 +227,14 @@ def get_initial_sentence(learning_language: str, user_level: str, purpose: str)
 
 
 def get_pyramid_by_id(
-    pyramid_id: str,
+    pyramid_id: str, pyramid_doc: Optional[Dict] = None
 ) -> Pyramid:  # Artık ana Pyramid modelini döndürüyor
-    pyramid_data_dict = pyramid_table.find_one({"_id": ObjectId(pyramid_id)})
+    # Route yetkilendirme sırasında belgeyi zaten okuduysa ikinci kez sorgulanmaz
+    pyramid_data_dict = (
+        pyramid_doc
+        if pyramid_doc is not None
+        else pyramid_table.find_one({"_id": ObjectId(pyramid_id)})
+    )
     if not pyramid_data_dict:
         raise ValueError("Piramit bulunamadı.")
 
@@ -231,49 +250,103 @@ def get_pyramid_by_id(
         raise ValueError(f"Piramit verisi ({pyramid_id}) okunamadı veya bozuk.")
 
 
+def get_current_step(pyramid_id: str, user_id: str) -> PyramidCurrentOut:
+    """Return only steps[last_step] of the user's pyramid; other steps never leave MongoDB."""
+    docs = list(
+        pyramid_table.aggregate(
+            [
+                {"$match": {"_id": ObjectId(pyramid_id), "user_id": user_id}},
+                {
+                    "$project": {
+                        "last_step": 1,
+                        "total_steps": 1,
+                        "completed": 1,
+                        "step": {"$arrayElemAt": ["$steps", "$last_step"]},
+                    }
+                },
+            ]
+        )
+    )
+    if not docs:
+        raise ValueError("Piramit bulunamadı veya görüntüleme yetkiniz yok.")
+
+    doc = docs[0]
+    if "step" not in doc:
+        raise ValueError(f"Piramit verisi ({pyramid_id}) okunamadı veya bozuk.")
+
+    return PyramidCurrentOut(
+        id=pyramid_id,
+        step_index=doc["last_step"],
+        total_steps=doc["total_steps"],
+        completed=doc.get("completed", False),
+        step=PYRAMID_ITEM_ADAPTER.validate_python(doc["step"]),
+    )
+
+
+def _encode_list_cursor(updated_at: datetime, pyramid_oid: ObjectId) -> str:
+    """Keyset cursor for the pyramid list: updated_at (epoch ms) and _id of the last item"""
+    if updated_at.tzinfo is None:
+        updated_at = updated_at.replace(tzinfo=timezone.utc)  # PyMongo naive UTC döndürür
+    millis = int(updated_at.timestamp() * 1000)
+    return base64.urlsafe_b64encode(f"{millis},{pyramid_oid}".encode()).decode()
+
+
+def _decode_list_cursor(cursor: str) -> Tuple[datetime, ObjectId]:
+    try:
+        millis, pyramid_id = base64.urlsafe_b64decode(cursor.encode()).decode().split(",")
+        return (
+            datetime.fromtimestamp(int(millis) / 1000, tz=timezone.utc),
+            ObjectId(pyramid_id),
+        )
+    except Exception:
+        raise ValueError("Geçersiz sayfalama imleci.")
+
+
 def get_user_pyramids(
     user_id: str,
     completed: Optional[bool] = None,
     limit: Optional[int] = 50,
     offset: Optional[int] = 0,
-) -> List[PyramidOut]:
-    """Get all pyramids for a specific user from user's pyramids field."""
-    from src.database.database import user_table
-
-    # First, get the user and their pyramid IDs
-    user_doc = user_table.find_one({"_id": ObjectId(user_id)})
-    if not user_doc:
-        return []
-
-    pyramid_ids = user_doc.get("pyramids", [])
-    if not pyramid_ids:
-        return []
-
-    # Convert string IDs to ObjectIds
-    pyramid_object_ids = []
-    for pid in pyramid_ids:
-        try:
-            pyramid_object_ids.append(ObjectId(pid))
-        except Exception as e:
-            print(f"Invalid pyramid ID {pid}: {e}")
-            continue
+    cursor: Optional[str] = None,
+) -> Tuple[List[PyramidOut], Optional[str]]:
+    """
+    Get the user's pyramids, most recently updated first.
 
-    if not pyramid_object_ids:
-        return []
+    Pages are read with a keyset cursor on (updated_at, _id): pass the returned
+    next_cursor to get the following page. offset is only applied when no cursor
+    is given (older clients).
 
-    # Build query to find pyramids by IDs
-    query = {"_id": {"$in": pyramid_object_ids}}
+    Returns:
+        (pyramids, next_cursor); next_cursor is None on the last page
+    """
+    # (user_id, completed, updated_at, _id) indeksleri filtreyi ve sıralamayı karşılar
+    query = {"user_id": user_id}
 
     # Add completion filter if specified
     if completed is not None:
         query["completed"] = completed
 
-    # Query the database with pagination, sorted by creation date (newest first)
-    cursor = pyramid_table.find(query).sort("created_at", -1).skip(offset).limit(limit)
+    if cursor:
+        cursor_updated_at, cursor_oid = _decode_list_cursor(cursor)
+        query["$or"] = [
+            {"updated_at": {"$lt": cursor_updated_at}},
+            {"updated_at": cursor_updated_at, "_id": {"$lt": cursor_oid}},
+        ]
+
+    find_cursor = pyramid_table.find(query).sort([("updated_at", -1), ("_id", -1)])
+    if offset and not cursor:
+        find_cursor = find_cursor.skip(offset)
+    if limit:
+        find_cursor = find_cursor.limit(limit)
 
     pyramids = []
-    for pyramid_doc in cursor:
-        pyramid_doc["_id"] = str(pyramid_doc["_id"])
+    last_doc = None
+    scanned = 0
+    for pyramid_doc in find_cursor:
+        last_doc = pyramid_doc
+        scanned += 1
+        pyramid_oid = pyramid_doc["_id"]
+        pyramid_doc = {**pyramid_doc, "_id": str(pyramid_oid)}
         try:
             pyramid_model = Pyramid.model_validate(pyramid_doc)
             pyramids.append(PyramidOut.model_validate(pyramid_model.model_dump()))
@@ -281,11 +354,18 @@ def get_user_pyramids(
             print(f"Error parsing pyramid {pyramid_doc.get('_id', 'unknown')}: {e}")
             continue
 
-    return pyramids
+    # Tam sayfa okunduysa bir sonraki sayfa olabilir
+    next_cursor = None
+    if limit and scanned >= limit and isinstance(last_doc.get("updated_at"), datetime):
+        next_cursor = _encode_list_cursor(last_doc["updated_at"], last_doc["_id"])
 
+    return pyramids, next_cursor
 
-def save_user_selection_for_step(pyramid_id: str, selected_option_index: int) -> Dict:
-    pyramid = get_pyramid_by_id(pyramid_id)  # Pyramid Pydantic modeli
+
+def save_user_selection_for_step(
+    pyramid_id: str, selected_option_index: int, pyramid_doc: Optional[Dict] = None
+) -> Dict:
+    pyramid = get_pyramid_by_id(pyramid_id, pyramid_doc)  # Pyramid Pydantic modeli
     if pyramid.completed:
         raise ValueError("Bu piramit zaten tamamlanmış, seçim kaydedilemez.")
     if pyramid.last_step >= len(pyramid.steps):
@@ -343,9 +423,12 @@ def save_user_selection_for_step(pyramid_id: str, selected_option_index: int) ->
 
 
 def append_given_step(
-    pyramid_id: str, next_step_item_dict: Dict, user: UserOut
+    pyramid_id: str,
+    next_step_item_dict: Dict,
+    user: UserOut,
+    pyramid_doc: Optional[Dict] = None,
 ) -> PyramidOut:
-    pyramid = get_pyramid_by_id(pyramid_id)  # Pyramid Pydantic modeli
+    pyramid = get_pyramid_by_id(pyramid_id, pyramid_doc)  # Pyramid Pydantic modeli
     if pyramid.completed:
         raise ValueError("Bu piramit zaten tamamlanmış, yeni adım eklenemez.")
     if pyramid.last_step >= pyramid.total_steps - 1:
@@ -382,16 +465,12 @@ def append_given_step(
 
 def delete_pyramid(pyramid_id: str, user_id: str):  # user_id eklendi yetkilendirme için
     # Yetkilendirme: Sadece kendi piramidini silebilmeli
-    pyramid_doc = pyramid_table.find_one(
+    # Belge önce okunmadan sahiplik koşuluyla doğrudan silinir
+    delete_result = pyramid_table.delete_one(
         {"_id": ObjectId(pyramid_id), "user_id": user_id}
     )
-    if not pyramid_doc:
-        raise ValueError("Piramit bulunamadı veya silme yetkiniz yok.")
-
-    delete_result = pyramid_table.delete_one({"_id": ObjectId(pyramid_id)})
     if delete_result.deleted_count == 0:
-        # Bu durum yukarıdaki find_one ile zaten yakalanmış olmalı
-        raise ValueError("Piramit bulunamadı veya zaten silinmiş.")
+        raise ValueError("Piramit bulunamadı veya silme yetkiniz yok.")
 
     user_table.update_one(
         {"_id": ObjectId(user_id)}, {"$pull": {"pyramids": pyramid_id}}
@@ -457,9 +536,11 @@ def set_step_types(total_steps: int, level: str) -> List[str]:
     return step_array
 
 
-def create_next_step_options(pyramid_id: str, user: UserOut) -> PyramidOut:
+async def create_next_step_options(
+    pyramid_id: str, user: UserOut, pyramid_doc: Optional[Dict] = None
+) -> PyramidOut:
     """(FALLBACK) Bir sonraki adımı oluşturur. Ana akış /append-step kullanır."""
-    pyramid = get_pyramid_by_id(pyramid_id)
+    pyramid = get_pyramid_by_id(pyramid_id, pyramid_doc)
     if pyramid.completed:
         raise ValueError("Bu piramit zaten tamamlanmış.")
     if pyramid.last_step >= pyramid.total_steps - 1:
@@ -485,7 +566,7 @@ def create_next_step_options(pyramid_id: str, user: UserOut) -> PyramidOut:
         )  # Collect option words from previous steps to avoid repetition
     excluded_words = _collect_option_words_from_previous_steps(pyramid.steps)
 
-    next_step_item: PyramidItem = creator_fn(
+    next_step_item: PyramidItem = await creator_fn(
         sentence_for_next_step,
         user.learning_language,
         user.system_language,
@@ -503,14 +584,18 @@ def create_next_step_options(pyramid_id: str, user: UserOut) -> PyramidOut:
         "last_step": pyramid.last_step,
         "updated_at": pyramid.updated_at,
     }
-    pyramid_table.update_one(
-        {"_id": ObjectId(pyramid_id)}, {"$set": pyramid_dict_for_db_update}
+    await to_thread.run_sync(
+        pyramid_table.update_one,
+        {"_id": ObjectId(pyramid_id)},
+        {"$set": pyramid_dict_for_db_update},
     )
     return PyramidOut.model_validate(pyramid)
 
 
-def preview_next_step_options(pyramid_id: str, user: UserOut) -> Dict:
-    pyramid = get_pyramid_by_id(pyramid_id)
+async def preview_next_step_options(
+    pyramid_id: str, user: UserOut, pyramid_doc: Optional[Dict] = None
+) -> Dict:
+    pyramid = get_pyramid_by_id(pyramid_id, pyramid_doc)
     if pyramid.completed:
         return {
             "pyramid_id": pyramid_id,
@@ -569,16 +654,16 @@ def preview_next_step_options(pyramid_id: str, user: UserOut) -> Dict:
         []
     )  # Dict listesi olarak dönecek (PyramidItem.model_dump())
 
-    def create_preview_for_sentence(sentence_input: str) -> Optional[Dict]:
+    # Collect option words from previous steps for preview generation
+    excluded_words_for_preview = _collect_option_words_from_previous_steps(
+        pyramid.steps
+    )
+
+    async def create_preview_for_sentence(sentence_input: str) -> Optional[Dict]:
         """Helper function to create a preview for a single sentence."""
         try:
-            # Collect option words from previous steps for preview generation
-            excluded_words_for_preview = _collect_option_words_from_previous_steps(
-                pyramid.steps
-            )
-
             # creator_fn PyramidItem döndürür
-            preview_item_pydantic: PyramidItem = creator_fn_for_preview(
+            preview_item_pydantic: PyramidItem = await creator_fn_for_preview(
                 sentence_input,
                 user.learning_language,
                 user.system_language,
@@ -595,21 +680,16 @@ def preview_next_step_options(pyramid_id: str, user: UserOut) -> Dict:
             )
         return None
 
-    # ThreadPoolExecutor kullanarak AI çağrılarını paralel olarak işle
-    with ThreadPoolExecutor(
-        max_workers=min(len(sentences_to_base_preview_on), 3)
-    ) as executor:
-        # Tüm görevleri başlat
-        future_to_sentence = {
-            executor.submit(create_preview_for_sentence, sentence): sentence
+    # AI çağrılarını asyncio.gather ile eşzamanlı olarak işle (sıra korunur)
+    results = await asyncio.gather(
+        *(
+            create_preview_for_sentence(sentence)
             for sentence in sentences_to_base_preview_on
-        }
-
-        # Sonuçları topla
-        for future in future_to_sentence:
-            result = future.result()
-            if result is not None:
-                preview_steps_generated.append(result)
+        )
+    )
+    for result in results:
+        if result is not None:
+            preview_steps_generated.append(result)
 
     if not preview_steps_generated and sentences_to_base_preview_on:
         print(
@@ -624,12 +704,117 @@ def preview_next_step_options(pyramid_id: str, user: UserOut) -> Dict:
     }
 
 
+async def create_batch_step_options(
+    items: List[PyramidBatchRequestItem], user: UserOut, concurrency: int = 10
+) -> List[Optional[Dict]]:
+    """
+    Birden fazla (adım türü, cümle) için seçenekleri eşzamanlı üretir.
+    Aynı anda en fazla `concurrency` AI çağrısı yapılır; sonuçlar girdi sırasıyla döner,
+    başarısız olan öğeler için None döner.
+    """
+    step_creator_fn_map = {
+        "expand": create_expand_options,
+        "paraphrase": create_paraphrase_options,
+        "replace": create_replace_options,
+        "shrink": create_shrink_options,
+    }
+    semaphore = asyncio.Semaphore(concurrency)
+    user_purpose = getattr(user, "purpose", "General Knowledge")
+
+    async def create_for_item(item: PyramidBatchRequestItem) -> Optional[Dict]:
+        async with semaphore:
+            try:
+                step_item: PyramidItem = await step_creator_fn_map[item.step_type](
+                    item.sentence,
+                    user.learning_language,
+                    user.system_language,
+                    user_purpose,
+                    user.level,
+                    [],
+                )
+                return step_item.model_dump(exclude_none=True)
+            except Exception as e:
+                print(
+                    f"Toplu adım oluşturulurken hata (cümle: '{item.sentence}', tip: {item.step_type}): {e}"
+                )
+                return None
+
+    return await asyncio.gather(*(create_for_item(item) for item in items))
+
+
+def stream_next_step_options(
+    pyramid_id: str, user: UserOut, pyramid_doc: Optional[Dict] = None
+) -> AsyncIterator[bytes]:
+    """
+    Bir sonraki adımın seçeneklerini Gemini'den geldikçe NDJSON satırları olarak üretir.
+    Piramidi değiştirmez; doğrulama hataları (ValueError) akış başlamadan fırlatılır.
+    """
+    pyramid = get_pyramid_by_id(pyramid_id, pyramid_doc)
+    if pyramid.completed:
+        raise ValueError("Bu piramit zaten tamamlanmış.")
+    if pyramid.last_step >= pyramid.total_steps - 1:
+        raise ValueError("Tüm adımlar zaten tamamlanmış.")
+
+    next_step_type = pyramid.step_types[pyramid.last_step + 1]
+    current_step_item = pyramid.steps[pyramid.last_step]
+    sentence_for_next_step = (
+        current_step_item.selected_sentence or current_step_item.initial_sentence
+    )
+    excluded_words = _collect_option_words_from_previous_steps(pyramid.steps)
+
+    async def ndjson_lines() -> AsyncIterator[bytes]:
+        try:
+            async for kind, payload in ai_stream_step_options(
+                next_step_type,
+                sentence_for_next_step,
+                user.learning_language,
+                user.system_language,
+                user.level,
+                getattr(user, "purpose", "General Knowledge"),
+                excluded_words,
+            ):
+                if kind == "option":
+                    line = {"type": "option", "step_type": next_step_type, "option": payload}
+                else:
+                    payload.option_words = _extract_option_words(payload)
+                    line = {"type": "item", "item": payload.model_dump(exclude_none=True)}
+                yield orjson.dumps(line) + b"\n"
+        except Exception:
+            logger.exception("Error while streaming step options (pyramid: %s)", pyramid_id)
+            yield orjson.dumps(
+                {"type": "error", "message": "Seçenekler üretilirken bir hata oluştu."}
+            ) + b"\n"
+
+    return ndjson_lines()
+
+
 # --- AI İstemcisi Sarmalayıcıları ---
 # Bunlar src.api_clients.pyramid_prompts'taki AI fonksiyonlarını çağırır
 # ve beklenen Pydantic PyramidItem alt tiplerini döndürür.
 
 
-def create_expand_options(
+def _extract_option_words(step_item: PyramidItem) -> List[str]:
+    """Adımın seçeneklerinden, sonraki adımlarda tekrar edilmemesi gereken kelimeleri çıkarır."""
+    if isinstance(step_item, PyramidExpandItem):
+        return [option.expand_word for option in step_item.options if option.expand_word]
+    if isinstance(step_item, PyramidShrinkItem):
+        return [option.removed_word for option in step_item.options if option.removed_word]
+    if isinstance(step_item, PyramidParaphItem):
+        return [
+            option.paraphrased_sentence
+            for option in step_item.options
+            if option.paraphrased_sentence
+        ]
+    option_words = []
+    for option in step_item.options:
+        if option.replaced_word:
+            option_words.append(option.replaced_word)
+        if option.changed_word:
+            option_words.append(option.changed_word)
+    return option_words
+
+
+async def create_expand_options(
     sentence: str,
     learning_language: str,
     system_language: str,
@@ -640,7 +825,7 @@ def create_expand_options(
     if excluded_words is None:
         excluded_words = []
 
-    ai_result_dict = ai_expand_sentence(
+    ai_result_dict = await ai_expand_sentence(
         sentence,
         learning_language,
         system_language,
@@ -663,15 +848,12 @@ def create_expand_options(
 
     # Extract expand words for option_words field
     expand_item = PyramidExpandItem.model_validate(ai_result_dict)
-    option_words = [
-        option.expand_word for option in expand_item.options if option.expand_word
-    ]
-    expand_item.option_words = option_words
+    expand_item.option_words = _extract_option_words(expand_item)
 
     return expand_item
 
 
-def create_paraphrase_options(
+async def create_paraphrase_options(
     sentence: str,
     learning_language: str,
     system_language: str,
@@ -682,7 +864,7 @@ def create_paraphrase_options(
     if excluded_words is None:
         excluded_words = []
 
-    ai_result_dict = ai_paraphrase_sentence(
+    ai_result_dict = await ai_paraphrase_sentence(
         sentence,
         learning_language,
         system_language,
@@ -702,17 +884,12 @@ def create_paraphrase_options(
 
     # Extract paraphrased sentences for option_words field
     paraphrase_item = PyramidParaphItem.model_validate(ai_result_dict)
-    option_words = [
-        option.paraphrased_sentence
-        for option in paraphrase_item.options
-        if option.paraphrased_sentence
-    ]
-    paraphrase_item.option_words = option_words
+    paraphrase_item.option_words = _extract_option_words(paraphrase_item)
 
     return paraphrase_item
 
 
-def create_replace_options(
+async def create_replace_options(
     sentence: str,
     learning_language: str,
     system_language: str,
@@ -723,7 +900,7 @@ def create_replace_options(
     if excluded_words is None:
         excluded_words = []
 
-    ai_result_dict = ai_replace_word(
+    ai_result_dict = await ai_replace_word(
         sentence,
         learning_language,
         system_language,
@@ -743,18 +920,12 @@ def create_replace_options(
 
     # Extract both replaced and changed words for option_words field
     replace_item = PyramidReplaceItem.model_validate(ai_result_dict)
-    option_words = []
-    for option in replace_item.options:
-        if option.replaced_word:
-            option_words.append(option.replaced_word)
-        if option.changed_word:
-            option_words.append(option.changed_word)
-    replace_item.option_words = option_words
+    replace_item.option_words = _extract_option_words(replace_item)
 
     return replace_item
 
 
-def create_shrink_options(
+async def create_shrink_options(
     sentence: str,
     learning_language: str,
     system_language: str,
@@ -765,7 +936,7 @@ def create_shrink_options(
     if excluded_words is None:
         excluded_words = []
 
-    ai_result_dict = ai_shrink_sentence(
+    ai_result_dict = await ai_shrink_sentence(
         sentence,
         learning_language,
         system_language,
@@ -785,16 +956,67 @@ def create_shrink_options(
 
     # Extract removed words for option_words field
     shrink_item = PyramidShrinkItem.model_validate(ai_result_dict)
-    option_words = [
-        option.removed_word for option in shrink_item.options if option.removed_word
-    ]
-    shrink_item.option_words = option_words
+    shrink_item.option_words = _extract_option_words(shrink_item)
 
     return shrink_item
 
 
+async def _award_pyramid_xp(
+    pyramid_id: str, user_id: str, event_id: Optional[str], pyramid_doc: Dict
+) -> int:
+    """Complete the pyramid's event (creating it if needed) and return the XP awarded."""
+    if event_id:
+        # Complete existing event
+        completed_event = await complete_pyramid_event(event_id)
+        return completed_event.get("details", {}).get("xp_earned", 0) if completed_event else 0
+
+    # Try to find existing pyramid event
+    existing_event = await to_thread.run_sync(get_pyramid_event_by_id, user_id, pyramid_id)
+    if existing_event:
+        # Complete the existing event
+        completed_event = await complete_pyramid_event(existing_event["_id"])
+        return completed_event.get("details", {}).get("xp_earned", 0) if completed_event else 0
+
+    # Create a new event and immediately complete it with pyramid data
+    # Pyramid adımları "steps" alanında tutulur; event'e sabit şemalı özetleri yazılır
+    items = [
+        PyramidStepDetail.model_validate(step).model_dump()
+        for step in pyramid_doc.get("steps", [])
+    ]
+    step_types = pyramid_doc.get("step_types", [])
+
+    new_event = await to_thread.run_sync(create_pyramid_event, user_id, pyramid_id)
+    if new_event:
+        # Update the event with pyramid completion data
+        await to_thread.run_sync(
+            update_pyramid_event,
+            new_event["_id"],
+            {
+                "total_steps": len(items),
+                "completed_steps": len(items),
+                "step_types": step_types,
+                "steps_detail": items,
+            }
+        )
+        # Complete the event
+        completed_event = await complete_pyramid_event(new_event["_id"])
+        return completed_event.get("details", {}).get("xp_earned", 0) if completed_event else 0
+
+    # Fallback to old XP calculation if event creation fails
+    base_xp = 25
+    bonus_xp = len(items) * 5
+    total_xp = base_xp + bonus_xp
+
+    # Award XP manually
+    current_user_data = await get_xp(user_id)
+    if current_user_data:
+        current_xp = current_user_data.get("xp", 0)
+        await update_xp(user_id, current_xp + total_xp)
+    return total_xp
+
+
 async def complete_pyramid_with_xp(
-    pyramid_id: str, user_id: str, event_id: str = None
+    pyramid_id: str, user_id: str, event_id: str = None, award_xp: bool = True
 ) -> Dict:
     """
     Complete a pyramid exercise and award XP to the user using the new event system.
@@ -803,65 +1025,50 @@ async def complete_pyramid_with_xp(
         pyramid_id: ID of the pyramid to complete
         user_id: ID of the user completing the pyramid
         event_id: Optional event ID for tracking (if None, will try to find existing event)
+        award_xp: If False, only mark the pyramid as completed (xp_earned 0)
 
     Returns:
-        Dictionary with completion status and XP earned
+        Dictionary with completion status and XP earned. status is "not_found" when the
+        pyramid does not exist, belongs to another user or is already completed, and
+        "error" when the XP step failed (the pyramid is then left uncompleted).
     """
     try:
-        # Mark pyramid as completed in pyramid_table
-        pyramid_table.update_one(
-            {"_id": ObjectId(pyramid_id)},
-            {"$set": {"completed": True, "updated_at": datetime.utcnow()}},
-        )
-
-        # Get the pyramid to extract step information
-        pyramid_doc = pyramid_table.find_one({"_id": ObjectId(pyramid_id)})
-        if not pyramid_doc:
-            raise ValueError("Pyramid not found")
+        # Sahiplik ve "henüz tamamlanmamış" koşulu her sorguda filtrededir
+        pending_filter = {
+            "_id": ObjectId(pyramid_id),
+            "user_id": user_id,
+            "completed": {"$ne": True},
+        }
 
-        # Handle event tracking
-        if event_id:
-            # Complete existing event
-            completed_event = await complete_pyramid_event(event_id)
-            total_xp = completed_event.get("details", {}).get("xp_earned", 0) if completed_event else 0
-        else:
-            # Try to find existing pyramid event
-            existing_event = get_pyramid_event_by_id(user_id, pyramid_id)
-            if existing_event:
-                # Complete the existing event
-                completed_event = await complete_pyramid_event(existing_event["_id"])
-                total_xp = completed_event.get("details", {}).get("xp_earned", 0) if completed_event else 0
-            else:
-                # Create a new event and immediately complete it with pyramid data
-                items = pyramid_doc.get("items", [])
-                step_types = pyramid_doc.get("step_types", [])
-                
-                new_event = create_pyramid_event(user_id, pyramid_id)
-                if new_event:
-                    # Update the event with pyramid completion data
-                    update_pyramid_event(
-                        new_event["_id"],
-                        {
-                            "total_steps": len(items),
-                            "completed_steps": len(items),
-                            "step_types": step_types,
-                            "steps_detail": items,
-                        }
-                    )
-                    # Complete the event
-                    completed_event = await complete_pyramid_event(new_event["_id"])
-                    total_xp = completed_event.get("details", {}).get("xp_earned", 0) if completed_event else 0
-                else:
-                    # Fallback to old XP calculation if event creation fails
-                    base_xp = 25
-                    bonus_xp = len(items) * 5
-                    total_xp = base_xp + bonus_xp
-                    
-                    # Award XP manually
-                    current_user_data = await get_xp(user_id)
-                    if current_user_data:
-                        current_xp = current_user_data.get("xp", 0)
-                        await update_xp(user_id, current_xp + total_xp)
+        total_xp = 0
+        if award_xp:
+            pyramid_doc = await to_thread.run_sync(
+                pyramid_table.find_one, pending_filter, {"steps": 1, "step_types": 1}
+            )
+            if not pyramid_doc:
+                return {"status": "not_found", "xp_earned": 0, "pyramid_completed": False}
+            # XP önce verilir; bu adım hata verirse piramit tamamlanmamış kalır ve
+            # istek yeniden denenebilir (event tamamlama tekrar XP vermez)
+            total_xp = await _award_pyramid_xp(pyramid_id, user_id, event_id, pyramid_doc)
+
+        # Piramit tek yazmayla tamamlanır; kazanılan XP aynı $set içinde saklanır
+        completed_doc = await to_thread.run_sync(
+            functools.partial(
+                pyramid_table.find_one_and_update,
+                pending_filter,
+                {
+                    "$set": {
+                        "completed": True,
+                        "updated_at": datetime.now(timezone.utc),
+                        "xp_earned": total_xp,
+                    }
+                },
+                projection={"_id": 1},
+                return_document=ReturnDocument.AFTER,
+            )
+        )
+        if not completed_doc:
+            return {"status": "not_found", "xp_earned": 0, "pyramid_completed": False}
 
         return {
             "status": "success", 
@@ -1,8 +1,9 @@
+from dataclasses import asdict
 from datetime import datetime
 from typing import List, Optional, Dict, Any
 from bson import ObjectId
 from src.database.database import saved_sentence_table
-from src.models.saved_sentence import SavedSentence, SaveSentenceRequest
+from src.models.saved_sentence import SavedSentence, SaveSentenceRequest, compute_sentence_hash
 
 
 def save_sentence(user_id: str, save_data: SaveSentenceRequest) -> Dict[str, Any]:
@@ -10,12 +11,11 @@ def save_sentence(user_id: str, save_data: SaveSentenceRequest) -> Dict[str, Any
     Save a sentence to the saved_sentence_table
     """
     try:
-        # Check if the sentence is already saved
+        # Check if the sentence is already saved (by the indexed sentence hash)
         existing_sentence = saved_sentence_table.find_one({
             "user_id": user_id,
-            "sentence": save_data.sentence,
-            "meaning": save_data.meaning
-        })
+            "sentence_hash": compute_sentence_hash(save_data.sentence, save_data.meaning)
+        }, {"_id": 1})
         
         if existing_sentence:
             return {
@@ -37,7 +37,7 @@ def save_sentence(user_id: str, save_data: SaveSentenceRequest) -> Dict[str, Any
         )
         
         # Insert into saved_sentence_table
-        result = saved_sentence_table.insert_one(saved_sentence.dict())
+        result = saved_sentence_table.insert_one(asdict(saved_sentence))
         
         if result.inserted_id:
             return {
@@ -68,8 +68,7 @@ def unsave_sentence(user_id: str, sentence: str, meaning: str) -> Dict[str, Any]
     try:
         result = saved_sentence_table.delete_one({
             "user_id": user_id,
-            "sentence": sentence,
-            "meaning": meaning
+            "sentence_hash": compute_sentence_hash(sentence, meaning)
         })
         
         if result.deleted_count > 0:
@@ -100,8 +99,9 @@ def get_saved_sentences(user_id: str) -> Dict[str, Any]:
     """
     try:
         # Get all saved sentences for the user, sorted by saved_at (most recent first)
+        # The binary lookup hash is internal and not JSON serializable, so it is not returned
         saved_sentences_cursor = saved_sentence_table.find(
-            {"user_id": user_id}
+            {"user_id": user_id}, {"sentence_hash": 0}
         ).sort("saved_at", -1)
         
         saved_sentences = list(saved_sentences_cursor)
@@ -132,9 +132,8 @@ def is_sentence_saved(user_id: str, sentence: str, meaning: str) -> Dict[str, An
     try:
         saved_sentence = saved_sentence_table.find_one({
             "user_id": user_id,
-            "sentence": sentence,
-            "meaning": meaning
-        })
+            "sentence_hash": compute_sentence_hash(sentence, meaning)
+        }, {"_id": 1})
         
         is_saved = saved_sentence is not None
         
@@ -1,8 +1,49 @@
 from bson import ObjectId
 from fastapi import HTTPException, status
 from src.database.database import user_table
-from typing import Dict, Any, Optional
+from src.settings import STATISTICS_CACHE_TTL, STATISTICS_CACHE_SIZE
+from typing import Dict, Any, Optional, Tuple
 import datetime
+import threading
+import time
+
+import orjson
+
+# user_id -> (son kullanma zamanı, istatistikler, JSON baytları); istatistik güncellenince
+# kullanıcının kaydı silinir. Baytlar /statistics/get/all yanıtında olduğu gibi gönderilir.
+_statistics_cache: Dict[str, Tuple[float, Dict[str, Any], bytes]] = {}
+# İstatistik route'ları thread havuzunda çalıştığı için önbelleğe erişim kilitle yapılır
+_statistics_cache_lock = threading.Lock()
+
+
+def invalidate_user_statistics(user_id: str) -> None:
+    """Drop the cached statistics of a user (called after they are updated)"""
+    with _statistics_cache_lock:
+        _statistics_cache.pop(user_id, None)
+
+
+def _cached_user_statistics(user_id: str) -> Optional[Tuple[float, Dict[str, Any], bytes]]:
+    with _statistics_cache_lock:
+        cached = _statistics_cache.get(user_id)
+    if cached is not None and cached[0] > time.monotonic():
+        return cached
+    return None
+
+
+def _cache_user_statistics(user_id: str, stats: Dict[str, Any]) -> bytes:
+    stats_json = orjson.dumps(stats)
+    with _statistics_cache_lock:
+        now = time.monotonic()
+        if len(_statistics_cache) >= STATISTICS_CACHE_SIZE:
+            # Önce süresi dolanlar, yine doluysa en eski kayıt atılır
+            for cached_user_id in [
+                key for key, (expires_at, _, _) in _statistics_cache.items() if expires_at <= now
+            ]:
+                _statistics_cache.pop(cached_user_id, None)
+            if len(_statistics_cache) >= STATISTICS_CACHE_SIZE:
+                _statistics_cache.pop(next(iter(_statistics_cache)), None)
+        _statistics_cache[user_id] = (now + STATISTICS_CACHE_TTL, stats, stats_json)
+    return stats_json
 
 
 def format_time_for_frontend(seconds: int) -> str:
@@ -13,14 +54,40 @@ def format_time_for_frontend(seconds: int) -> str:
 
 
 def get_user_statistics(user_id: str) -> Dict[str, Any]:
-    """Get statistics for a specific user"""
+    """
+    Get statistics for a specific user.
+    Kept in memory for STATISTICS_CACHE_TTL seconds; the returned dict is shared and must not be mutated.
+    """
+    cached = _cached_user_statistics(user_id)
+    if cached is not None:
+        return cached[1]
+
+    stats = _build_user_statistics(user_id)
+    _cache_user_statistics(user_id, stats)
+    return stats
+
+
+def get_user_statistics_json(user_id: str) -> bytes:
+    """
+    Get the statistics of a user already serialized to JSON (same cache as get_user_statistics)
+    """
+    cached = _cached_user_statistics(user_id)
+    if cached is not None:
+        return cached[2]
+
+    return _cache_user_statistics(user_id, _build_user_statistics(user_id))
+
+
+def _build_user_statistics(user_id: str) -> Dict[str, Any]:
     if not ObjectId.is_valid(user_id):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Geçersiz kullanıcı ID",
         )
 
-    user_data = user_table.find_one({"_id": ObjectId(user_id)})
+    user_data = user_table.find_one(
+        {"_id": ObjectId(user_id)}, {"pyramid_stats": 1, "vocabulary_stats": 1}
+    )
     if not user_data:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -122,5 +189,6 @@ def update_user_statistics(user_id: str, stats_type: str, stats_data: Dict[str,
         {"_id": ObjectId(user_id)},
         {"$set": update_data}
     )
+    invalidate_user_statistics(user_id)
 
     return result.modified_count > 0
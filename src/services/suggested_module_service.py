@@ -1,5 +1,4 @@
 from collections import Counter
-from src.models.user_event import EventType
 from src.services.event_service import get_recent_learning_events, get_recent_completed_vocabulary_events
 
 def get_suggested_module_type(user_id: str):
@@ -19,10 +18,10 @@ def get_suggested_module_type(user_id: str):
     
     # Tüm olası modül tipleri
     all_module_types = {
-        EventType.PYRAMID.value,
-        EventType.VOCABULARY.value,
-        EventType.WRITING.value,
-        EventType.EMAIL.value
+        "pyramid",
+        "vocabulary",
+        "writing",
+        "email"
     }
     
     # Son 5 gündeki event tiplerini say
@@ -30,13 +29,13 @@ def get_suggested_module_type(user_id: str):
     
     # Vocabulary dışındaki diğer event tiplerini say
     for event in recent_events:
-        if event['event_type'] != EventType.VOCABULARY.value:
+        if event['event_type'] != "vocabulary":
             event_counts[event['event_type']] += 1
     
     # Tamamlanmış vocabulary listelerini al ve say
     completed_vocab_events = get_recent_completed_vocabulary_events(user_id)
     if completed_vocab_events:
-        event_counts[EventType.VOCABULARY.value] = len(completed_vocab_events)
+        event_counts["vocabulary"] = len(completed_vocab_events)
     
     # Hiç yapılmamış aktiviteleri bul
     unused_types = all_module_types - set(event_counts.keys())
@@ -2,8 +2,13 @@ from typing import Optional, Dict, List
 import logging
 import os
 import hashlib
+import threading
+import time
+from collections import Counter
+from dataclasses import asdict
 from datetime import datetime, timedelta
-from src.settings import TRANSLATE_KEY
+from pymongo import UpdateOne
+from src.settings import TRANSLATE_KEY, CACHE_STATS_FLUSH_HITS, CACHE_STATS_FLUSH_INTERVAL
 from src.database.database import translation_cache_table
 from src.models.translation_cache import TranslationCache, WritingQuestionCache
 
@@ -96,7 +101,82 @@ def _generate_text_hash(text: str, source_lang: str, target_lang: str) -> str:
     return hashlib.md5(cache_string.encode('utf-8')).hexdigest()
 
 
-def _get_cached_translation(text: str, source_lang: str, target_lang: str) -> Optional[str]:
+# Cache hit statistics are buffered in memory (keyed by document _id) and written with a
+# single unordered bulk_write instead of one update_one round trip per hit
+_cache_hit_counts: Counter = Counter()
+_cache_last_used: Dict = {}
+_cache_stats_lock = threading.Lock()
+_cache_stats_last_flush = time.monotonic()
+
+
+def _last_used_now() -> datetime:
+    """
+    Current time truncated to the minute for last_used stamps
+    
+    Cleanup works in days, so minute resolution is enough; repeated hits within the
+    same minute leave the field (and the last_used indexes) untouched.
+    """
+    return datetime.utcnow().replace(second=0, microsecond=0)
+
+
+def _record_cache_hit(doc_id) -> None:
+    """
+    Buffer a cache hit; flushes once enough hits accumulated or the interval elapsed
+    
+    Args:
+        doc_id: _id of the cache document that was used
+    """
+    with _cache_stats_lock:
+        _cache_hit_counts[doc_id] += 1
+        _cache_last_used[doc_id] = _last_used_now()
+        should_flush = (
+            sum(_cache_hit_counts.values()) >= CACHE_STATS_FLUSH_HITS
+            or time.monotonic() - _cache_stats_last_flush >= CACHE_STATS_FLUSH_INTERVAL
+        )
+    
+    if should_flush:
+        flush_cache_stats()
+
+
+def flush_cache_stats() -> int:
+    """
+    Write buffered usage_count/last_used updates to the translation cache
+    
+    Returns:
+        Number of cache documents updated
+    """
+    global _cache_hit_counts, _cache_last_used, _cache_stats_last_flush
+    
+    with _cache_stats_lock:
+        hit_counts, last_used = _cache_hit_counts, _cache_last_used
+        _cache_hit_counts, _cache_last_used = Counter(), {}
+        _cache_stats_last_flush = time.monotonic()
+    
+    if not hit_counts:
+        return 0
+    
+    try:
+        result = translation_cache_table.bulk_write(
+            [
+                UpdateOne(
+                    {"_id": doc_id},
+                    # $max never moves last_used backwards and is a no-op within the same minute
+                    {"$inc": {"usage_count": count}, "$max": {"last_used": last_used[doc_id]}},
+                )
+                for doc_id, count in hit_counts.items()
+            ],
+            ordered=False,
+        )
+        return result.modified_count
+        
+    except Exception as e:
+        logger.error(f"Error flushing cache stats: {str(e)}")
+        return 0
+
+
+def _get_cached_translation(
+    text: str, source_lang: str, target_lang: str, text_hash: Optional[str] = None
+) -> Optional[str]:
     """
     Get cached translation if available
     
@@ -104,12 +184,14 @@ def _get_cached_translation(text: str, source_lang: str, target_lang: str) -> Op
         text: Original text
         source_lang: Source language code
         target_lang: Target language code
+        text_hash: Precomputed hash (computed here if omitted)
         
     Returns:
         Cached translation or None if not found
     """
     try:
-        text_hash = _generate_text_hash(text, source_lang, target_lang)
+        if text_hash is None:
+            text_hash = _generate_text_hash(text, source_lang, target_lang)
         
         cached_translation = translation_cache_table.find_one({
             "text_hash": text_hash,
@@ -118,14 +200,8 @@ def _get_cached_translation(text: str, source_lang: str, target_lang: str) -> Op
         })
         
         if cached_translation:
-            # Update last_used and usage_count
-            translation_cache_table.update_one(
-                {"_id": cached_translation["_id"]},
-                {
-                    "$set": {"last_used": datetime.utcnow()},
-                    "$inc": {"usage_count": 1}
-                }
-            )
+            # Update last_used and usage_count (buffered)
+            _record_cache_hit(cached_translation["_id"])
             
             logger.info(f"Using cached translation for text hash: {text_hash}")
             return cached_translation["translated_text"]
@@ -137,7 +213,13 @@ def _get_cached_translation(text: str, source_lang: str, target_lang: str) -> Op
         return None
 
 
-def _cache_translation(text: str, translated_text: str, source_lang: str, target_lang: str) -> None:
+def _cache_translation(
+    text: str,
+    translated_text: str,
+    source_lang: str,
+    target_lang: str,
+    text_hash: Optional[str] = None,
+) -> None:
     """
     Cache a translation for future use
     
@@ -146,9 +228,11 @@ def _cache_translation(text: str, translated_text: str, source_lang: str, target
         translated_text: Translated text
         source_lang: Source language code
         target_lang: Target language code
+        text_hash: Precomputed hash (computed here if omitted)
     """
     try:
-        text_hash = _generate_text_hash(text, source_lang, target_lang)
+        if text_hash is None:
+            text_hash = _generate_text_hash(text, source_lang, target_lang)
         
         # Check if translation already exists
         existing = translation_cache_table.find_one({
@@ -164,7 +248,7 @@ def _cache_translation(text: str, translated_text: str, source_lang: str, target
                 {
                     "$set": {
                         "translated_text": translated_text,
-                        "last_used": datetime.utcnow()
+                        "last_used": _last_used_now()
                     },
                     "$inc": {"usage_count": 1}
                 }
@@ -179,7 +263,7 @@ def _cache_translation(text: str, translated_text: str, source_lang: str, target
                 text_hash=text_hash
             )
             
-            translation_cache_table.insert_one(cache_entry.model_dump())
+            translation_cache_table.insert_one(asdict(cache_entry))
             
         logger.info(f"Cached translation for text hash: {text_hash}")
         
@@ -220,14 +304,8 @@ def _get_cached_question(question_id: str, target_language: str) -> Optional[Dic
         })
         
         if cached_question:
-            # Update last_used and usage_count
-            translation_cache_table.update_one(
-                {"_id": cached_question["_id"]},
-                {
-                    "$set": {"last_used": datetime.utcnow()},
-                    "$inc": {"usage_count": 1}
-                }
-            )
+            # Update last_used and usage_count (buffered)
+            _record_cache_hit(cached_question["_id"])
             
             logger.info(f"Using cached question for: {cache_key}")
             return cached_question["translated_data"]
@@ -239,6 +317,46 @@ def _get_cached_question(question_id: str, target_language: str) -> Optional[Dic
         return None
 
 
+def _get_cached_questions(question_ids: List[str], target_language: str) -> Dict[str, Dict]:
+    """
+    Get cached translated questions for many question IDs with a single query
+    
+    Args:
+        question_ids: Question IDs
+        target_language: Target language
+        
+    Returns:
+        Mapping of question ID to cached question data (misses are omitted)
+    """
+    try:
+        keys_to_ids = {
+            _generate_question_cache_key(question_id, target_language): question_id
+            for question_id in question_ids
+        }
+        if not keys_to_ids:
+            return {}
+        
+        cached_questions = list(translation_cache_table.find(
+            {"cache_key": {"$in": list(keys_to_ids)}},
+            {"cache_key": 1, "translated_data": 1},
+        ))
+        
+        if cached_questions:
+            # Update last_used and usage_count (buffered)
+            for cached in cached_questions:
+                _record_cache_hit(cached["_id"])
+            logger.info(f"Using {len(cached_questions)} cached questions for: {target_language}")
+        
+        return {
+            keys_to_ids[cached["cache_key"]]: cached["translated_data"]
+            for cached in cached_questions
+        }
+        
+    except Exception as e:
+        logger.error(f"Error retrieving cached questions: {str(e)}")
+        return {}
+
+
 def _cache_question(question_id: str, target_language: str, original_data: Dict, translated_data: Dict) -> None:
     """
     Cache a translated question for future use
@@ -264,7 +382,7 @@ def _cache_question(question_id: str, target_language: str, original_data: Dict,
                 {
                     "$set": {
                         "translated_data": translated_data,
-                        "last_used": datetime.utcnow()
+                        "last_used": _last_used_now()
                     },
                     "$inc": {"usage_count": 1}
                 }
@@ -279,7 +397,7 @@ def _cache_question(question_id: str, target_language: str, original_data: Dict,
                 cache_key=cache_key
             )
             
-            translation_cache_table.insert_one(cache_entry.model_dump())
+            translation_cache_table.insert_one(asdict(cache_entry))
             
         logger.info(f"Cached question for: {cache_key}")
         
@@ -306,12 +424,18 @@ def translate_text(
         target_code = get_language_code(target_language)
         source_code = get_language_code(source_language)
 
-        # Skip translation if target is same as source
-        if target_code == source_code:
+        # Skip translation (and hashing) if target is same as source or there is nothing to translate
+        if target_code == source_code or not text:
             return text
 
+        # Hash is computed once (only when a translation is actually needed) and
+        # shared by the cache lookup and the cache write
+        text_hash = _generate_text_hash(text, source_code, target_code)
+
         # Check cache first
-        cached_translation = _get_cached_translation(text, source_code, target_code)
+        cached_translation = _get_cached_translation(
+            text, source_code, target_code, text_hash
+        )
         if cached_translation:
             return cached_translation
 
@@ -320,7 +444,9 @@ def translate_text(
         
         # Cache the translation if successful
         if translated_text and translated_text != text:
-            _cache_translation(text, translated_text, source_code, target_code)
+            _cache_translation(
+                text, translated_text, source_code, target_code, text_hash
+            )
         
         return translated_text
 
@@ -329,13 +455,17 @@ def translate_text(
         return text  # Return original text if translation fails
 
 
-def translate_writing_question(question_data: Dict, target_language: str) -> Dict:
+def translate_writing_question(
+    question_data: Dict, target_language: str, check_cache: bool = True
+) -> Dict:
     """
     Translate writing question data to target language with caching
 
     Args:
         question_data: Question dictionary with id, name, fullName, scenarios
         target_language: Target language for translation
+        check_cache: Look up the question-level cache first (callers that
+            already did a batched lookup pass False)
 
     Returns:
         Translated question data
@@ -346,7 +476,7 @@ def translate_writing_question(question_data: Dict, target_language: str) -> Dic
 
         # Check for question-level cache first
         question_id = str(question_data.get("id", ""))
-        if question_id:
+        if question_id and check_cache:
             cached_question = _get_cached_question(question_id, target_language)
             if cached_question:
                 return cached_question
@@ -404,9 +534,19 @@ def translate_questions_list(
         if target_language.lower() == "english":
             return questions_list  # No translation needed
 
+        # Önbellekteki sorular tek sorguda okunur; yalnızca eksik olanlar çevrilir
+        question_ids = [str(question.get("id", "")) for question in questions_list]
+        cached_questions = _get_cached_questions(
+            [question_id for question_id in question_ids if question_id], target_language
+        )
+
         translated_questions = []
-        for question in questions_list:
-            translated_question = translate_writing_question(question, target_language)
+        for question_id, question in zip(question_ids, questions_list):
+            translated_question = cached_questions.get(question_id) if question_id else None
+            if not translated_question:
+                translated_question = translate_writing_question(
+                    question, target_language, check_cache=False
+                )
             translated_questions.append(translated_question)
 
         return translated_questions
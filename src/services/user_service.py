@@ -2,7 +2,7 @@ from datetime import datetime, timezone
 from fastapi import HTTPException, status
 from bson import ObjectId
 from typing import Optional
-from src.database.database import user_table
+from src.database.database import user_table, saved_vocabulary_table
 from src.models.user import UserIn, UserOut, UserUpdate
 from .authentication_service import (
     create_access_token,
@@ -70,7 +70,6 @@ def create_user(user_data: UserIn) -> dict:
         "updated_at": datetime.now(timezone.utc),
         "pyramids": [],
         "vocabulary_lists": [],
-        "saved_vocabularies": [],
         "xp": 0,
         "pyramid_stats": {
             "time": 0,
@@ -96,7 +95,7 @@ def create_user(user_data: UserIn) -> dict:
         xp=new_user["xp"],
         pyramids=new_user["pyramids"],
         vocabulary_lists=new_user["vocabulary_lists"],
-        saved_vocabularies=new_user["saved_vocabularies"],
+        saved_vocabularies=[],
         pyramid_stats=new_user["pyramid_stats"],
         vocabulary_stats=new_user["vocabulary_stats"],
     )
@@ -134,7 +133,6 @@ def get_user_by_id(user_id: str) -> Optional[UserOut]:
         xp=user.get("xp", 0),
         pyramids=user["pyramids"],
         vocabulary_lists=user["vocabulary_lists"],
-        saved_vocabularies=user.get("saved_vocabularies", []),
         pyramid_stats=user["pyramid_stats"],
         vocabulary_stats=user["vocabulary_stats"],
     )
@@ -155,7 +153,6 @@ def authenticate_user(email: str, password: str) -> Optional[dict]:
         xp=user.get("xp", 0),
         pyramids=user["pyramids"],
         vocabulary_lists=user["vocabulary_lists"],
-        saved_vocabularies=user.get("saved_vocabularies", []),
         pyramid_stats=user["pyramid_stats"],
         vocabulary_stats=user["vocabulary_stats"],
     )
@@ -228,6 +225,8 @@ def delete_user(user_id: str, current_user_id: str) -> bool:
         )
 
     result = user_table.delete_one({"_id": ObjectId(user_id)})
+    if result.deleted_count > 0:
+        saved_vocabulary_table.delete_many({"user_id": user_id})
     return result.deleted_count > 0
 
 
@@ -1,6 +1,10 @@
-from src.api_clients.vocabulary_prompts import create_vocabulary_list
+from src.api_clients.vocabulary_prompts import (
+    create_vocabulary_list,
+    stream_vocabulary_list,
+)
 from src.database.database import (
     user_table,
+    saved_vocabulary_table,
     vocabulary_table,
     vocabulary_statistics_table,
 )
@@ -12,51 +16,51 @@ from src.models.vocabulary import (
     VocabularyItem,
     SaveVocabularyRequest,
 )
+from anyio import to_thread
 from bson import ObjectId
+from pymongo import ReturnDocument
 from datetime import datetime, timedelta
+import logging
 import random
 import json
 import os
+from typing import AsyncIterator
 
+import orjson
 
-def create_vocabulary(user_id: str, system_language: str = None):
-    user = user_table.find_one({"_id": ObjectId(user_id)})
+logger = logging.getLogger(__name__)
 
-    if not user:
-        raise ValueError("User not found")
 
-    purpose = user.get("purpose")
-    # Add a default purpose if one isn't set in the user profile
-    if not purpose:
-        purpose = "general vocabulary"
+# Only the most recent words are needed for the prompt's exclusion list (at most 50 roots)
+RECENTLY_SEEN_WORDS_LIMIT = 200
 
-    level = user.get("level")
-    # Add a default level if one isn't set
-    if not level:
-        level = "intermediate"
 
-    learning_language = user.get("learning_language")
-    # Add a default language if one isn't set
-    if not learning_language:
-        learning_language = "English"
+def _get_vocabulary_generation_context(user_id: str) -> dict:
+    """Collect the user settings and word history used to generate a new vocabulary list."""
+    user = user_table.find_one({"_id": ObjectId(user_id)})
 
-    # Get difficult words for this user by retrieving word statistics
-    # and selecting words with high difficulty scores
-    difficult_words = get_difficult_words(user_id)
+    if not user:
+        raise ValueError("User not found")
 
-    # Get recently seen words to avoid repeating them
-    recently_seen_words = get_recently_seen_words(user_id, days=30)
+    # Add defaults for anything that isn't set in the user profile
+    return {
+        "purpose": user.get("purpose") or "general vocabulary",
+        "level": user.get("level") or "intermediate",
+        "learning_language": user.get("learning_language") or "English",
+        # Get difficult words for this user by retrieving word statistics
+        # and selecting words with high difficulty scores
+        "difficult_words": get_difficult_words(user_id),
+        # Get recently seen words to avoid repeating them
+        "recently_seen_words": get_recently_seen_words(
+            user_id, days=30, limit=RECENTLY_SEEN_WORDS_LIMIT
+        ),
+    }
 
-    # Generate vocabulary list with prioritized difficult words
-    vocab_list = create_vocabulary_with_difficult_words(
-        purpose,
-        level,
-        learning_language,
-        difficult_words,
-        recently_seen_words,
-        system_language,
-    )
 
+def _store_vocabulary_list(
+    user_id: str, vocab_list: VocabularyList, system_language: str = None
+) -> dict:
+    """Insert a generated list, link it to the user and return it ready for the frontend."""
     vocab_data = vocab_list.model_dump()
     result = vocabulary_table.insert_one(vocab_data)
 
@@ -77,7 +81,65 @@ def create_vocabulary(user_id: str, system_language: str = None):
     return vocab_data
 
 
-def create_vocabulary_with_difficult_words(
+async def create_vocabulary(user_id: str, system_language: str = None):
+    # Kullanıcı/geçmiş sorguları ve kayıt yazmaları PyMongo ile yapıldığından thread havuzunda çalışır
+    context = await to_thread.run_sync(_get_vocabulary_generation_context, user_id)
+
+    # Generate vocabulary list with prioritized difficult words
+    vocab_list = await create_vocabulary_with_difficult_words(
+        context["purpose"],
+        context["level"],
+        context["learning_language"],
+        context["difficult_words"],
+        context["recently_seen_words"],
+        system_language,
+    )
+
+    return await to_thread.run_sync(
+        _store_vocabulary_list, user_id, vocab_list, system_language
+    )
+
+
+async def stream_vocabulary(user_id: str, system_language: str = None) -> AsyncIterator[bytes]:
+    """
+    Generate a vocabulary list and stream it as NDJSON lines while Gemini produces it.
+
+    Each generated word is sent as {"type": "word"} as soon as it is complete; the final
+    {"type": "list"} line carries the stored list (with difficult words mixed in), which
+    the client should use as the authoritative result. User lookup errors (ValueError)
+    are raised before the stream starts.
+    """
+    context = await to_thread.run_sync(_get_vocabulary_generation_context, user_id)
+
+    async def ndjson_lines() -> AsyncIterator[bytes]:
+        try:
+            async for kind, payload in stream_vocabulary_list(
+                context["purpose"],
+                context["level"],
+                context["learning_language"],
+                system_language or "English",
+                excluded_words=context["recently_seen_words"],
+            ):
+                if kind == "word":
+                    yield orjson.dumps({"type": "word", "word": payload.model_dump()}) + b"\n"
+                else:
+                    vocab_list = _mix_in_difficult_words(
+                        payload, context["difficult_words"], system_language
+                    )
+                    vocab_data = await to_thread.run_sync(
+                        _store_vocabulary_list, user_id, vocab_list, system_language
+                    )
+                    yield orjson.dumps({"type": "list", "vocabulary": vocab_data}) + b"\n"
+        except Exception:
+            logger.exception("Error while streaming vocabulary list (user: %s)", user_id)
+            yield orjson.dumps(
+                {"type": "error", "message": "Kelime listesi üretilirken bir hata oluştu."}
+            ) + b"\n"
+
+    return ndjson_lines()
+
+
+async def create_vocabulary_with_difficult_words(
     purpose,
     level,
     learning_language,
@@ -103,7 +165,7 @@ def create_vocabulary_with_difficult_words(
     excluded_words = recently_seen_words
 
     # Generate a fresh vocabulary list with excluded words
-    vocabulary_list = create_vocabulary_list(
+    vocabulary_list = await create_vocabulary_list(
         purpose,
         level,
         learning_language,
@@ -111,6 +173,13 @@ def create_vocabulary_with_difficult_words(
         excluded_words=excluded_words,
     )
 
+    return _mix_in_difficult_words(vocabulary_list, difficult_words, system_language)
+
+
+def _mix_in_difficult_words(
+    vocabulary_list: VocabularyList, difficult_words, system_language=None
+) -> VocabularyList:
+    """Replace 30-40% of a generated list with words the user has had difficulty with."""
     # If we don't have any difficult words, just return the regular vocab list
     if not difficult_words or len(difficult_words) == 0:
         return vocabulary_list
@@ -233,17 +302,23 @@ def update_word_last_seen(
             vocabulary_statistics_table.insert_one(new_vocabulary_stat.model_dump())
 
 
+def _store_difficulty_score(word_stat: dict):
+    """
+    Recompute and persist difficulty_score after a hint/attempt counter changed.
+    This is the only place stored scores are updated for existing words.
+    """
+    difficulty_score = VocabularyStatistics.from_mongo(word_stat).calculate_difficulty_score()
+    vocabulary_statistics_table.update_one(
+        {"_id": word_stat["_id"]}, {"$set": {"difficulty_score": difficulty_score}}
+    )
+
+
 def track_hint_usage(user_id: str, hint_data: HintUsageRequest):
     """
     Track when a user uses a hint on a word
     """
     current_time = datetime.utcnow()
 
-    # Find existing word statistics
-    word_stat = vocabulary_statistics_table.find_one(
-        {"user_id": user_id, "word": hint_data.word, "meaning": hint_data.meaning}
-    )
-
     # Ensure system_language has a value
     system_language = hint_data.system_language
     if system_language is None:
@@ -264,12 +339,15 @@ def track_hint_usage(user_id: str, hint_data: HintUsageRequest):
     else:
         raise ValueError(f"Invalid hint type: {hint_data.hint_type}")
 
+    # Increment the appropriate hint counter on the existing word statistics
+    word_stat = vocabulary_statistics_table.find_one_and_update(
+        {"user_id": user_id, "word": hint_data.word, "meaning": hint_data.meaning},
+        {"$inc": {hint_field: 1}, "$set": update_data},
+        return_document=ReturnDocument.AFTER,
+    )
+
     if word_stat:
-        # Increment the appropriate hint counter
-        vocabulary_statistics_table.update_one(
-            {"user_id": user_id, "word": hint_data.word, "meaning": hint_data.meaning},
-            {"$inc": {hint_field: 1}, "$set": update_data},
-        )
+        _store_difficulty_score(word_stat)
     else:
         # Create a new entry for this word
         new_word_stat = VocabularyStatistics(
@@ -283,12 +361,13 @@ def track_hint_usage(user_id: str, hint_data: HintUsageRequest):
             # Add empty but proper relevant words array and default emoji
             relevantWords=["related1", "related2", "related3", "related4", "related5"],
             emoji="📚",
+            # Set the appropriate hint value
+            **{hint_field: 1},
         )
 
-        # Set the appropriate hint value
-        setattr(new_word_stat, hint_field, 1)
-
-        vocabulary_statistics_table.insert_one(new_word_stat.model_dump())
+        new_stat_doc = new_word_stat.model_dump()
+        new_stat_doc["difficulty_score"] = new_word_stat.calculate_difficulty_score()
+        vocabulary_statistics_table.insert_one(new_stat_doc)
 
     return {"status": "success", "message": "Hint usage tracked successfully"}
 
@@ -299,11 +378,6 @@ def track_attempt_result(user_id: str, attempt_data: AttemptResult):
     """
     current_time = datetime.utcnow()
 
-    # Find existing word statistics
-    word_stat = vocabulary_statistics_table.find_one(
-        {"user_id": user_id, "word": attempt_data.word, "meaning": attempt_data.meaning}
-    )
-
     # Ensure system_language has a value
     system_language = attempt_data.system_language
     if system_language is None:
@@ -317,16 +391,19 @@ def track_attempt_result(user_id: str, attempt_data: AttemptResult):
         "system_language": system_language,  # Always update system_language
     }
 
+    # Increment the appropriate counter on the existing word statistics
+    word_stat = vocabulary_statistics_table.find_one_and_update(
+        {
+            "user_id": user_id,
+            "word": attempt_data.word,
+            "meaning": attempt_data.meaning,
+        },
+        {"$inc": {success_field: 1}, "$set": update_data},
+        return_document=ReturnDocument.AFTER,
+    )
+
     if word_stat:
-        # Increment the appropriate counter
-        vocabulary_statistics_table.update_one(
-            {
-                "user_id": user_id,
-                "word": attempt_data.word,
-                "meaning": attempt_data.meaning,
-            },
-            {"$inc": {success_field: 1}, "$set": update_data},
-        )
+        _store_difficulty_score(word_stat)
     else:
         # Create a new entry for this word
         new_word_stat = VocabularyStatistics(
@@ -340,12 +417,13 @@ def track_attempt_result(user_id: str, attempt_data: AttemptResult):
             # Add empty but proper relevant words array and default emoji
             relevantWords=["related1", "related2", "related3", "related4", "related5"],
             emoji="📚",
+            # Set the appropriate attempt value
+            **{success_field: 1},
         )
 
-        # Set the appropriate attempt value
-        setattr(new_word_stat, success_field, 1)
-
-        vocabulary_statistics_table.insert_one(new_word_stat.model_dump())
+        new_stat_doc = new_word_stat.model_dump()
+        new_stat_doc["difficulty_score"] = new_word_stat.calculate_difficulty_score()
+        vocabulary_statistics_table.insert_one(new_stat_doc)
 
     return {"status": "success", "message": "Attempt result tracked successfully"}
 
@@ -362,49 +440,38 @@ def get_difficult_words(user_id: str, limit: int = 20, recency_days: int = 30):
     Returns:
         List of word statistics objects with difficulty scores
     """
-    # Find all word statistics for this user
-    word_stats = list(vocabulary_statistics_table.find({"user_id": user_id}))
-
-    # If no stats found, return empty list
-    if not word_stats:
+    if limit <= 0:
         return []
 
-    # Calculate difficulty score for each word
-    scored_words = []
-    for word_stat in word_stats:
-        # Create WordStatistics object to calculate score
-        stat_obj = VocabularyStatistics(**word_stat)
-        difficulty_score = stat_obj.calculate_difficulty_score()
-
-        # Add score to the word stat dictionary
-        word_stat["difficulty_score"] = difficulty_score
-        scored_words.append(word_stat)
-
-    # Sort by difficulty score (highest first)
-    sorted_words = sorted(
-        scored_words, key=lambda w: w.get("difficulty_score", 0), reverse=True
+    # difficulty_score is stored whenever hint/attempt counters change, so the
+    # hardest words come straight from the (user_id, difficulty_score) index
+    return list(
+        vocabulary_statistics_table.find({"user_id": user_id})
+        .sort("difficulty_score", -1)
+        .limit(limit)
     )
 
-    # Limit to the requested number of words
-    return sorted_words[:limit]
-
 
-def get_recently_seen_words(user_id: str, days: int = 30):
+def get_recently_seen_words(user_id: str, days: int = 30, limit: int = 0):
     """
     Get a list of words recently seen by the user
 
     Args:
         user_id: The user ID
         days: Number of days to look back
+        limit: Maximum number of words to return (0 means no limit)
 
     Returns:
-        List of word statistics objects
+        List of {"word": ...} objects, most recently seen first
     """
     cutoff_date = datetime.utcnow() - timedelta(days=days)
     recently_seen = list(
         vocabulary_statistics_table.find(
-            {"user_id": user_id, "last_seen": {"$gte": cutoff_date}}
+            {"user_id": user_id, "last_seen": {"$gte": cutoff_date}},
+            {"_id": 0, "word": 1},
         )
+        .sort("last_seen", -1)
+        .limit(limit)
     )
     return recently_seen
 
@@ -428,16 +495,20 @@ def get_word_statistics(user_id: str):
     return {"word_statistics": word_stats}
 
 
-def return_test_data(user_id: str):
-    user_data = user_table.find_one({"_id": ObjectId(user_id)})
+async def return_test_data(user_id: str):
+    user_data = await to_thread.run_sync(
+        user_table.find_one,
+        {"_id": ObjectId(user_id)},
+        {"vocabulary_lists": 1, "system_language": 1},
+    )
 
     if not user_data:
         raise ValueError("User not found")
 
     # Check if the user has any vocabulary lists
     if "vocabulary_lists" in user_data and user_data["vocabulary_lists"]:
-        vocab_list = vocabulary_table.find_one(
-            {"_id": {"$in": user_data["vocabulary_lists"]}}
+        vocab_list = await to_thread.run_sync(
+            vocabulary_table.find_one, {"_id": {"$in": user_data["vocabulary_lists"]}}
         )
 
         if vocab_list:
@@ -452,13 +523,13 @@ def return_test_data(user_id: str):
     # If no vocabulary list found, create one
     # Pass the system_language if available, otherwise default in create_vocabulary
     system_language = user_data.get("system_language")
-    vocab_data = create_vocabulary(user_id, system_language)
+    vocab_data = await create_vocabulary(user_id, system_language)
     return vocab_data
 
 
 def save_vocabulary(user_id: str, save_data: SaveVocabularyRequest):
     """
-    Save a vocabulary word to the user's saved_vocabularies list
+    Save a vocabulary word to the user's saved vocabularies
 
     Args:
         user_id: The user ID
@@ -470,45 +541,29 @@ def save_vocabulary(user_id: str, save_data: SaveVocabularyRequest):
     if not ObjectId.is_valid(user_id):
         raise ValueError("Invalid user ID")
 
-    # Find the user
-    user = user_table.find_one({"_id": ObjectId(user_id)})
-    if not user:
-        raise ValueError("User not found")
-
-    # Create saved vocabulary entry
-    saved_vocab = {
-        "word": save_data.word,
-        "meaning": save_data.meaning,
-        "relevantWords": save_data.relevantWords,
-        "emoji": save_data.emoji,
-        "saved_at": datetime.utcnow(),
-    }
-
-    # Check if this word is already saved
-    existing_saved = next(
-        (
-            item
-            for item in user.get("saved_vocabularies", [])
-            if item.get("word") == save_data.word
-            and item.get("meaning") == save_data.meaning
-        ),
-        None,
+    # Saved words live in their own collection (not embedded in the user document);
+    # the upsert only inserts when this word/meaning is not saved yet
+    result = saved_vocabulary_table.update_one(
+        {"user_id": user_id, "word": save_data.word, "meaning": save_data.meaning},
+        {
+            "$setOnInsert": {
+                "relevantWords": save_data.relevantWords,
+                "emoji": save_data.emoji,
+                "saved_at": datetime.utcnow(),
+            }
+        },
+        upsert=True,
     )
 
-    if existing_saved:
+    if result.upserted_id is None:
         return {"status": "info", "message": "This vocabulary word is already saved"}
 
-    # Add to user's saved vocabularies
-    user_table.update_one(
-        {"_id": ObjectId(user_id)}, {"$push": {"saved_vocabularies": saved_vocab}}
-    )
-
     return {"status": "success", "message": "Vocabulary word saved successfully"}
 
 
 def unsave_vocabulary(user_id: str, word: str, meaning: str):
     """
-    Remove a saved vocabulary word from the user's saved_vocabularies list
+    Remove a saved vocabulary word from the user's saved vocabularies
 
     Args:
         user_id: The user ID
@@ -521,18 +576,12 @@ def unsave_vocabulary(user_id: str, word: str, meaning: str):
     if not ObjectId.is_valid(user_id):
         raise ValueError("Invalid user ID")
 
-    # Find the user
-    user = user_table.find_one({"_id": ObjectId(user_id)})
-    if not user:
-        raise ValueError("User not found")
-
     # Remove the saved vocabulary
-    result = user_table.update_one(
-        {"_id": ObjectId(user_id)},
-        {"$pull": {"saved_vocabularies": {"word": word, "meaning": meaning}}},
+    result = saved_vocabulary_table.delete_one(
+        {"user_id": user_id, "word": word, "meaning": meaning}
     )
 
-    if result.modified_count == 0:
+    if result.deleted_count == 0:
         return {
             "status": "info",
             "message": "Vocabulary word was not found in saved list",
@@ -554,15 +603,24 @@ def get_saved_vocabularies(user_id: str):
     if not ObjectId.is_valid(user_id):
         raise ValueError("Invalid user ID")
 
-    # Find the user
-    user = user_table.find_one({"_id": ObjectId(user_id)})
-    if not user:
-        raise ValueError("User not found")
+    return {"saved_vocabularies": list_saved_vocabularies(user_id)}
+
+
+def list_saved_vocabularies(user_id: str) -> list:
+    """
+    Saved vocabulary words of a user in the order they were saved
 
-    # Return saved vocabularies, or empty list if none exists
-    saved_vocabularies = user.get("saved_vocabularies", [])
+    Args:
+        user_id: The user ID
 
-    return {"saved_vocabularies": saved_vocabularies}
+    Returns:
+        List of saved vocabulary entries (word, meaning, relevantWords, emoji, saved_at)
+    """
+    return list(
+        saved_vocabulary_table.find(
+            {"user_id": user_id}, {"_id": 0, "user_id": 0}
+        ).sort("saved_at", 1)
+    )
 
 
 def is_vocabulary_saved(user_id: str, word: str, meaning: str):
@@ -580,16 +638,12 @@ def is_vocabulary_saved(user_id: str, word: str, meaning: str):
     if not ObjectId.is_valid(user_id):
         raise ValueError("Invalid user ID")
 
-    # Find the user
-    user = user_table.find_one({"_id": ObjectId(user_id)})
-    if not user:
-        raise ValueError("User not found")
-
     # Check if the word is in saved vocabularies
-    saved_vocabularies = user.get("saved_vocabularies", [])
-    is_saved = any(
-        item.get("word") == word and item.get("meaning") == meaning
-        for item in saved_vocabularies
+    is_saved = (
+        saved_vocabulary_table.find_one(
+            {"user_id": user_id, "word": word, "meaning": meaning}, {"_id": 1}
+        )
+        is not None
     )
 
     return {"isBookmarked": is_saved}
@@ -609,25 +663,33 @@ def get_user_vocabulary_lists(user_id: str):
         raise ValueError("Invalid user ID")
 
     # Find the user
-    user = user_table.find_one({"_id": ObjectId(user_id)})
+    user = user_table.find_one({"_id": ObjectId(user_id)}, {"vocabulary_lists": 1})
     if not user:
         raise ValueError("User not found")
 
     # Get the vocabulary list IDs for this user
     vocab_list_ids = user.get("vocabulary_lists", [])
 
-    # Fetch all vocabulary lists
+    # Fetch only the word counts of all lists in a single query
+    word_counts = {
+        doc["_id"]: doc["word_count"]
+        for doc in vocabulary_table.aggregate(
+            [
+                {"$match": {"_id": {"$in": vocab_list_ids}}},
+                {"$project": {"word_count": {"$size": {"$ifNull": ["$words", []]}}}},
+            ]
+        )
+    }
+
     vocabulary_lists = []
 
     for vocab_id in vocab_list_ids:
-        # Fetch the vocabulary list from the database
-        vocab_list = vocabulary_table.find_one({"_id": vocab_id})
-        if vocab_list:
+        if vocab_id in word_counts:
             # Extract basic metadata for display
             vocab_data = {
                 "id": str(vocab_id),
                 "title": f"Vocabulary List {len(vocabulary_lists) + 1}",  # Default title
-                "word_count": len(vocab_list.get("words", [])),
+                "word_count": word_counts[vocab_id],
                 "created_at": vocab_id.generation_time.isoformat(),
             }
             vocabulary_lists.append(vocab_data)
@@ -650,7 +712,10 @@ def rework_vocabulary_list(vocabulary_list_id: str, user_id: str):
         raise ValueError("Invalid user ID format")
 
     # Find the user to get their language preferences
-    user = user_table.find_one({"_id": ObjectId(user_id)})
+    user = user_table.find_one(
+        {"_id": ObjectId(user_id)},
+        {"vocabulary_lists": 1, "learning_language": 1, "system_language": 1},
+    )
     if not user:
         raise ValueError("User not found")
 
@@ -670,12 +735,12 @@ def rework_vocabulary_list(vocabulary_list_id: str, user_id: str):
                     {"_id": ObjectId(vocabulary_list_id)}, {"$set": {"words": words}}
                 )
 
-                # Return the updated vocabulary list
-                updated_vocab = vocabulary_table.find_one({"_id": ObjectId(vocabulary_list_id)})
+                # The stored list now matches the local copy; no need to read it back
+                updated_vocab = vocab_list
+                updated_vocab["words"] = words
 
                 # Convert ObjectId to string
-                if updated_vocab and "_id" in updated_vocab:
-                    updated_vocab["_id"] = str(updated_vocab["_id"])
+                updated_vocab["_id"] = str(updated_vocab["_id"])
 
                 return {
                     "status": "success",
@@ -751,7 +816,7 @@ def delete_vocabulary_list(vocabulary_list_id: str, user_id: str):
         raise ValueError("Invalid ID format")
 
     # Find the user to verify they own this vocabulary list
-    user = user_table.find_one({"_id": ObjectId(user_id)})
+    user = user_table.find_one({"_id": ObjectId(user_id)}, {"vocabulary_lists": 1})
     if not user:
         raise ValueError("User not found")
 
@@ -759,13 +824,10 @@ def delete_vocabulary_list(vocabulary_list_id: str, user_id: str):
     if ObjectId(vocabulary_list_id) not in user.get("vocabulary_lists", []):
         raise ValueError("Vocabulary list not found or not owned by this user")
 
-    # Get the vocabulary list
-    vocab_list = vocabulary_table.find_one({"_id": ObjectId(vocabulary_list_id)})
-    if not vocab_list:
-        raise ValueError("Vocabulary list not found")
-
     # Delete the vocabulary list from the vocabulary collection
-    vocabulary_table.delete_one({"_id": ObjectId(vocabulary_list_id)})
+    delete_result = vocabulary_table.delete_one({"_id": ObjectId(vocabulary_list_id)})
+    if delete_result.deleted_count == 0:
+        raise ValueError("Vocabulary list not found")
 
     # Remove the vocabulary list ID from the user's vocabulary_lists array
     user_table.update_one(
@@ -790,7 +852,10 @@ def get_popular_vocabularies(user_id: str):
         raise ValueError("Invalid user ID")
     
     # Find the user to get their language preferences
-    user = user_table.find_one({"_id": ObjectId(user_id)})
+    user = user_table.find_one(
+        {"_id": ObjectId(user_id)},
+        {"learning_language": 1, "system_language": 1},
+    )
     if not user:
         raise ValueError("User not found")
     
@@ -1,30 +1,16 @@
 from typing import List
 from pydantic import BaseModel
 from datetime import datetime, timedelta
-from collections import defaultdict
-from src.services.event_service import get_recent_learning_events
+from src.services.event_service import get_daily_learning_xp
 
 class WeeklyProgressResponse(BaseModel):
     labels: List[str]
     data: List[int]
 
 async def get_weekly_progress(user_id) -> WeeklyProgressResponse:
-    # Son 7 günlük verileri al
-    events = get_recent_learning_events(user_id=user_id, days=7)
-    
-    # Günlük XP'leri topla
-    daily_xp = defaultdict(int)
-    
-    # Event tabanlı hesaplama - sadece gerçek etkinliklerden XP göster
-    for event in events:
-        # Timestamp'i datetime'a çevir ve gün başlangıcına ayarla
-        event_date = event['timestamp'].replace(hour=0, minute=0, second=0, microsecond=0)
-        
-        # Event'in XP değerini al (varsayılan 10 XP)
-        xp = event.get('details', {}).get('xp_earned', 10)
-        
-        # Günlük toplama ekle
-        daily_xp[event_date] = daily_xp[event_date] + xp
+    # Son 7 günün günlük XP toplamları (MongoDB'de gün bazında gruplanır;
+    # xp_earned içermeyen eventler varsayılan 10 XP sayılır)
+    daily_xp = get_daily_learning_xp(user_id=user_id, days=7)
     
     # Son 7 günün tarihlerini oluştur
     today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
@@ -43,6 +29,6 @@ async def get_weekly_progress(user_id) -> WeeklyProgressResponse:
     
     # Tarihleri gün isimlerine çevir ve her gün için XP değerlerini al
     labels = [day_names[date.weekday()] for date in dates]
-    data = [daily_xp[date] for date in dates]
+    data = [daily_xp.get(date.strftime("%Y-%m-%d"), 0) for date in dates]
     
     return WeeklyProgressResponse(labels=labels, data=data)
\ No newline at end of file
@@ -1,6 +1,7 @@
 from typing import Optional, List
 from datetime import datetime, timedelta, timezone
 from bson import ObjectId
+import functools
 import json
 import os
 
@@ -41,7 +42,7 @@ async def evaluate_writing_submission(
         DetailedWritingResponse with evaluation details and feedback
     """
     # Send to Gemini for evaluation with language context
-    result = send_writing_prompt_to_gemini(
+    result = await send_writing_prompt_to_gemini(
         user_text=user_text, 
         question=question,
         learning_language=learning_language,
@@ -126,8 +127,8 @@ async def answer_writing_question(
             upsert=True
         )
 
-        # Return response
-        return WritingAnswerResponse(
+        # Return response (evaluation is already validated)
+        return WritingAnswerResponse.model_construct(
             question_id=question_id,
             question_text=question.full_name,
             user_answer=answer,
@@ -175,6 +176,27 @@ def get_user_question_response(
         return None
 
 
+_QUESTIONS_FILE = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), "writing_question", "questions.json"
+)
+
+# İngilizce (çevrilmemiş) seviye yanıtları süreç boyunca bir kez oluşturulur
+_level_questions_cache: dict = {}
+
+
+@functools.lru_cache(maxsize=1)
+def _load_questions_file() -> dict:
+    """Parse questions.json once; the returned dict is shared and must not be mutated"""
+    with open(_QUESTIONS_FILE, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def reload_writing_questions():
+    """Drop the parsed questions file and cached level responses (after editing questions.json)"""
+    _load_questions_file.cache_clear()
+    _level_questions_cache.clear()
+
+
 def get_writing_questions_by_level(level: str, learning_language: str = "English") -> Optional[WritingQuestionsResponse]:
     """
     Load writing questions from the unified questions.json file based on user level
@@ -194,18 +216,18 @@ def get_writing_questions_by_level(level: str, learning_language: str = "English
             print(f"Invalid level: {level}")
             return None
 
-        # Get the file path
-        current_dir = os.path.dirname(os.path.dirname(__file__))  # Go up to src/
-        file_path = os.path.join(current_dir, "writing_question", "questions.json")
+        is_english = learning_language.lower() == "english"
+        if is_english:
+            cached = _level_questions_cache.get(level_lower)
+            if cached is not None:
+                return cached
 
         # Check if file exists
-        if not os.path.exists(file_path):
-            print(f"Writing questions file not found: {file_path}")
+        if not os.path.exists(_QUESTIONS_FILE):
+            print(f"Writing questions file not found: {_QUESTIONS_FILE}")
             return None
 
-        # Load and parse JSON file
-        with open(file_path, "r", encoding="utf-8") as file:
-            data = json.load(file)
+        data = _load_questions_file()
 
         # Extract the level data
         if level_lower not in data:
@@ -214,8 +236,8 @@ def get_writing_questions_by_level(level: str, learning_language: str = "English
 
         level_questions = data[level_lower]
         
-        # Translate questions if needed
-        if learning_language.lower() != "english":
+        # Translate questions if needed (translations have their own cache)
+        if not is_english:
             level_questions = translate_questions_list(level_questions, learning_language)
         
         # Convert questions list to WritingQuestion objects
@@ -230,12 +252,15 @@ def get_writing_questions_by_level(level: str, learning_language: str = "English
             )
             questions.append(question)
 
-        return WritingQuestionsResponse(
+        questions_response = WritingQuestionsResponse(
             level=level_lower,
             title=f"{level_lower.capitalize()} Level Questions",
             questions=questions,
             total_questions=len(questions),
         )
+        if is_english:
+            _level_questions_cache[level_lower] = questions_response
+        return questions_response
 
     except Exception as e:
         print(f"Error loading writing questions for level {level}: {str(e)}")
@@ -289,20 +314,12 @@ def get_all_writing_questions() -> Optional[dict]:
         Dictionary containing all questions organized by level
     """
     try:
-        # Get the file path
-        current_dir = os.path.dirname(os.path.dirname(__file__))  # Go up to src/
-        file_path = os.path.join(current_dir, "writing_question", "questions.json")
-
         # Check if file exists
-        if not os.path.exists(file_path):
-            print(f"Writing questions file not found: {file_path}")
+        if not os.path.exists(_QUESTIONS_FILE):
+            print(f"Writing questions file not found: {_QUESTIONS_FILE}")
             return None
 
-        # Load and parse JSON file
-        with open(file_path, "r", encoding="utf-8") as file:
-            data = json.load(file)
-
-        return data
+        return _load_questions_file()
 
     except Exception as e:
         print(f"Error loading all writing questions: {str(e)}")
@@ -392,11 +409,13 @@ def get_writing_questions_with_status(user_id: str, level: str, learning_languag
         )
         solved_ids = {q["question_id"] for q in solved_questions}
         
-        # Update questions with solved status
-        for question in questions_response.questions:
-            question.solved = question.id in solved_ids
-        
-        return questions_response
+        # Solved status is per user, so it goes on copies of the (shared) questions
+        return questions_response.model_copy(update={
+            "questions": [
+                question.model_copy(update={"solved": question.id in solved_ids})
+                for question in questions_response.questions
+            ]
+        })
 
     except Exception as e:
         print(f"Error loading writing questions with status for level {level}: {str(e)}")
@@ -431,12 +450,7 @@ async def answer_writing_question_with_scenarios(
         print(f"DEBUG: Found question: {question.name}")
         
         # Combine scenario answers for evaluation
-        combined_answers = []
-        for scenario_answer in request.scenario_answers:
-            if scenario_answer.answer and scenario_answer.answer.strip():
-                combined_answers.append(f"{scenario_answer.scenario_text}: {scenario_answer.answer}")
-        
-        combined_text = '\n\n'.join(combined_answers)
+        combined_text = ScenarioAnswer.combine(request.scenario_answers)
         
         if not combined_text.strip():
             print("No answers provided for any scenarios")
@@ -473,8 +487,8 @@ async def answer_writing_question_with_scenarios(
             upsert=True
         )
         
-        # Return scenario response
-        return WritingScenarioAnswerResponse(
+        # Return scenario response (evaluation and scenario answers are already validated)
+        return WritingScenarioAnswerResponse.model_construct(
             question_id=request.question_id,
             question_text=question.full_name,
             scenario_answers=request.scenario_answers,
@@ -1,5 +1,7 @@
+from anyio import to_thread
 from bson import ObjectId
 from src.database.database import user_table
+from src.services.leaderboard_service import invalidate_leaderboard_cache
 
 
 async def get_xp(user_id: str):
@@ -9,7 +11,8 @@ async def get_xp(user_id: str):
     if not ObjectId.is_valid(user_id):
         return None
 
-    user_data = user_table.find_one({"_id": ObjectId(user_id)})
+    # Async çağıranlar (event tamamlama, XP route'ları) için PyMongo thread havuzunda çalışır
+    user_data = await to_thread.run_sync(user_table.find_one, {"_id": ObjectId(user_id)})
     if user_data:
         # Include xp in the response, default to 0 if not present
         return {
@@ -35,5 +38,8 @@ async def update_xp(user_id: str, amount: int):
     if not isinstance(amount, int):
         return None
 
-    user_table.update_one({"_id": ObjectId(user_id)}, {"$set": {"xp": amount}})
+    await to_thread.run_sync(
+        user_table.update_one, {"_id": ObjectId(user_id)}, {"$set": {"xp": amount}}
+    )
+    invalidate_leaderboard_cache()
     return True
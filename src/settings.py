@@ -14,3 +14,47 @@ ALGORITHM = "HS256"
 CLIENT_ID = getenv("CLIENT_ID")
 CLIENT_SECRET = getenv("CLIENT_SECRET")
 ACCESS_TOKEN_EXPIRE_MINUTES = 3000
+# Comma-separated list of origins allowed by CORS, e.g. "https://app.example.com,http://localhost:8081".
+# Tanımlı değilse yalnızca yerel Expo web geliştirme sunucularına izin verilir; "*" açıkça verilmelidir.
+DEFAULT_ALLOWED_ORIGINS = "http://localhost:8081,http://localhost:19006"
+ALLOWED_ORIGINS = [
+    origin.strip()
+    for origin in (getenv("ALLOWED_ORIGINS") or DEFAULT_ALLOWED_ORIGINS).split(",")
+    if origin.strip()
+]
+
+# Size of the worker thread pool used for sync endpoints and blocking calls
+THREADPOOL_SIZE = int(getenv("THREADPOOL_SIZE") or 200)
+
+# Process-wide limits for outgoing Gemini requests
+GEMINI_MAX_CONCURRENCY = int(getenv("GEMINI_MAX_CONCURRENCY") or 20)
+GEMINI_MAX_REQUESTS_PER_MINUTE = int(getenv("GEMINI_MAX_REQUESTS_PER_MINUTE") or 500)
+
+# Per-process limits for in-flight moderation checks and pyramid endpoints that call the LLM
+MODERATION_MAX_CONCURRENCY = int(getenv("MODERATION_MAX_CONCURRENCY") or 16)
+PYRAMID_LLM_MAX_CONCURRENCY = int(getenv("PYRAMID_LLM_MAX_CONCURRENCY") or 8)
+
+# Lightweight model used for the yes/no content moderation check
+GEMINI_MODERATION_MODEL = getenv("GEMINI_MODERATION_MODEL") or "gemini-2.0-flash-lite"
+
+# MongoDB connection pool and wire compression (zstd needs the zstandard package; zlib is the fallback)
+MONGO_MAX_POOL_SIZE = int(getenv("MONGO_MAX_POOL_SIZE") or 50)
+MONGO_MIN_POOL_SIZE = int(getenv("MONGO_MIN_POOL_SIZE") or 5)
+MONGO_COMPRESSORS = getenv("MONGO_COMPRESSORS") or "zstd,zlib"
+
+# Çeviri önbelleği isabet istatistikleri (usage_count/last_used) bellekte biriktirilip toplu yazılır
+CACHE_STATS_FLUSH_HITS = int(getenv("CACHE_STATS_FLUSH_HITS") or 100)
+CACHE_STATS_FLUSH_INTERVAL = float(getenv("CACHE_STATS_FLUSH_INTERVAL") or 30)
+
+# Genel liderlik tablosu tüm kullanıcılar için aynıdır; bu süre (saniye) boyunca bellekten sunulur
+LEADERBOARD_CACHE_TTL = float(getenv("LEADERBOARD_CACHE_TTL") or 30)
+
+# Google ID token doğrulaması için indirilen public sertifikalar bu süre (saniye) boyunca yeniden kullanılır
+GOOGLE_CERTS_CACHE_TTL = float(getenv("GOOGLE_CERTS_CACHE_TTL") or 3600)
+
+# Kullanıcı istatistikleri (dashboard'daki üç GET isteği) bu süre (saniye) boyunca bellekten sunulur
+STATISTICS_CACHE_TTL = float(getenv("STATISTICS_CACHE_TTL") or 5)
+STATISTICS_CACHE_SIZE = int(getenv("STATISTICS_CACHE_SIZE") or 10000)
+
+# Önerilen modül hesaplaması aynı kullanıcı için eşzamanlı isteklerde bir kez yapılır; sonuç bu süre (saniye) boyunca yeniden kullanılır
+SUGGESTED_MODULE_CACHE_TTL = float(getenv("SUGGESTED_MODULE_CACHE_TTL") or 30)